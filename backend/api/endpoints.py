@@ -1,83 +1,360 @@
 import asyncio
-from fastapi import FastAPI, HTTPException, Request
+import time
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from contextlib import aclosing, asynccontextmanager
+import json
 import logging
 from pydantic import BaseModel
-from itertools import chain  # Import chain to flatten lists
 
 from ..core.query_decomposer import QueryDecomposer
+from ..core.query_router import QueryRouter
 from ..core.retriever import Retriever
-from ..core.processor import Processor
+from ..core.processor import Processor, merged_sources
+from ..core.reranker import Reranker
 from ..core.response_generator import ResponseGenerator
+from ..core.executor import inference_executor
+from ..core.stream_engine import PipelineStage, StreamPipeline
+from ..core.model_registry import model_registry
+from ..core.answer_cache import AnswerCache
+from ..core.model_client import REMOTE_STAGES, ModelClient, RemoteVectorStore
+from ..core.model_server import model_cache_stats
+from ..config.settings import settings
 from ..models.schema import ProcessedChunk
+from ..utils.helpers import LoggingHelpers
+from ..utils.metrics import Trace, metrics, timed_stage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(title="Stratos API")
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify your frontend URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 # Request/Response Models
 class SearchRequest(BaseModel):
     query: str
+    debug: bool = False  # Include the per-stage trace in the response
 
 class SearchResponse(BaseModel):
     answer: str
     sources: List[str]
+    debug: Optional[Dict[str, Any]] = None
 
 # Initialize pipeline components
 class SearchPipeline:
+    """
+    The search pipeline and the stages it is built from.
+
+    Creating the pipeline is cheap: stages, and the models behind them, are
+    only loaded by ``load``, which the app runs in the background on
+    startup. Until every stage is ready the pipeline reports itself as not
+    ready, or, in degraded mode, serves requests without the optional
+    stages that are still loading.
+
+    With ``model_server.enabled`` the models live in a separate model server
+    process, and the model-backed stages are thin clients of it, so every
+    API worker shares one copy of each model. A stage is then ready once
+    the server has loaded it.
+    """
+
+    STAGES = {
+        'query_decomposer': QueryDecomposer,
+        'query_router': QueryRouter,
+        'retriever': Retriever,
+        'processor': Processor,
+        'reranker': Reranker,
+        'response_generator': ResponseGenerator,
+        'answer_cache': AnswerCache,
+    }
+
+    # Stages a request can skip in degraded mode
+    OPTIONAL_STAGES = {'query_decomposer', 'query_router', 'reranker', 'answer_cache'}
+
     def __init__(self):
-        self.query_decomposer = QueryDecomposer()
-        self.retriever = Retriever()
-        self.processor = Processor()
-        self.response_generator = ResponseGenerator()
+        self.params = settings.STARTUP_PARAMS
+        self.degraded_mode = self.params.get('degraded_mode', False)
+        self.model_client = ModelClient() if settings.MODEL_SERVER_PARAMS.get('enabled') else None
+
+        self.query_decomposer: Optional[QueryDecomposer] = None
+        self.query_router: Optional[QueryRouter] = None
+        self.retriever: Optional[Retriever] = None
+        self.processor: Optional[Processor] = None
+        self.reranker: Optional[Reranker] = None
+        self.response_generator: Optional[ResponseGenerator] = None
+        self.answer_cache: Optional[AnswerCache] = None
+
+        self.status: Dict[str, str] = {name: "pending" for name in self.STAGES}
+        self.load_seconds: Dict[str, float] = {}
+        self.warm_up_task: Optional[asyncio.Task] = None
+
+    async def _build_stage(self, name: str) -> Any:
+        """Build one stage, or connect its thin client once the model server has loaded it."""
+        if self.model_client is None:
+            # In a worker thread, so the event loop keeps serving
+            return await asyncio.to_thread(self.STAGES[name])
+
+        if name == 'retriever':
+            # Searching and fetching run in the worker, the vector index in the model server
+            await self.model_client.wait_ready('vector_store')
+            return await asyncio.to_thread(Retriever, RemoteVectorStore(self.model_client))
+
+        await self.model_client.wait_ready(name)
+        return REMOTE_STAGES[name](self.model_client)
+
+    async def _load_stage(self, name: str, limit: asyncio.Semaphore) -> None:
+        """Load one stage without blocking the event loop."""
+        async with limit:
+            self.status[name] = "loading"
+            started_at = time.perf_counter()
+            try:
+                stage = await self._build_stage(name)
+            except Exception as e:
+                self.status[name] = "failed"
+                logger.error(f"\n////////// Failed to load {name}: {str(e)} //////////\n")
+                return
+
+        setattr(self, name, stage)
+        self.load_seconds[name] = round(time.perf_counter() - started_at, 2)
+        self.status[name] = "ready"
+        logger.info(f"\n////////// Loaded {name} in {self.load_seconds[name]}s //////////\n")
+
+        if name == 'query_decomposer' and self.model_client is None:
+            # Warm the decomposition cache as soon as the decomposer can run, the model server warms its own
+            self.warm_up_task = asyncio.ensure_future(stage.warm_up())
+
+    async def load(self) -> None:
+        """Load every stage, up to ``startup.load_workers`` at a time."""
+        # Thin clients only wait on the model server, which limits its own loading
+        workers = len(self.STAGES) if self.model_client is not None else self.params.get('load_workers', len(self.STAGES))
+        limit = asyncio.Semaphore(workers)
+        await asyncio.gather(*(self._load_stage(name, limit) for name in self.STAGES))
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Report whether the pipeline can serve requests.
+
+        The pipeline is ready once every stage is loaded, or in degraded
+        mode once every stage outside ``OPTIONAL_STAGES`` is.
+        """
+        loaded = {name for name, status in self.status.items() if status == "ready"}
+        required = set(self.STAGES) - self.OPTIONAL_STAGES if self.degraded_mode else set(self.STAGES)
+        ready = required <= loaded
+        return {
+            'ready': ready,
+            'degraded': ready and loaded != set(self.STAGES),
+            'stages': dict(self.status),
+            'load_seconds': dict(self.load_seconds)
+        }
+
+    def check_ready(self) -> None:
+        """Raise a 503 if the pipeline can't serve requests yet."""
+        if not self.readiness()['ready']:
+            raise HTTPException(
+                status_code=503,
+                detail="Models are still loading",
+                headers={"Retry-After": str(self.params.get('retry_after', 10))}
+            )
+
+    async def close(self) -> None:
+        """Release every stage that was loaded."""
+        if self.warm_up_task is not None:
+            self.warm_up_task.cancel()
+        if self.retriever is not None:
+            await self.retriever.close()
+        for stage in (self.query_decomposer, self.query_router, self.processor, self.reranker, self.response_generator, self.answer_cache):
+            if stage is not None:
+                stage.close()
+        if self.model_client is not None:
+            self.model_client.close()
+
+    async def model_report(self) -> Dict[str, Any]:
+        """Get model memory, model-backed cache counters and inference queues, from the model server if enabled."""
+        if self.model_client is not None:
+            return await self.model_client.report()
+
+        return {
+            'models': model_registry.memory_report(),
+            'caches': model_cache_stats(
+                answer_cache=self.answer_cache,
+                vector_store=self.retriever.vector_store if self.retriever is not None else None,
+                query_decomposer=self.query_decomposer,
+                response_generator=self.response_generator,
+                processor=self.processor
+            ),
+            'inference': inference_executor.stats()
+        }
+
+    async def _decompose(self, query: str) -> List[str]:
+        """
+        Decompose the query, or search for it as-is when the router finds it
+        simple or while the decomposer is loading.
+        """
+        if self.query_decomposer is None:
+            logger.info("\n////////// Decomposer still loading, searching the query as-is //////////\n")
+            return [query]
+
+        # Every query is decomposed while the router is loading
+        router = self.query_router
+        if router is not None:
+            with timed_stage("route") as stage:
+                route = await router(query)
+                stage.update(route._asdict())
+            if not route.decompose:
+                logger.info("\n////////// Simple query, searching it as-is //////////\n")
+                return [query]
+
+        # Cache hits cost no model time, so only decompositions that ran count
+        decomposition = await self.query_decomposer.decompose_timed(query)
+        if router is not None and decomposition.seconds is not None:
+            router.observe_decomposition(decomposition.seconds, query)
+        return decomposition.sub_queries
+
+    async def _retrieve_chunks(self, sub_query: str, index: int) -> List[ProcessedChunk]:
+        """Retrieve chunks for one sub-query."""
+        logger.info(f"\n////////// Processing sub-query {index+1}: {sub_query} //////////\n")
+        with timed_stage("retrieve", sub_query=index) as stage:
+            chunks = await self.retriever(sub_query)
+            stage['chunks'] = len(chunks)
+        return chunks
+
+    async def _retrieved_batches(self, sub_queries: List[str]) -> AsyncIterator[Tuple[int, List[ProcessedChunk]]]:
+        """Yield each sub-query's chunks as soon as its retrieval finishes."""
+        async def retrieve(sub_query: str, index: int):
+            return index, await self._retrieve_chunks(sub_query, index)
+
+        retrievals = [asyncio.ensure_future(retrieve(sub_query, index)) for index, sub_query in enumerate(sub_queries)]
+        try:
+            for retrieval in asyncio.as_completed(retrievals):
+                yield await retrieval
+        finally:
+            # Stop outstanding searches if the consumer went away early
+            for retrieval in retrievals:
+                retrieval.cancel()
+
+    async def _summarize_long(self, query: str, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        """Summarize the chunks too long for their share of the answer prompt, keeping the rest as they are."""
+        with timed_stage("prompt_fit", chunks=len(chunks)) as stage:
+            fits = await self.response_generator.fits_prompt(query, chunks)
+            stage['kept'] = sum(fits)
+
+        long_chunks = [chunk for chunk, fit in zip(chunks, fits) if not fit]
+        summaries = iter(await self.processor.summarize_chunks(long_chunks) if long_chunks else [])
+        return [chunk if fit else next(summaries) for chunk, fit in zip(chunks, fits)]
+
+    async def _stream_chunks(self, query: str, sub_queries: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Retrieve, clean, rank and summarize chunks as a streaming pipeline.
+
+        Each sub-query's chunks are cleaned, deduplicated and scored as soon
+        as its search lands, while other searches are still running. Chunks
+        that enter the running top-k are summarized straight away, so little
+        summarization is left once the last search finishes. A chunk pushed
+        out of the top-k later costs one wasted summary, which still goes
+        into the summary cache.
+
+        Yields a "sources" event per sub-query, then a "chunks" event with the
+        summarized chunks, most relevant first.
+        """
+        seen = self.processor.duplicate_filter()
+        reranker = self.reranker
+
+        async def prepare(batch):
+            index, chunks = batch
+            return index, chunks, self.processor.prepare(chunks, seen=seen, strict=False)
+
+        async def score(batch):
+            index, chunks, unique_chunks = batch
+            if reranker is None:
+                return index, chunks, unique_chunks
+            return index, chunks, await reranker.score(query, unique_chunks)
+
+        engine = StreamPipeline([
+            PipelineStage("prepare", prepare),
+            PipelineStage("score", score, workers=2)
+        ])
+
+        top_k = reranker.top_k if reranker is not None and reranker.enabled else None
+        ranked: List[Tuple[Tuple[float, int, int], ProcessedChunk]] = []
+        summarizing: List[Tuple[List[ProcessedChunk], asyncio.Task]] = []
+        try:
+            async with aclosing(engine.run(self._retrieved_batches(sub_queries))) as batches:
+                async for index, chunks, scored_chunks in batches:
+                    yield {"event": "sources", "index": index, "sources": list(dict.fromkeys(chunk.source for chunk in chunks))}
+
+                    # Best score first, then sub-query order, then order within the sub-query
+                    ranked.extend(((-chunk.score, index, position), chunk) for position, chunk in enumerate(scored_chunks))
+                    ranked.sort(key=lambda entry: entry[0])
+
+                    # Start summarizing the chunks of this batch that made the running top-k
+                    top = {id(chunk) for _, chunk in ranked[:top_k]}
+                    entrants = [chunk for chunk in scored_chunks if id(chunk) in top]
+                    if entrants:
+                        summarizing.append((entrants, asyncio.ensure_future(self._summarize_long(query, entrants))))
+
+            if not ranked:
+                raise ValueError("No valid chunks after cleaning")
+
+            logger.info(f"\n////////// Waiting for {len(summarizing)} summary batches //////////\n")
+            with timed_stage("summarize_wait") as stage:
+                results = await asyncio.gather(*[task for _, task in summarizing])
+                summarized = {
+                    id(chunk): summary
+                    for (entrants, _), summaries in zip(summarizing, results)
+                    for chunk, summary in zip(entrants, summaries)
+                }
+                processed_chunks = [summarized[id(chunk)] for _, chunk in ranked[:top_k]]
+                stage['discarded'] = len(summarized) - len(processed_chunks)
+
+            yield {"event": "chunks", "chunks": processed_chunks}
+
+        finally:
+            for _, task in summarizing:
+                task.cancel()
 
     async def process_query(self, query: str) -> SearchResponse:
         """
         Process a search query through the entire pipeline.
         """
         try:
+            # Serve repeated and near-identical queries from the answer cache
+            answer_cache = self.answer_cache
+            with timed_stage("answer_cache") as stage:
+                cached = await answer_cache.get(query) if answer_cache is not None else None
+                stage['hit'] = cached is not None
+            if cached is not None:
+                logger.info(f"\n////////// Serving cached answer //////////\n")
+                return SearchResponse(**cached)
+
             # Step 1: Decompose query into sub-queries
             logger.info(f"\n////////// Decomposing query //////////\n")
-            sub_queries = await self.query_decomposer(query)
-
-            # Step 2: Retrieve and process chunks for each sub-query in parallel
-            async def retrieve_chunks(sub_query: str, index: int) -> List[ProcessedChunk]:
-                logger.info(f"\n////////// Processing sub-query {index+1}: {sub_query} //////////\n")
-                return await self.retriever(sub_query)
+            with timed_stage("decompose") as stage:
+                sub_queries = await self._decompose(query)
+                stage['sub_queries'] = len(sub_queries)
 
-            # Use asyncio.gather to retrieve the sub-queries in parallel and log the sub-query index
-            all_chunks_nested = await asyncio.gather(*[retrieve_chunks(sub_query, index) for index, sub_query in enumerate(sub_queries)])
-
-            # Flatten the list of lists into a single flat list of ProcessedChunk objects
-            all_chunks = list(chain.from_iterable(all_chunks_nested))
-
-            # Step 3: Process chunks (ensure it's a flat list)
-            logger.info(f"\n////////// Processing {len(all_chunks)} chunks //////////\n")
-            processed_chunks = await self.processor(all_chunks)
+            # Steps 2-3: Retrieve, rerank and summarize chunks, each sub-query flowing on as its search lands
+            processed_chunks: List[ProcessedChunk] = []
+            async with aclosing(self._stream_chunks(query, sub_queries)) as events:
+                async for event in events:
+                    if event["event"] == "chunks":
+                        processed_chunks = event["chunks"]
 
             # Step 4: Generate response
             logger.info("\n////////// Generating final response //////////\n")
-            response = await self.response_generator(query, processed_chunks)
+            with timed_stage("generate"):
+                response = await self.response_generator(query, processed_chunks)
 
-            return SearchResponse(
+            # Sources of the chunks that made it into the prompt
+            search_response = SearchResponse(
                 answer=response.answer,
-                sources=list(set(chunk.source for chunk in processed_chunks))
+                sources=response.sources
             )
 
+            # Only cache real answers, not the generator's failure message
+            if response.sources and answer_cache is not None:
+                await answer_cache.set(query, search_response.model_dump())
+
+            return search_response
+
         except Exception as e:
             logger.error(f"\n////////// Pipeline error: {str(e)} //////////\n")
             raise HTTPException(
@@ -85,9 +362,96 @@ class SearchPipeline:
                 detail=f"Search pipeline error: {str(e)}"
             )
 
-# Initialize pipeline
+    async def stream_query(self, query: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a search query, yielding progress events as each stage finishes
+        and answer text as it is generated.
+
+        Events are dictionaries with an "event" key:
+            sub_queries - the decomposed sub-queries
+            sources     - sources found for one sub-query
+            summaries   - number of chunks ready for generation
+            token       - a piece of the answer
+            answer      - the complete answer and its sources
+            error       - the pipeline failed
+        """
+        try:
+            # Serve repeated and near-identical queries from the answer cache
+            answer_cache = self.answer_cache
+            with timed_stage("answer_cache") as stage:
+                cached = await answer_cache.get(query) if answer_cache is not None else None
+                stage['hit'] = cached is not None
+            if cached is not None:
+                logger.info(f"\n////////// Serving cached answer //////////\n")
+                yield {"event": "answer", **cached}
+                return
+
+            # Step 1: Decompose query into sub-queries
+            logger.info(f"\n////////// Decomposing query //////////\n")
+            with timed_stage("decompose") as stage:
+                sub_queries = await self._decompose(query)
+                stage['sub_queries'] = len(sub_queries)
+            yield {"event": "sub_queries", "sub_queries": sub_queries}
+
+            # Steps 2-3: Retrieve, rerank and summarize chunks, reporting each sub-query as it lands
+            processed_chunks: List[ProcessedChunk] = []
+            async with aclosing(self._stream_chunks(query, sub_queries)) as events:
+                async for event in events:
+                    if event["event"] == "sources":
+                        yield {"event": "sources", "sub_query": sub_queries[event["index"]], "sources": event["sources"]}
+                    else:
+                        processed_chunks = event["chunks"]
+            yield {"event": "summaries", "count": len(processed_chunks)}
+
+            # Step 4: Stream the response as it is generated
+            logger.info("\n////////// Streaming final response //////////\n")
+            answer_parts = []
+            with timed_stage("generate"):
+                # Only the chunks that fit the prompt are sources of the answer
+                processed_chunks = await self.response_generator.pack_chunks(query, processed_chunks)
+                # Closing the stream when the client goes away stops generation
+                async with aclosing(self.response_generator.stream(query, processed_chunks)) as texts:
+                    async for text in texts:
+                        answer_parts.append(text)
+                        yield {"event": "token", "text": text}
+
+            search_response = SearchResponse(
+                answer="".join(answer_parts).strip(),
+                sources=merged_sources(processed_chunks)
+            )
+            if search_response.answer and answer_cache is not None:
+                await answer_cache.set(query, search_response.model_dump())
+
+            yield {"event": "answer", **search_response.model_dump()}
+
+        except Exception as e:
+            logger.error(f"\n////////// Pipeline error: {str(e)} //////////\n")
+            yield {"event": "error", "detail": f"Search pipeline error: {str(e)}"}
+
+# Initialize pipeline, its stages are loaded on startup
 pipeline = SearchPipeline()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the pipeline in the background, then release it on shutdown"""
+    app.state.loading = asyncio.create_task(pipeline.load())
+    yield
+    app.state.loading.cancel()
+    await pipeline.close()
+    inference_executor.shutdown()
+
+# Initialize FastAPI app
+app = FastAPI(title="Stratos API", lifespan=lifespan)
+
+# Configure CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # In production, specify your frontend URL
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -96,16 +460,81 @@ async def root():
         "message": "Stratos API is running"
     }
 
-@app.post("/api/search", response_model=SearchResponse)
-async def search(request: SearchRequest):
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe, answers as soon as the server is up"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe, 503 until the pipeline can serve requests"""
+    report = pipeline.readiness()
+    return JSONResponse(status_code=200 if report['ready'] else 503, content=report)
+
+@app.get("/api/models")
+async def models():
+    """Report memory use of every loaded model"""
+    return (await pipeline.model_report())['models']
+
+@app.get("/api/cache")
+async def cache_stats():
+    """Report cache hit, miss and eviction counters of the loaded stages"""
+    stats = (await pipeline.model_report())['caches']
+    if pipeline.retriever is not None:
+        stats["search"] = pipeline.retriever.search_cache.stats()
+        stats["pages"] = pipeline.retriever.page_fetcher.stats()
+    return stats
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Expose pipeline metrics in the Prometheus text format"""
+    for model_name, stats in (await pipeline.model_report())['inference'].items():
+        metrics.set_gauge("stratos_inference_queue_depth", stats['queued'], {"model": model_name})
+
+    for stage_name, status in pipeline.status.items():
+        metrics.set_gauge("stratos_stage_ready", int(status == "ready"), {"stage": stage_name})
+
+    caches = await cache_stats()
+    if "pages" in caches:
+        for counter in ("revalidations", "not_modified", "failures"):
+            metrics.set_gauge(f"stratos_page_fetch_{counter}", caches["pages"][counter])
+
+    for cache_name, stats in caches.items():
+        stats = stats.get('exact', stats)
+        if "hits" not in stats:
+            continue
+        for counter in ("hits", "misses", "evictions"):
+            metrics.set_gauge(f"stratos_cache_{counter}", stats[counter], {"cache": cache_name})
+
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _record_request(endpoint: str, query: str, trace: Trace, status: str) -> None:
+    """Record request latency and outcome"""
+    metrics.inc("stratos_requests_total", labels={"endpoint": endpoint, "status": status})
+    seconds = trace.as_dict()["total_seconds"]
+    metrics.observe("stratos_request_seconds", seconds, {"endpoint": endpoint})
+    LoggingHelpers.log_query(query, seconds)
+
+@app.post("/api/search", response_model=SearchResponse, response_model_exclude_none=True)
+async def search(request: SearchRequest, http_response: Response):
     """
     Process a search query and return the response.
     """
+    pipeline.check_ready()
+
+    trace = Trace(request.query)
+    status = "error"
     try:
         logger.info(f"\n////////// Received search request: {request.query} //////////\n")
 
-        # Process the query through the pipeline
-        response = await pipeline.process_query(request.query)
+        # Process the query through the pipeline, recording every stage into the trace
+        with trace:
+            response = await pipeline.process_query(request.query)
+        status = "ok"
+
+        http_response.headers["X-Trace-ID"] = trace.trace_id
+        if request.debug:
+            response.debug = trace.as_dict()
 
         logger.info("\n////////// Search request completed successfully //////////\n")
         return response
@@ -120,6 +549,41 @@ async def search(request: SearchRequest):
             status_code=500,
             detail="An unexpected error occurred while processing your request"
         )
+    finally:
+        _record_request("search", request.query, trace, status)
+
+@app.post("/api/search/stream")
+async def search_stream(request: SearchRequest):
+    """
+    Process a search query, streaming progress events and answer tokens
+    as newline-delimited JSON.
+    """
+    pipeline.check_ready()
+    logger.info(f"\n////////// Received streaming search request: {request.query} //////////\n")
+
+    trace = Trace(request.query)
+
+    async def events():
+        status = "error"
+        try:
+            with trace:
+                async with aclosing(pipeline.stream_query(request.query)) as pipeline_events:
+                    async for event in pipeline_events:
+                        if event["event"] == "answer":
+                            status = "ok"
+                        yield json.dumps(event) + "\n"
+
+            if request.debug:
+                yield json.dumps({"event": "debug", **trace.as_dict()}) + "\n"
+        finally:
+            _record_request("search_stream", request.query, trace, status)
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        # Ask proxies not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Trace-ID": trace.trace_id}
+    )
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -16,14 +16,39 @@ class Settings:
         self._initialize_settings()
 
     def _load_yaml_config(self) -> Dict[str, Any]:
-        """Load configuration from YAML file"""
+        """
+        Load configuration from YAML file
+
+        STRATOS_CONFIG can name a second YAML file whose values override
+        config.yml, e.g. to swap in tiny models for benchmarks.
+        """
         config_path = Path(__file__).parent / "config.yml"
 
         if not config_path.exists():
             raise FileNotFoundError(f"Configuration file not found: {config_path}")
 
         with open(config_path, "r") as f:
-            return yaml.safe_load(f)
+            config = yaml.safe_load(f)
+
+        override_path = os.getenv("STRATOS_CONFIG")
+        if override_path:
+            if not Path(override_path).exists():
+                raise FileNotFoundError(f"Configuration override not found: {override_path}")
+            with open(override_path, "r") as f:
+                config = self._merge(config, yaml.safe_load(f) or {})
+
+        return config
+
+    @classmethod
+    def _merge(cls, base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+        """Recursively merge override into base, override values winning"""
+        merged = dict(base)
+        for key, value in override.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = cls._merge(merged[key], value)
+            else:
+                merged[key] = value
+        return merged
 
     def _initialize_settings(self) -> None:
         """Initialize all settings from YAML and environment variables"""
@@ -35,6 +60,7 @@ class Settings:
         # Google API Settings
         self.GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY")
         self.GOOGLE_CSE_ID: str = os.getenv("GOOGLE_CSE_ID")
+        self.GOOGLE_SEARCH_ENDPOINT: str = os.getenv("GOOGLE_SEARCH_ENDPOINT", self.config["source"]["endpoint"])
 
         # Hugging Face API Settings
         self.HUGGINGFACE_API_KEY: str = os.getenv("HUGGINGFACE_API_KEY")
@@ -45,6 +71,7 @@ class Settings:
         # Query Decomposer settings
         self.QUERY_DECOMPOSER_MODEL: str = self.config["agents"]["query_decomposer"]["model"]
         self.QUERY_DECOMPOSER_PARAMS: Dict[str, Any] = self.config["agents"]["query_decomposer"]["parameters"]
+        self.QUERY_DECOMPOSER_DEVICE: Dict[str, str] = self.config["agents"]["query_decomposer"]["device"]
 
         # Chunk Processor settings
         self.CHUNK_PROCESSOR_MODEL: str = self.config["agents"]["chunk_processor"]["model"]
@@ -53,19 +80,53 @@ class Settings:
         # Result Reranker settings
         self.RERANKER_MODEL: str = self.config["agents"]["result_reranker"]["model"]
         self.RERANKER_PARAMS: Dict[str, Any] = self.config["agents"]["result_reranker"]["parameters"]
+        self.RERANKER_DEVICE: Dict[str, str] = self.config["agents"]["result_reranker"]["device"]
 
         # Response Generator settings
         self.RESPONSE_GENERATOR_MODEL: str = self.config["agents"]["response_generator"]["model"]
         self.RESPONSE_GENERATOR_PARAMS: Dict[str, Any] = self.config["agents"]["response_generator"]["parameters"]
         self.RESPONSE_GENERATOR_DEVICE: Dict[str, str] = self.config["agents"]["response_generator"]["device"]
 
+        # Query routing settings
+        self.ROUTING_PARAMS: Dict[str, Any] = self.config.get("routing", {'enabled': False})
+
+        # Decoding profiles and per-stage generation settings
+        self.DECODING_PARAMS: Dict[str, Any] = self.config["decoding"]
+
+        # Inference executor settings
+        self.INFERENCE_PARAMS: Dict[str, Any] = self.config["inference"]
+
+        # Startup settings
+        self.STARTUP_PARAMS: Dict[str, Any] = self.config["startup"]
+
+        # Model server settings
+        self.MODEL_SERVER_PARAMS: Dict[str, Any] = self.config.get("model_server", {'enabled': False})
+
+        # Cache settings
+        self.ANSWER_CACHE_PARAMS: Dict[str, Any] = self.config["cache"]["answer"]
+        self.SEARCH_CACHE_PARAMS: Dict[str, Any] = self.config["cache"]["search"]
+        self.DECOMPOSITION_CACHE_PARAMS: Dict[str, Any] = self.config["cache"]["decomposition"]
+        self.SUMMARY_CACHE_PARAMS: Dict[str, Any] = self.config["cache"]["summary"]
+
+        # Local vector index settings
+        self.VECTOR_INDEX_PARAMS: Dict[str, Any] = self.config["vector_index"]
+
         # Source settings
         self.SOURCE_NUM: int = self.config["source"]["num_sources"]
+        self.SOURCE_PARAMS: Dict[str, Any] = self.config["source"]
+
+        # Page fetch settings
+        self.FETCH_PARAMS: Dict[str, Any] = self.config["fetch"]
 
         # Processing settings
         self.MAX_CHUNKS: int = self.config["processing"]["max_chunks"]
         self.MIN_CHUNK_LENGTH: int = self.config["processing"]["min_chunk_length"]
         self.MAX_SUMMARY_LENGTH: int = self.config["processing"]["max_summary_length"]
+        self.SUMMARY_BATCH_SIZE: int = self.config["processing"]["summary_batch_size"]
+        self.SUMMARY_BATCH_TOKENS: int = self.config["processing"]["summary_batch_tokens"]
+        self.SUMMARY_MODEL: str = self.config["processing"].get("summary_model", "t5-small")
+        self.SUMMARY_DEVICE: Dict[str, str] = self.config["processing"]["summary_device"]
+        self.NEAR_DUPLICATE_PARAMS: Dict[str, Any] = self.config["processing"].get("near_duplicates", {})
 
     @property
     def model_dtype(self) -> str:
@@ -79,8 +140,8 @@ class Settings:
 
     @property
     def generation_params(self) -> Dict[str, Any]:
-        """Get all generation parameters"""
-        return self.RESPONSE_GENERATOR_PARAMS
+        """Get the response generator's decoding settings"""
+        return self.DECODING_PARAMS["stages"]["generate"]
 
     @property
     def api_url(self) -> str:
@@ -0,0 +1,154 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import logging
+import numpy as np
+from ..config.settings import settings
+from ..utils.cache import CacheStats, TTLCache
+from ..utils.helpers import SearchHelpers
+from .executor import inference_executor
+from .model_registry import model_registry, load_sentence_encoder
+
+class AnswerCache:
+    """
+    Layered cache of final answers in front of the search pipeline.
+
+    The first layer is an exact cache keyed by the normalized query, with
+    TTL and LRU eviction, optionally backed by an on-disk store. The second
+    layer embeds queries and serves the answer of an earlier query whose
+    embedding is close enough to the new one. The semantic index lives in
+    memory and refills as queries are answered.
+    """
+
+    def __init__(self):
+        self._setup_logging()
+        self.params = settings.ANSWER_CACHE_PARAMS
+        self.enabled = self.params.get('enabled', True)
+        self.semantic = self.enabled and self.params.get('semantic', True)
+        self.similarity_threshold = self.params.get('similarity_threshold', 0.92)
+
+        self.store = TTLCache(
+            max_size=self.params.get('max_size', 1024),
+            ttl=self.params.get('ttl'),
+            disk_path=self.params.get('disk_path'),
+            disk_max_size=self.params.get('disk_max_size')
+        )
+        self.semantic_stats = CacheStats()
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        self.handle = None
+        if self.semantic:
+            self.handle = model_registry.acquire(
+                settings.RERANKER_MODEL,
+                dtype=settings.RERANKER_DEVICE['dtype'],
+                device_map=settings.RERANKER_DEVICE['map'],
+                loader=load_sentence_encoder,
+                quantize=settings.RERANKER_DEVICE.get('quantize')
+            )
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Embed a query as a unit vector."""
+        return self.handle.model.encode(
+            [text],
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )[0].astype(np.float32)
+
+    def _nearest(self, embedding: np.ndarray) -> Optional[str]:
+        """Find the cached query most similar to an embedding, if close enough."""
+        if not self._embeddings:
+            return None
+
+        keys = list(self._embeddings)
+        similarities = np.stack(list(self._embeddings.values())) @ embedding
+        best = int(np.argmax(similarities))
+
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return keys[best]
+
+    async def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached answer for a query.
+
+        Args:
+            query (str): Search query
+
+        Returns:
+            Optional[Dict[str, Any]]: Cached response, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = SearchHelpers.normalize_query(query)
+        response = self.store.get(key)
+        if response is not None or not self.semantic:
+            return response
+
+        try:
+            embedding = await inference_executor.run(settings.RERANKER_MODEL, self._embed, key)
+        except Exception as e:
+            self.logger.error(f"Error embedding query for answer cache: {str(e)}")
+            return None
+
+        match = self._nearest(embedding)
+        entry = self.store.get_entry(match) if match is not None else None
+
+        # Drop index entries whose answer has expired or been evicted
+        if match is not None and (entry is None or (self.store.ttl is not None and entry[1] > self.store.ttl)):
+            self._embeddings.pop(match, None)
+            entry = None
+
+        if entry is None:
+            self.semantic_stats.misses += 1
+            return None
+
+        self.semantic_stats.hits += 1
+        self.logger.info(f"Semantic cache hit: '{key}' matched '{match}'")
+        return entry[0]
+
+    async def set(self, query: str, response: Dict[str, Any]) -> None:
+        """
+        Store the answer to a query.
+
+        Args:
+            query (str): Search query
+            response (Dict[str, Any]): JSON-serialisable response
+        """
+        if not self.enabled:
+            return
+
+        key = SearchHelpers.normalize_query(query)
+        self.store.set(key, response)
+
+        if not self.semantic:
+            return
+
+        try:
+            self._embeddings[key] = await inference_executor.run(settings.RERANKER_MODEL, self._embed, key)
+        except Exception as e:
+            self.logger.error(f"Error embedding query for answer cache: {str(e)}")
+            return
+
+        self._embeddings.move_to_end(key)
+        while len(self._embeddings) > self.store.memory.max_size:
+            self._embeddings.popitem(last=False)
+            self.semantic_stats.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters for both layers."""
+        return {
+            'entries': len(self.store),
+            'exact': self.store.stats.as_dict(),
+            'semantic': self.semantic_stats.as_dict()
+        }
+
+    def close(self) -> None:
+        """Close the disk store and release the embedding model."""
+        self.store.close()
+        if self.handle is not None:
+            self.handle.release()
@@ -0,0 +1,120 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+from ..config.settings import settings
+from ..utils.metrics import metrics, timed_stage
+from .executor import inference_executor
+
+BatchFunction = Callable[[List[Any]], List[Any]]
+
+class DynamicBatcher:
+    """
+    Groups model calls from concurrent requests into batches.
+
+    The first item to arrive opens a batch, which is sent to the inference
+    executor once ``max_wait_ms`` has passed, ``max_batch_size`` items have
+    joined, or the padded batch would exceed ``max_batch_tokens``. The batch
+    function gets the items in arrival order and must return one result per
+    item, which is handed back to the caller that submitted it.
+    """
+
+    def __init__(self, name: str, model_name: str, fn: BatchFunction):
+        self._setup_logging()
+        self.name = name
+        self.model_name = model_name
+        self.fn = fn
+
+        self.params = settings.INFERENCE_PARAMS.get('batching', {})
+        self.enabled = self.params.get('enabled', True)
+        self.max_batch_size = self.params.get('max_batch_size', 8)
+        self.max_batch_tokens = self.params.get('max_batch_tokens', 8192)
+        self.max_wait = self.params.get('max_wait_ms', 10) / 1000
+
+        self._pending: List[Tuple[Any, int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Batches in flight; the event loop only keeps weak references to tasks
+        self._running: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _fits(self, cost: int) -> bool:
+        """Check whether an item of the given cost fits in the open batch."""
+        if len(self._pending) >= self.max_batch_size:
+            return False
+        # Rows are padded to the longest one, so the batch costs its longest row times its size
+        longest = max([cost] + [pending_cost for _, pending_cost, _ in self._pending])
+        return longest * (len(self._pending) + 1) <= self.max_batch_tokens
+
+    def _flush(self) -> None:
+        """Send the open batch to the inference executor."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, int, asyncio.Future]]) -> None:
+        """Run one batch and hand each caller its result."""
+        self.batches += 1
+        self.items += len(batch)
+        metrics.observe("stratos_batch_size", len(batch), {"stage": self.name})
+
+        try:
+            results = await inference_executor.run(self.model_name, self.fn, [item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result((result, len(batch)))
+
+    async def submit(self, item: Any, cost: int = 1) -> Any:
+        """
+        Add an item to the next batch and wait for its result.
+
+        Args:
+            item (Any): Input for the batch function, e.g. a prompt
+            cost (int): Size of the item in tokens, for the token budget
+
+        Returns:
+            Any: The batch function's result for this item
+        """
+        if not self.enabled:
+            return (await inference_executor.run(self.model_name, self.fn, [item]))[0]
+
+        if self._pending and not self._fits(cost):
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, cost, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        with timed_stage(f"{self.name}.batch") as stage:
+            result, stage['batch_size'] = await future
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Get how many calls were merged into how many batches."""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0
+        }
@@ -1,42 +1,251 @@
-from typing import List, Dict, Any
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import asyncio
+import logging
+import re
+import threading
+import time
+from transformers import AutoTokenizer
 from ..models.schema import ProcessedChunk
 from ..config.settings import settings
 
+# Every model downstream truncates its input at this many tokens, and
+# prompts such as the summarizer's "summarize: " need some of them
+MODEL_MAX_TOKENS = 512
+PROMPT_RESERVE = 16
+
+# Sentences end at ., ! or ? (plus closing quotes or brackets) followed by whitespace, or at a blank line
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n\s*\n")
+WORD = re.compile(r"\S+")
+
+# Sentences tokenized per batched tokenizer call
+TOKENIZE_BATCH = 256
+
+# Seconds to estimate token counts after a tokenizer failed to load, before trying again
+TOKENIZER_RETRY_SECONDS = 300
+
+# Tokenizers loaded in this process, and when each tokenizer last failed to load
+_tokenizers: Dict[str, Any] = {}
+_tokenizer_failures: Dict[str, float] = {}
+_tokenizer_lock = threading.Lock()
+
+
+def tokenizer_pending(name: str) -> bool:
+    """Whether getting the tokenizer means loading it, possibly from the Hub."""
+    if name in _tokenizers:
+        return False
+    failed = _tokenizer_failures.get(name)
+    return failed is None or time.monotonic() - failed >= TOKENIZER_RETRY_SECONDS
+
+
+def load_tokenizer(name: str) -> Optional[Any]:
+    """
+    Get a fast tokenizer, loaded once per process, None while it isn't available.
+
+    A failed load isn't cached for good: token counts are estimated and
+    the load is tried again after ``TOKENIZER_RETRY_SECONDS``.
+    """
+    if not tokenizer_pending(name):
+        return _tokenizers.get(name)
+
+    # One thread loads, the others wait for its outcome instead of loading again
+    with _tokenizer_lock:
+        if not tokenizer_pending(name):
+            return _tokenizers.get(name)
+        try:
+            _tokenizers[name] = AutoTokenizer.from_pretrained(name, use_fast=True, token=settings.HUGGINGFACE_API_KEY)
+        except Exception as e:
+            _tokenizer_failures[name] = time.monotonic()
+            logging.getLogger(__name__).warning(f"Tokenizer {name} unavailable, estimating token counts: {str(e)}")
+            return None
+        _tokenizer_failures.pop(name, None)
+        return _tokenizers[name]
+
+
+def count_tokens(tokenizer: Optional[Any], texts: List[str]) -> List[int]:
+    """Count the tokens of each text in one batched call."""
+    if not texts:
+        return []
+    if tokenizer is None:
+        # About four characters per token in English; counting three per token
+        # and rounding up overestimates, so chunks err short
+        return [len(text) // 3 + 1 for text in texts]
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids']]
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Yield the sentences of a text, whitespace normalized, without copying the whole text."""
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        sentence = " ".join(text[start:match.start()].split())
+        if sentence:
+            yield sentence + (match.group().strip() if not match.group().isspace() else "")
+        start = match.end()
+
+    sentence = " ".join(text[start:].split())
+    if sentence:
+        yield sentence
+
+
+def split_word(word: str, tokenizer: Optional[Any], max_tokens: int) -> List[Tuple[str, int]]:
+    """
+    Split a single "word" longer than ``max_tokens``, e.g. a URL or base64
+    blob, into pieces of at most ``max_tokens`` tokens.
+
+    With a tokenizer the word is cut at token boundaries from its offsets;
+    without one, by the characters the estimate allows per piece.
+    """
+    if tokenizer is None:
+        step = (max_tokens - 1) * 3
+        pieces = [word[start:start + step] for start in range(0, len(word), step)]
+        return list(zip(pieces, count_tokens(None, pieces)))
+
+    offsets = tokenizer(word, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping']
+    # Each piece runs from the start of its first token to the start of the next piece's
+    starts = [0] + [offsets[i][0] for i in range(max_tokens, len(offsets), max_tokens)] + [len(word)]
+    pieces = [word[begin:end] for begin, end in zip(starts, starts[1:]) if begin < end]
+
+    # A piece cut from the middle of a word can tokenize a little differently on
+    # its own, so count it again and split what still doesn't fit
+    split: List[Tuple[str, int]] = []
+    for piece, tokens in zip(pieces, count_tokens(tokenizer, pieces)):
+        if tokens <= max_tokens or len(piece) == len(word):
+            split.append((piece, tokens))
+        else:
+            split.extend(split_word(piece, tokenizer, max_tokens))
+    return split
+
+
+def split_long(sentence: str, tokenizer: Optional[Any], max_tokens: int) -> Iterator[Tuple[str, int]]:
+    """Split a sentence longer than ``max_tokens`` at word boundaries."""
+    words = WORD.findall(sentence)
+    piece: List[str] = []
+    size = 0
+    for word, tokens in zip(words, count_tokens(tokenizer, words)):
+        parts = [(word, tokens)] if tokens <= max_tokens else split_word(word, tokenizer, max_tokens)
+        for part, part_tokens in parts:
+            if piece and size + part_tokens > max_tokens:
+                yield " ".join(piece), size
+                piece, size = [], 0
+            piece.append(part)
+            size += part_tokens
+    if piece:
+        yield " ".join(piece), size
+
+
+def iter_chunks(text: str, tokenizer: Optional[Any], max_tokens: int, overlap_tokens: int) -> Iterator[str]:
+    """
+    Pack whole sentences into chunks of at most ``max_tokens`` tokens.
+
+    Sentences are tokenized in batches as the text is read, so chunks of a
+    long document are produced as they fill up. Consecutive chunks share
+    their boundary sentences, up to ``overlap_tokens`` tokens.
+    """
+    sentences = iter_sentences(text)
+    chunk: List[Tuple[str, int]] = []
+    size = 0
+
+    while True:
+        batch = list(islice(sentences, TOKENIZE_BATCH))
+        if not batch:
+            break
+
+        for sentence, tokens in zip(batch, count_tokens(tokenizer, batch)):
+            pieces = [(sentence, tokens)] if tokens <= max_tokens else split_long(sentence, tokenizer, max_tokens)
+            for piece, piece_tokens in pieces:
+                if chunk and size + piece_tokens > max_tokens:
+                    yield " ".join(part for part, _ in chunk)
+
+                    # Carry the closing sentences over into the next chunk
+                    overlap: List[Tuple[str, int]] = []
+                    carried = 0
+                    for part, part_tokens in reversed(chunk):
+                        if carried + part_tokens > overlap_tokens or carried + part_tokens + piece_tokens > max_tokens:
+                            break
+                        overlap.insert(0, (part, part_tokens))
+                        carried += part_tokens
+                    chunk, size = overlap, carried
+
+                chunk.append((piece, piece_tokens))
+                size += piece_tokens
+
+    if chunk:
+        yield " ".join(part for part, _ in chunk)
+
+
+def split_text(text: str, params: Dict[str, Any], tokenizer_name: str) -> List[str]:
+    """
+    Split text into at most ``max_chunks`` chunks of at least ``min_length`` characters.
+
+    A plain module-level function, so large documents can be split in a
+    process pool. Splitting stops as soon as enough chunks are found.
+    """
+    max_tokens = min(params['size'], MODEL_MAX_TOKENS - PROMPT_RESERVE)
+    chunks = iter_chunks(text, load_tokenizer(tokenizer_name), max_tokens, params['overlap'])
+    return list(islice(
+        (chunk for chunk in chunks if len(chunk) >= params['min_length']),
+        params['max_chunks']
+    ))
+
+
 class Chunker:
     """
-    Responsible for splitting text into chunks using various strategies
-    and preprocessing techniques.
+    Responsible for splitting text into chunks of whole sentences, sized
+    in tokens of the models that read them.
+
+    Chunk sizes are counted with a fast tokenizer, so no chunk is longer
+    than the models' input limit and silently truncated. Large documents
+    are split in a process pool, so many fetched pages can be chunked in
+    parallel without blocking the event loop.
     """
 
     def __init__(self):
+        self._setup_logging()
         self.params = settings.CHUNK_PROCESSOR_PARAMS
-        self.splitter = self._initialize_splitter()
-
-    def _initialize_splitter(self) -> RecursiveCharacterTextSplitter:
-        """Initialize the text splitter with configured parameters."""
-        return RecursiveCharacterTextSplitter(
-            chunk_size=self.params['size'],
-            chunk_overlap=self.params['overlap'],
-            length_function=len,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
-        )
-
-    def _preprocess_text(self, text: str) -> str:
-        """Preprocess text before chunking."""
-        # Remove excessive whitespace
-        text = " ".join(text.split())
-        # Add periods to make sure sentences end properly
-        if text and text[-1] not in ".!?":
-            text += "."
-        return text
-
-    def _filter_chunks(self, chunks: List[str]) -> List[str]:
-        """Filter chunks based on minimum length and other criteria."""
+        # Counted with the summarizer's tokenizer by default, the first model to read every chunk
+        self.tokenizer_name = self.params.get('tokenizer') or settings.SUMMARY_MODEL
+        self.parallel_min_chars = self.params.get('parallel_min_chars', 20000)
+
+        if self.params['size'] > MODEL_MAX_TOKENS - PROMPT_RESERVE:
+            self.logger.warning(
+                f"Chunk size of {self.params['size']} tokens exceeds the models' input limit, "
+                f"using {MODEL_MAX_TOKENS - PROMPT_RESERVE}"
+            )
+
+        # Load the tokenizer now, while the stage is built off the event loop
+        load_tokenizer(self.tokenizer_name)
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the chunking process pool on first use."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.params.get('workers', 2))
+        return self._pool
+
+    def _make_chunks(self, chunks: List[str], metadata: Dict[str, Any]) -> List[ProcessedChunk]:
+        """Wrap chunk texts with the document's metadata."""
         return [
-            chunk for chunk in chunks
-            if len(chunk) >= self.params['min_length']
-        ][:self.params['max_chunks']]
+            ProcessedChunk(
+                text=chunk,
+                source=metadata.get('source', ''),
+                score=metadata.get('score', 0.0),
+                metadata=metadata
+            )
+            for chunk in chunks
+        ]
+
+    def _fallback(self, text: str, metadata: Dict[str, Any]) -> List[ProcessedChunk]:
+        """Return a single chunk if processing fails to ensure we always have valid output."""
+        # Every word is at least one token, so this stays within the size
+        words = (match.group() for match in WORD.finditer(text))
+        return self._make_chunks([" ".join(islice(words, self.params['size']))], metadata)
 
     def process(self, text: str, metadata: Dict[str, Any]) -> List[ProcessedChunk]:
         """
@@ -50,32 +259,51 @@ class Chunker:
             List[ProcessedChunk]: Flat list of processed chunks with metadata
         """
         try:
-            # Preprocess text
-            processed_text = self._preprocess_text(text)
-
-            # Split text into chunks
-            raw_chunks = self.splitter.split_text(processed_text)
-
-            # Filter chunks based on length and other criteria
-            filtered_chunks = self._filter_chunks(raw_chunks)
-
-            # Create ProcessedChunk objects for each filtered chunk and return as a flat list
-            return [
-                ProcessedChunk(
-                    text=chunk,
-                    source=metadata.get('source', ''),
-                    score=metadata.get('score', 0.0),
-                    metadata=metadata
-                )
-                for chunk in filtered_chunks  # Ensure we create a flat list of ProcessedChunks here
-            ]
+            return self._make_chunks(split_text(text, self.params, self.tokenizer_name), metadata)
 
         except Exception as e:
-            print(f"Error in chunk processing: {str(e)}")
+            self.logger.error(f"Error in chunk processing: {str(e)}")
+            return self._fallback(text, metadata)
 
-            # Return single chunk if processing fails to ensure we always have valid output.
-            return [ProcessedChunk(
-                text=text[:self.params['size']],
-                source=metadata.get('source', ''),
-                metadata=metadata
-            )]
\ No newline at end of file
+    async def process_async(self, text: str, metadata: Dict[str, Any]) -> List[ProcessedChunk]:
+        """
+        Process text into chunks without blocking the event loop.
+
+        Texts of at least ``parallel_min_chars`` characters, such as fetched
+        pages, are split in the process pool. Shorter ones, such as
+        snippets, are split inline, where it costs less than a round trip
+        to the pool, unless the tokenizer still has to be loaded, which is
+        done on a thread.
+        """
+        if len(text) < self.parallel_min_chars:
+            if tokenizer_pending(self.tokenizer_name):
+                return await asyncio.to_thread(self.process, text, metadata)
+            return self.process(text, metadata)
+
+        try:
+            chunks = await asyncio.get_running_loop().run_in_executor(
+                self._get_pool(), split_text, text, self.params, self.tokenizer_name
+            )
+            return self._make_chunks(chunks, metadata)
+
+        except Exception as e:
+            self.logger.error(f"Error in chunk processing: {str(e)}")
+            return self._fallback(text, metadata)
+
+    async def process_many(self, documents: List[Tuple[str, Dict[str, Any]]]) -> List[List[ProcessedChunk]]:
+        """
+        Chunk many documents, large ones in parallel across the process pool.
+
+        Args:
+            documents (List[Tuple[str, Dict[str, Any]]]): (text, metadata) of each document
+
+        Returns:
+            List[List[ProcessedChunk]]: Chunks of each document, in order
+        """
+        return list(await asyncio.gather(*(self.process_async(text, metadata) for text, metadata in documents)))
+
+    def close(self) -> None:
+        """Shut down the chunking process pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,121 @@
+from typing import List, NamedTuple, Tuple
+from transformers import PreTrainedTokenizer
+from ..models.schema import ProcessedChunk
+from .prefix_cache import PromptParts
+
+class PackedPrompt(NamedTuple):
+    """A prompt packed into the input budget."""
+    prompt: PromptParts
+    tokens: int                  # Prompt tokens, special tokens included
+    chunks: List[ProcessedChunk] # Chunks that made it into the prompt, in prompt order
+
+class ContextPacker:
+    """
+    Packs the best context chunks into an explicit prompt token budget.
+
+    The instructions and the question are always kept whole; their tokens
+    are reserved first. Chunks are then added best score first, as long as
+    their own tokens still fit, so a long chunk that doesn't fit leaves its
+    room to shorter, lower-scoring ones instead of being cut off. Nothing
+    is truncated afterwards, so no prefill is spent on text that would be
+    thrown away.
+    """
+
+    # Each source is written as "Source <n>: <text>" on its own line
+    LABEL = "Source {}: "
+
+    def __init__(self, tokenizer: PreTrainedTokenizer, budget: int, max_chunks: int):
+        """
+        Args:
+            tokenizer (PreTrainedTokenizer): Tokenizer of the model the prompt is for
+            budget (int): Maximum prompt tokens
+            max_chunks (int): Maximum sources in a prompt
+        """
+        self.tokenizer = tokenizer
+        self.budget = budget
+        self.max_chunks = max_chunks
+
+        # Label and line break of a two-digit source, an upper bound for every source
+        self.source_overhead = self._count([self.LABEL.format(max_chunks if max_chunks >= 10 else 10) + "\n"])[0]
+
+    def _count(self, texts: List[str]) -> List[int]:
+        """Count the tokens of each text in one batched call."""
+        if not texts:
+            return []
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)['input_ids']]
+
+    def chunk_costs(self, chunks: List[ProcessedChunk]) -> List[int]:
+        """Tokens each chunk adds to a prompt, its label included."""
+        return [tokens + self.source_overhead for tokens in self._count([chunk.text for chunk in chunks])]
+
+    @staticmethod
+    def _suffix(context: str, query: str) -> str:
+        return f"""
+{context}
+
+Question: {query}
+
+Answer: """
+
+    def _fit_query(self, query: str, room: int) -> str:
+        """Shorten a question too long for the budget on its own, keeping its start."""
+        ids = self.tokenizer(query, add_special_tokens=False)['input_ids']
+        return self.tokenizer.decode(ids[:max(room, 0)], skip_special_tokens=True)
+
+    def _reserve(self, instructions: str, query: str) -> Tuple[str, int, int]:
+        """
+        Reserve the tokens of the instructions and the question.
+
+        Returns:
+            Tuple[str, int, int]: The question, shortened if it can't fit on
+            its own, the tokens reserved, and the tokens left for chunks
+        """
+        fixed, frame = self._count([instructions, self._suffix("", query)])
+        # Special tokens the tokenizer adds around the whole prompt, such as BOS
+        fixed += len(self.tokenizer("")['input_ids'])
+
+        room = self.budget - fixed - frame
+        if room < 0:
+            query = self._fit_query(query, len(self.tokenizer(query, add_special_tokens=False)['input_ids']) + room)
+            frame = self._count([self._suffix("", query)])[0]
+            room = 0
+        return query, fixed + frame, room
+
+    def fits(self, instructions: str, query: str, chunks: List[ProcessedChunk]) -> List[bool]:
+        """
+        Whether each chunk fits its even share of the room left for chunks.
+
+        Chunks that fit can go into the prompt as they are, so only the
+        others need summarizing.
+        """
+        _, _, room = self._reserve(instructions, query)
+        share = room // self.max_chunks
+        return [cost <= share for cost in self.chunk_costs(chunks)]
+
+    def pack(self, instructions: str, query: str, chunks: List[ProcessedChunk]) -> PackedPrompt:
+        """
+        Build the prompt from the instructions, as many of the best chunks as fit, and the question.
+
+        Args:
+            instructions (str): Fixed instructions the prompt starts with
+            query (str): The question
+            chunks (List[ProcessedChunk]): Candidate context chunks
+
+        Returns:
+            PackedPrompt: The prompt, its token count and the chunks it holds
+        """
+        query, reserved, room = self._reserve(instructions, query)
+
+        # Best score first; skip what doesn't fit and keep filling with the rest
+        ranked = sorted(chunks, key=lambda x: x.score, reverse=True)
+        packed: List[ProcessedChunk] = []
+        used = 0
+        for chunk, cost in zip(ranked, self.chunk_costs(ranked)):
+            if len(packed) >= self.max_chunks:
+                break
+            if used + cost <= room:
+                packed.append(chunk)
+                used += cost
+
+        context = "\n".join(self.LABEL.format(i + 1) + chunk.text for i, chunk in enumerate(packed))
+        return PackedPrompt((instructions, self._suffix(context, query)), reserved + used, packed)
@@ -0,0 +1,133 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+import threading
+import torch
+from transformers import PreTrainedTokenizer, StoppingCriteria, StoppingCriteriaList
+from ..config.settings import settings
+
+class StopOnSequences(StoppingCriteria):
+    """
+    Stops each row of a batch once its generated text contains a stop sequence.
+
+    Only the newest tokens of every row are decoded at each step, so the
+    check stays cheap however long the generation runs.
+    """
+
+    def __init__(self, tokenizer: PreTrainedTokenizer, stop: List[str], prompt_length: int):
+        self.tokenizer = tokenizer
+        self.stop = stop
+        self.prompt_length = prompt_length
+        # Enough tokens to hold the longest stop sequence, even one token per character
+        self.window = max(len(sequence) for sequence in stop) + 2
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        tails = self.tokenizer.batch_decode(
+            input_ids[:, max(self.prompt_length, input_ids.shape[1] - self.window):],
+            skip_special_tokens=True
+        )
+        return torch.tensor(
+            [any(sequence in tail for sequence in self.stop) for tail in tails],
+            dtype=torch.bool,
+            device=input_ids.device
+        )
+
+class StopOnEvent(StoppingCriteria):
+    """Stops every row once the event is set, e.g. when nobody reads the stream anymore."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+class DecodingStrategy:
+    """
+    Generation settings of one stage, built from ``decoding`` in config.yml.
+
+    A stage names a profile (greedy, sampling, beam, ...) and can override
+    any of its settings. Lengths are given as ``max_new_tokens``, so the
+    prompt no longer eats into the output budget, and generation ends early
+    at any of the stage's stop sequences.
+    """
+
+    def __init__(self, stage: str, profile: Optional[str] = None):
+        config = settings.DECODING_PARAMS
+        stage_params = dict(config['stages'][stage])
+
+        self.stage = stage
+        self.profile = profile or stage_params.pop('profile', 'greedy')
+        stage_params.pop('profile', None)
+        self.stop: List[str] = stage_params.pop('stop', None) or []
+
+        if self.profile not in config['profiles']:
+            raise ValueError(f"Unknown decoding profile for {stage}: {self.profile}")
+        self.params: Dict[str, Any] = {**config['profiles'][self.profile], **stage_params}
+
+    def generate_kwargs(
+        self,
+        tokenizer: PreTrainedTokenizer,
+        prompt_length: int,
+        streaming: bool = False,
+        cancel: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Keyword arguments for ``model.generate``.
+
+        Args:
+            tokenizer (PreTrainedTokenizer): Tokenizer used to check stop sequences
+            prompt_length (int): Prompt tokens per row (decoder start tokens for encoder-decoders)
+            streaming (bool): Whether tokens are streamed, which rules out beam search
+            cancel (Optional[threading.Event]): Event that stops generation when set
+
+        Returns:
+            Dict[str, Any]: Generation arguments
+        """
+        kwargs = dict(self.params)
+        if streaming:
+            # Streaming emits one sequence token by token, which beam search can't do
+            kwargs['num_beams'] = 1
+        criteria = StoppingCriteriaList()
+        if self.stop:
+            criteria.append(StopOnSequences(tokenizer, self.stop, prompt_length))
+        if cancel is not None:
+            criteria.append(StopOnEvent(cancel))
+        if criteria:
+            kwargs['stopping_criteria'] = criteria
+        return kwargs
+
+    def _find_stop(self, text: str) -> int:
+        """Position of the first stop sequence in the text, or -1."""
+        positions = [text.find(sequence) for sequence in self.stop]
+        return min((position for position in positions if position >= 0), default=-1)
+
+    def truncate(self, text: str) -> str:
+        """Cut generated text at its first stop sequence."""
+        position = self._find_stop(text)
+        return text[:position] if position >= 0 else text
+
+    async def stream(self, pieces: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Relay streamed text up to the first stop sequence.
+
+        Text that could be the start of a stop sequence is held back until
+        the next piece shows whether it is, so a stop sequence is never
+        partly sent to the client.
+        """
+        held = ""
+        async for piece in pieces:
+            held += piece
+            position = self._find_stop(held)
+            if position >= 0:
+                if position:
+                    yield held[:position]
+                return
+
+            keep = max(
+                (size for sequence in self.stop for size in range(1, len(sequence)) if held.endswith(sequence[:size])),
+                default=0
+            )
+            if len(held) > keep:
+                yield held[:len(held) - keep]
+                held = held[len(held) - keep:]
+
+        if held:
+            yield held
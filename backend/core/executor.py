@@ -0,0 +1,147 @@
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ..config.settings import settings
+from ..utils.metrics import current_trace, record_queue_wait
+
+class InferenceExecutor:
+    """
+    Runs blocking model inference on a bounded worker pool so the event
+    loop keeps serving requests while models generate.
+
+    Every model gets its own bounded queue. Submitting to a full queue waits
+    for a free slot, which pushes back on callers instead of piling up
+    unbounded work behind a slow model.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self._setup_logging()
+        self.params = settings.INFERENCE_PARAMS
+        self.workers = workers or self.params.get('workers', 1)
+        self.queue_size = queue_size or self.params.get('queue_size', 32)
+
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._dispatchers: Dict[str, List[asyncio.Task]] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _get_queue(self, model_name: str) -> asyncio.Queue:
+        """Get the queue for a model, starting its dispatchers on first use."""
+        loop = asyncio.get_running_loop()
+
+        # Queues and dispatcher tasks belong to the loop that created them
+        if self._loop is not loop:
+            self._loop = loop
+            self._queues = {}
+            self._dispatchers = {}
+
+        queue = self._queues.get(model_name)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            self._queues[model_name] = queue
+            self._stats.setdefault(model_name, {
+                'submitted': 0,
+                'completed': 0,
+                'failed': 0,
+                'queue_wait_seconds': 0.0,
+                'run_seconds': 0.0
+            })
+            self._dispatchers[model_name] = [
+                loop.create_task(self._dispatch(model_name, queue))
+                for _ in range(self.workers)
+            ]
+        return queue
+
+    async def _dispatch(self, model_name: str, queue: asyncio.Queue) -> None:
+        """Pull work for one model off its queue and run it on the worker pool."""
+        loop = asyncio.get_running_loop()
+        stats = self._stats[model_name]
+
+        while True:
+            call, future, enqueued_at, trace = await queue.get()
+            try:
+                if future.cancelled():
+                    continue
+
+                started_at = time.perf_counter()
+                stats['queue_wait_seconds'] += started_at - enqueued_at
+                record_queue_wait(model_name, started_at - enqueued_at, trace)
+
+                try:
+                    result = await loop.run_in_executor(self._pool, call)
+                except Exception as e:
+                    stats['failed'] += 1
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    stats['completed'] += 1
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    stats['run_seconds'] += time.perf_counter() - started_at
+            finally:
+                queue.task_done()
+
+    async def submit(self, model_name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> asyncio.Future:
+        """
+        Queue a blocking call against a model.
+
+        Waits while the model's queue is full, then returns a future that
+        resolves with the call's result once a worker has run it.
+
+        Args:
+            model_name (str): Name of the model the call runs on
+            fn (Callable[..., Any]): Blocking function to run
+            *args, **kwargs: Arguments passed to ``fn``
+
+        Returns:
+            asyncio.Future: Future resolving to the result of ``fn``
+        """
+        queue = self._get_queue(model_name)
+        future = asyncio.get_running_loop().create_future()
+
+        # Run the call in the submitter's context so it records into the right request trace
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, *args, **kwargs)
+
+        await queue.put((call, future, time.perf_counter(), current_trace()))
+        self._stats[model_name]['submitted'] += 1
+
+        return future
+
+    async def run(self, model_name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Submit a blocking call and wait for its result."""
+        return await (await self.submit(model_name, fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Get per-model queue depth and throughput counters."""
+        return {
+            model_name: {
+                **counters,
+                'queued': self._queues[model_name].qsize() if model_name in self._queues else 0
+            }
+            for model_name, counters in self._stats.items()
+        }
+
+    def shutdown(self) -> None:
+        """Stop the dispatchers and release the worker threads."""
+        for tasks in self._dispatchers.values():
+            for task in tasks:
+                task.cancel()
+        self._dispatchers = {}
+        self._queues = {}
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Create a global executor shared by every model stage
+inference_executor = InferenceExecutor()
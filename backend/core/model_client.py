@@ -0,0 +1,317 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from contextlib import aclosing
+import asyncio
+import itertools
+import logging
+import zmq
+import zmq.asyncio
+from ..config.settings import settings
+from ..models.schema import ProcessedChunk, SearchResponse
+from ..utils.metrics import current_trace
+from .model_server import CALL, CANCEL, END, ERROR, ITEM, SERVER, decode, encode, secure_address
+from .processor import Processor
+from .query_decomposer import Decomposition
+from .query_router import QueryRouter
+from .reranker import Reranker
+
+class ModelServerError(RuntimeError):
+    """A model server call failed, timed out or named a stage that failed to load."""
+
+class ModelClient:
+    """
+    Connection from an API worker to the model server.
+
+    Calls from every request share one socket. Replies are matched to calls
+    by request id, so a worker can have any number of calls in flight.
+    """
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        self._setup_logging()
+        self.params = params or settings.MODEL_SERVER_PARAMS
+        self.address = self.params.get('address')
+        self.timeout = self.params.get('timeout', 300)
+        self.poll_interval = self.params.get('poll_interval', 1.0)
+
+        self._context = zmq.asyncio.Context()
+        self._socket: Optional[zmq.asyncio.Socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: Dict[bytes, asyncio.Queue] = {}
+        self._ids = itertools.count()
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _connect(self) -> zmq.asyncio.Socket:
+        """Get the socket, connecting and starting the reply reader on first use."""
+        loop = asyncio.get_running_loop()
+
+        # The socket and reader task belong to the loop that created them
+        if self._loop is not loop:
+            try:
+                # Never send pickles to a socket another user could have bound
+                self.address = secure_address(self.params.get('address'))
+            except FileNotFoundError as e:
+                raise ModelServerError(f"The model server has not started yet: {str(e)}")
+
+            if self._socket is not None:
+                self._socket.close()
+            self._loop = loop
+            self._pending = {}
+            self._socket = self._context.socket(zmq.DEALER)
+            self._socket.setsockopt(zmq.LINGER, 0)
+            self._socket.connect(self.address)
+            self._reader = loop.create_task(self._read())
+        return self._socket
+
+    async def _read(self) -> None:
+        """Hand every reply to the call waiting for it."""
+        while True:
+            request_id, kind, body = await self._socket.recv_multipart()
+            queue = self._pending.get(request_id)
+            # Replies to calls that gave up waiting are dropped
+            if queue is not None:
+                queue.put_nowait((kind, body))
+
+    async def _receive(self, request_id: bytes, timeout: float) -> Tuple[bytes, Any]:
+        """Wait for the next reply to a call."""
+        try:
+            kind, body = await asyncio.wait_for(self._pending[request_id].get(), timeout)
+        except asyncio.TimeoutError:
+            raise ModelServerError(f"No reply from the model server at {self.address} within {timeout}s")
+
+        value = decode(body)
+        if kind == ERROR:
+            raise ModelServerError(value)
+        return kind, value
+
+    @staticmethod
+    def _record(stages: List[Dict[str, Any]]) -> None:
+        """Add the stages timed by the server to the request's trace."""
+        trace = current_trace()
+        if trace is None:
+            return
+        for entry in stages:
+            attributes = {key: value for key, value in entry.items() if key not in ('stage', 'seconds', 'offset')}
+            trace.record(entry['stage'], entry['seconds'], **attributes)
+
+    async def _start(self, stage: str, method: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> bytes:
+        """Send a call, returning its request id."""
+        socket = self._connect()
+        request_id = str(next(self._ids)).encode()
+        self._pending[request_id] = asyncio.Queue()
+        await socket.send_multipart([request_id, CALL, encode((stage, method, args, kwargs))])
+        return request_id
+
+    async def _finish(self, request_id: bytes, done: bool) -> None:
+        """Forget a call, asking the server to stop it if it is still running."""
+        self._pending.pop(request_id, None)
+        if not done and self._socket is not None:
+            await self._socket.send_multipart([request_id, CANCEL, b""])
+
+    async def call(self, stage: str, method: str, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Call a stage method on the model server.
+
+        Args:
+            stage (str): Stage name, or "server" for the server itself
+            method (str): Method to call
+            timeout (Optional[float]): Seconds to wait for the reply, defaults to ``model_server.timeout``
+            *args, **kwargs: Arguments passed to the method
+
+        Returns:
+            Any: The method's result
+        """
+        request_id = await self._start(stage, method, args, kwargs)
+        done = False
+        try:
+            _, (result, stages) = await self._receive(request_id, timeout or self.timeout)
+            done = True
+        finally:
+            await self._finish(request_id, done)
+
+        self._record(stages)
+        return result
+
+    async def stream(self, stage: str, method: str, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """Call an async generator on the model server, yielding its items as they arrive."""
+        request_id = await self._start(stage, method, args, kwargs)
+        done = False
+        try:
+            while True:
+                kind, value = await self._receive(request_id, self.timeout)
+                if kind == ITEM:
+                    yield value
+                elif kind == END:
+                    done = True
+                    self._record(value[1])
+                    return
+        finally:
+            await self._finish(request_id, done)
+
+    async def wait_ready(self, stage: str) -> None:
+        """Wait until the model server has loaded a stage."""
+        while True:
+            try:
+                status = await self.call(SERVER, 'status', timeout=self.poll_interval)
+            except ModelServerError:
+                # The server may not be up yet
+                status = {}
+
+            if status.get(stage) == "ready":
+                return
+            if status.get(stage) == "failed":
+                raise ModelServerError(f"The model server failed to load {stage}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def report(self) -> Dict[str, Any]:
+        """Get model memory, cache counters and inference queues of the server."""
+        return await self.call(SERVER, 'report')
+
+    def close(self) -> None:
+        """Stop the reply reader and close the socket."""
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = None
+        self._loop = None
+        self._context.term()
+
+class RemoteStage:
+    """Base of the stages that call the model server instead of loading models."""
+
+    name = ""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    async def _call(self, method: str, *args: Any) -> Any:
+        return await self.client.call(self.name, method, *args)
+
+    def close(self) -> None:
+        """Nothing to release, the model server owns the models."""
+
+class RemoteQueryDecomposer(RemoteStage):
+    """Decomposes queries on the model server, whose cache all workers share."""
+
+    name = "query_decomposer"
+
+    async def decompose(self, query: str) -> List[str]:
+        return await self._call('decompose', query)
+
+    async def decompose_timed(self, query: str) -> Decomposition:
+        return await self._call('decompose_timed', query)
+
+    async def __call__(self, query: str) -> List[str]:
+        return await self.decompose(query)
+
+class RemoteResponseGenerator(RemoteStage):
+    """Generates answers on the model server."""
+
+    name = "response_generator"
+
+    async def generate(self, query: str, chunks: List[ProcessedChunk]) -> SearchResponse:
+        return await self._call('generate', query, chunks)
+
+    async def fits_prompt(self, query: str, chunks: List[ProcessedChunk]) -> List[bool]:
+        return await self._call('fits_prompt', query, chunks)
+
+    async def pack_chunks(self, query: str, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        return await self._call('pack_chunks', query, chunks)
+
+    async def stream(self, query: str, chunks: List[ProcessedChunk]) -> AsyncIterator[str]:
+        async with aclosing(self.client.stream(self.name, 'stream', query, chunks)) as texts:
+            async for text in texts:
+                yield text
+
+    async def __call__(self, query: str, chunks: List[ProcessedChunk]) -> SearchResponse:
+        return await self.generate(query, chunks)
+
+class RemoteAnswerCache(RemoteStage):
+    """Answer cache kept on the model server, so workers serve each other's answers."""
+
+    name = "answer_cache"
+
+    async def get(self, query: str) -> Optional[Dict[str, Any]]:
+        return await self._call('get', query)
+
+    async def set(self, query: str, response: Dict[str, Any]) -> None:
+        await self._call('set', query, response)
+
+class RemoteVectorStore(RemoteStage):
+    """Vector index kept on the model server, so workers never write the same files."""
+
+    name = "vector_store"
+
+    async def search(self, query: str) -> Optional[List[ProcessedChunk]]:
+        return await self._call('search', query)
+
+    async def add(self, chunks: List[ProcessedChunk]) -> None:
+        await self._call('add', chunks)
+
+class RemoteProcessor(Processor):
+    """
+    Cleans and deduplicates chunks in the worker and summarizes them on the
+    model server.
+
+    Summaries come back as plain text, so the summarized chunks keep the
+    worker's metadata, including source lists that later duplicates add to.
+    """
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+        super().__init__()
+
+    def _initialize_summarizer(self) -> None:
+        """The model server loads the summarizer and keeps the summary cache."""
+
+    async def summarize_texts(self, texts: List[str]) -> List[str]:
+        return await self.client.call('processor', 'summarize_texts', texts)
+
+    def close(self) -> None:
+        """Nothing to release, the model server owns the model."""
+
+class RemoteReranker(Reranker):
+    """Shortlists chunks in the worker, scoring them on the model server."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+        super().__init__()
+
+    def _initialize_models(self) -> None:
+        """The model server loads the encoders."""
+
+    async def rank_texts(self, query: str, texts: List[str]) -> List[Tuple[int, float]]:
+        return await self.client.call('reranker', 'rank_texts', query, texts)
+
+    def close(self) -> None:
+        """Nothing to release, the model server owns the models."""
+
+class RemoteQueryRouter(QueryRouter):
+    """Routes queries in the worker, embedding unclear ones on the model server."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+        super().__init__()
+
+    def _initialize_model(self) -> None:
+        """The model server loads the bi-encoder."""
+
+    async def classify(self, query: str) -> float:
+        return await self.client.call('query_router', 'classify', query)
+
+    def close(self) -> None:
+        """Nothing to release, the model server owns the model."""
+
+# Thin clients standing in for the pipeline's model-backed stages
+REMOTE_STAGES = {
+    'query_decomposer': RemoteQueryDecomposer,
+    'query_router': RemoteQueryRouter,
+    'processor': RemoteProcessor,
+    'reranker': RemoteReranker,
+    'response_generator': RemoteResponseGenerator,
+    'answer_cache': RemoteAnswerCache,
+}
@@ -0,0 +1,272 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import gc
+import logging
+import threading
+import torch
+import transformers
+from packaging import version
+from transformers import AutoTokenizer, AutoModelForCausalLM, PreTrainedModel, PreTrainedTokenizer
+from ..config.settings import settings
+
+# (model name, dtype, device map, quantization)
+ModelKey = Tuple[str, str, Optional[str], Optional[str]]
+Loader = Callable[[str, str, Optional[str]], Tuple[PreTrainedModel, PreTrainedTokenizer]]
+
+QUANTIZATION_MODES = (None, "int8")
+
+# from_pretrained takes dtype= since transformers 4.56, torch_dtype= before
+DTYPE_KWARG = "dtype" if version.parse(transformers.__version__) >= version.parse("4.56.0") else "torch_dtype"
+
+
+def resolve_dtype(dtype: str, device_map: Optional[str] = "auto") -> str:
+    """
+    Resolve the "auto" dtype to float16 for models placed on a GPU and
+    float32 for models on the CPU, where float16 is slow or unsupported.
+    """
+    if dtype == "auto":
+        on_gpu = torch.cuda.is_available() and device_map not in (None, "cpu")
+        return "float16" if on_gpu else "float32"
+    return dtype
+
+
+def dtype_kwargs(dtype: str) -> Dict[str, Any]:
+    """The ``from_pretrained`` keyword argument selecting a torch dtype."""
+    return {DTYPE_KWARG: getattr(torch, dtype)}
+
+
+def configure_threads(threads: Optional[int] = None, interop_threads: Optional[int] = None) -> None:
+    """Set the torch thread pools, leaving torch's defaults for unset values."""
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Only allowed before torch runs any inter-op parallel work
+            logging.getLogger(__name__).warning("Inter-op threads already started, keeping the current count")
+
+
+def quantize_int8(model: Any) -> Any:
+    """Replace a float32 model's linear layers with dynamically quantized int8 ones, in place."""
+    torch.ao.quantization.quantize_dynamic(
+        ModelRegistry._module(model), {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    return model
+
+
+def load_causal_lm(model_name: str, dtype: str, device_map: Optional[str]) -> Tuple[PreTrainedModel, PreTrainedTokenizer]:
+    """Load a causal language model and its left-padding tokenizer."""
+    # Initialize tokenizer
+    tokenizer = AutoTokenizer.from_pretrained(
+        model_name,
+        legacy=False,
+        padding_side="left",
+        trust_remote_code=True
+    )
+
+    # Set pad token if needed
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    # Initialize model
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        **dtype_kwargs(dtype),
+        device_map=device_map,
+        pad_token_id=tokenizer.pad_token_id,
+        trust_remote_code=True,
+        token=settings.HUGGINGFACE_API_KEY
+    )
+
+    return model, tokenizer
+
+
+def load_sentence_encoder(model_name: str, dtype: str, device_map: Optional[str]) -> Tuple[Any, Any]:
+    """Load a sentence-transformers embedding model."""
+    from sentence_transformers import SentenceTransformer
+
+    # sentence-transformers picks the best available device itself for "auto"
+    device = None if device_map == "auto" else device_map
+    model = SentenceTransformer(model_name, device=device, token=settings.HUGGINGFACE_API_KEY)
+    if dtype != "float32":
+        model = model.to(getattr(torch, dtype))
+
+    return model, model.tokenizer
+
+
+def load_cross_encoder(model_name: str, dtype: str, device_map: Optional[str]) -> Tuple[Any, Any]:
+    """Load a sentence-transformers cross-encoder for scoring (query, passage) pairs."""
+    from sentence_transformers import CrossEncoder
+
+    device = None if device_map == "auto" else device_map
+    model = CrossEncoder(
+        model_name,
+        device=device,
+        max_length=settings.RERANKER_PARAMS.get('max_length', 512)
+    )
+    if dtype != "float32":
+        model.model.to(getattr(torch, dtype))
+
+    return model, model.tokenizer
+
+
+class ModelHandle:
+    """
+    A shared reference to a loaded model and tokenizer.
+
+    Handles are handed out by ``ModelRegistry.acquire`` and should be
+    released when the owner no longer needs the model.
+    """
+
+    def __init__(self, key: ModelKey, model: PreTrainedModel, tokenizer: PreTrainedTokenizer, registry: "ModelRegistry"):
+        self.key = key
+        self.model = model
+        self.tokenizer = tokenizer
+        self._registry = registry
+        self._released = False
+
+    def release(self) -> None:
+        """Give the reference back to the registry."""
+        if not self._released:
+            self._released = True
+            self._registry.release(self.key)
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of loaded models.
+
+    Models are keyed by (model name, dtype, device map, quantization), so
+    every stage that asks for the same weights gets the same instance
+    instead of loading its own copy. Entries are reference counted and unloaded when the last
+    handle is released.
+    """
+
+    def __init__(self):
+        self._setup_logging()
+        configure_threads(
+            settings.INFERENCE_PARAMS.get('threads'),
+            settings.INFERENCE_PARAMS.get('interop_threads')
+        )
+        self._lock = threading.Lock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        self._entries: Dict[ModelKey, Dict[str, Any]] = {}
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def acquire(
+        self,
+        model_name: str,
+        dtype: str = "float16",
+        device_map: Optional[str] = "auto",
+        loader: Loader = load_causal_lm,
+        quantize: Optional[str] = None
+    ) -> ModelHandle:
+        """
+        Get a shared handle to a model, loading it on first request.
+
+        Args:
+            model_name (str): Hugging Face model identifier
+            dtype (str): Torch dtype name, e.g. "float16", or "auto"
+            device_map (Optional[str]): Device mapping strategy
+            loader (Loader): Function loading the model and tokenizer
+            quantize (Optional[str]): "int8" for dynamic int8 quantization of
+                linear layers, which needs float32 weights on CPU
+
+        Returns:
+            ModelHandle: Handle to the shared model and tokenizer
+        """
+        dtype = resolve_dtype(dtype, device_map)
+        if quantize not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode for {model_name}: {quantize}")
+        if quantize and (dtype != "float32" or device_map not in (None, "cpu")):
+            raise ValueError(
+                f"int8 quantization of {model_name} needs dtype float32 and device map cpu, "
+                f"got {dtype} and {device_map}"
+            )
+
+        key = (model_name, dtype, device_map, quantize)
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so different models can load concurrently
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry['refs'] += 1
+                    return ModelHandle(key, entry['model'], entry['tokenizer'], self)
+
+            self.logger.info(f"Loading model: {model_name} ({dtype}, device_map={device_map}, quantize={quantize})")
+            model, tokenizer = loader(model_name, dtype, device_map)
+            if quantize == "int8":
+                model = quantize_int8(model)
+
+            with self._lock:
+                self._entries[key] = {'model': model, 'tokenizer': tokenizer, 'refs': 1}
+
+            self.logger.info(f"Loaded model: {model_name} ({self._model_bytes(model) / 2**20:.1f} MiB)")
+            return ModelHandle(key, model, tokenizer, self)
+
+    def release(self, key: ModelKey) -> None:
+        """Drop one reference to a model, unloading it when none remain."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+
+            entry['refs'] -= 1
+            if entry['refs'] > 0:
+                return
+
+            del self._entries[key]
+
+        self.logger.info(f"Unloading model: {key[0]}")
+        del entry
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @staticmethod
+    def _module(model: Any) -> torch.nn.Module:
+        """Get the torch module behind a model, unwrapping wrappers like CrossEncoder."""
+        return model if isinstance(model, torch.nn.Module) else model.model
+
+    @classmethod
+    def _model_bytes(cls, model: Any) -> int:
+        """Bytes held by a model's weights, including packed quantized ones."""
+        def tensor_bytes(value: Any) -> int:
+            if isinstance(value, torch.Tensor):
+                return value.numel() * value.element_size()
+            if isinstance(value, (tuple, list)):
+                return sum(tensor_bytes(item) for item in value)
+            return 0
+
+        # state_dict also covers the packed weights of quantized layers, which aren't parameters
+        return sum(tensor_bytes(value) for value in cls._module(model).state_dict().values())
+
+    def memory_report(self) -> Dict[str, Dict[str, Any]]:
+        """Get memory use and reference counts for every loaded model."""
+        with self._lock:
+            entries = list(self._entries.items())
+
+        return {
+            f"{name} ({dtype}, device_map={device_map}, quantize={quantize})": {
+                'model': name,
+                'dtype': dtype,
+                'device_map': device_map,
+                'quantize': quantize,
+                'references': entry['refs'],
+                'parameters': sum(p.numel() for p in self._module(entry['model']).parameters()),
+                'memory_mb': round(self._model_bytes(entry['model']) / 2**20, 1)
+            }
+            for (name, dtype, device_map, quantize), entry in entries
+        }
+
+
+# Create a global registry shared by every model stage
+model_registry = ModelRegistry()
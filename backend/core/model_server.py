@@ -0,0 +1,315 @@
+from typing import Any, Dict, Optional, Set, Tuple
+from pathlib import Path
+from contextlib import aclosing
+import argparse
+import asyncio
+import logging
+import os
+import pickle
+import stat
+import tempfile
+import time
+import zmq
+import zmq.asyncio
+from ..config.settings import settings
+from ..utils.metrics import Trace
+from .answer_cache import AnswerCache
+from .executor import inference_executor
+from .model_registry import model_registry
+from .processor import Processor
+from .query_decomposer import QueryDecomposer
+from .query_router import QueryRouter
+from .reranker import Reranker
+from .response_generator import ResponseGenerator
+from .vector_store import VectorStore
+
+# Frame kinds. Clients send [request id, CALL or CANCEL, body], the server
+# answers [request id, RESULT, ITEM, END or ERROR, body]
+CALL = b"call"
+CANCEL = b"cancel"
+RESULT = b"result"
+ITEM = b"item"
+END = b"end"
+ERROR = b"error"
+
+# Calls addressed to the server itself rather than one of its stages
+SERVER = "server"
+
+
+def runtime_dir() -> Path:
+    """Private directory of the current user holding the model server socket."""
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(base) / f"stratos-{os.getuid()}"
+
+
+def secure_address(address: Optional[str] = None, create: bool = False) -> str:
+    """
+    Check a model server endpoint before binding or connecting to it.
+
+    Bodies are pickled, so whoever can reach the socket can run code in
+    the server and its workers. Only ipc:// sockets are accepted, in a
+    directory owned by the current user that no one else can open.
+
+    Args:
+        address (Optional[str]): ZeroMQ endpoint, defaults to a socket in ``runtime_dir()``
+        create (bool): Create the directory with mode 0700 if it is missing
+
+    Returns:
+        str: The endpoint
+
+    Raises:
+        ValueError: The endpoint isn't an ipc:// socket
+        FileNotFoundError: The directory doesn't exist yet
+        PermissionError: The directory is a symlink, another user's, or open to others
+    """
+    address = address or f"ipc://{runtime_dir() / 'models.sock'}"
+    if not address.startswith("ipc://"):
+        raise ValueError(f"The model server only listens on ipc:// sockets, got {address}")
+
+    directory = Path(address[len("ipc://"):]).parent
+    if create:
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    info = directory.lstat()
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(
+            f"{directory} must be a directory owned by the current user with mode 0700, "
+            f"as anyone who can open the model server socket can run code in it"
+        )
+    return address
+
+
+def encode(value: Any) -> bytes:
+    """Serialize a message body, clients and server are the same codebase on the same host."""
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode(body: bytes) -> Any:
+    """Deserialize a message body."""
+    return pickle.loads(body)
+
+
+def model_cache_stats(
+    answer_cache: Optional[AnswerCache] = None,
+    vector_store: Optional[VectorStore] = None,
+    query_decomposer: Optional[QueryDecomposer] = None,
+    response_generator: Optional[ResponseGenerator] = None,
+    processor: Optional[Processor] = None
+) -> Dict[str, Any]:
+    """Cache counters of the model-backed stages that are loaded."""
+    stats = {}
+    if answer_cache is not None:
+        stats["answer"] = answer_cache.stats()
+    if vector_store is not None:
+        stats["vector_index"] = vector_store.stats()
+    if query_decomposer is not None:
+        stats["decomposition"] = query_decomposer.cache_stats()
+        stats["decompose_prefix"] = query_decomposer.prefix_cache.stats()
+    if response_generator is not None:
+        stats["generate_prefix"] = response_generator.prefix_cache.stats()
+    if processor is not None:
+        stats["summary"] = processor.cache_stats()
+    return stats
+
+
+class ModelServer:
+    """
+    Process that owns every model-backed stage and serves them over ZeroMQ.
+
+    API workers connect with a ``ModelClient`` and call stage methods
+    remotely, so any number of workers share one copy of each model. Each
+    call runs as its own task on the server's event loop, which lets the
+    stages' batchers combine requests from different workers into one
+    forward pass.
+
+    Only the methods listed in ``METHODS`` can be called. Bodies are
+    pickled, so the socket is an ipc:// socket in a directory only the
+    user running the server can open (see ``secure_address``).
+    """
+
+    STAGES = {
+        'query_decomposer': QueryDecomposer,
+        'query_router': QueryRouter,
+        'processor': Processor,
+        'reranker': Reranker,
+        'response_generator': ResponseGenerator,
+        'answer_cache': AnswerCache,
+        'vector_store': VectorStore,
+    }
+
+    METHODS = {
+        'query_decomposer': {'decompose', 'decompose_timed'},
+        'query_router': {'classify'},
+        'processor': {'summarize_texts'},
+        'reranker': {'rank_texts'},
+        'response_generator': {'generate', 'stream', 'pack_chunks', 'fits_prompt'},
+        'answer_cache': {'get', 'set'},
+        'vector_store': {'search', 'add'},
+        SERVER: {'status', 'report'},
+    }
+
+    # Async generators, whose items are sent as they are produced
+    STREAMING = {('response_generator', 'stream')}
+
+    def __init__(self, address: Optional[str] = None):
+        self._setup_logging()
+        self.params = settings.MODEL_SERVER_PARAMS
+        self.address = secure_address(address or self.params.get('address'), create=True)
+
+        self.stages: Dict[str, Any] = {}
+        self.status: Dict[str, str] = {name: "pending" for name in self.STAGES}
+        self.load_seconds: Dict[str, float] = {}
+
+        self._context = zmq.asyncio.Context()
+        self._socket: Optional[zmq.asyncio.Socket] = None
+        self._tasks: Dict[Tuple[bytes, bytes], asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    async def _load_stage(self, name: str, limit: asyncio.Semaphore) -> None:
+        """Build one stage in a worker thread, so calls to loaded stages keep being served."""
+        async with limit:
+            self.status[name] = "loading"
+            started_at = time.perf_counter()
+            try:
+                stage = await asyncio.to_thread(self.STAGES[name])
+            except Exception as e:
+                self.status[name] = "failed"
+                self.logger.error(f"\n////////// Failed to load {name}: {str(e)} //////////\n")
+                return
+
+        self.stages[name] = stage
+        self.load_seconds[name] = round(time.perf_counter() - started_at, 2)
+        self.status[name] = "ready"
+        self.logger.info(f"\n////////// Loaded {name} in {self.load_seconds[name]}s //////////\n")
+
+        if name == 'query_decomposer':
+            # Warm the decomposition cache once here rather than once per worker
+            self._spawn(stage.warm_up())
+
+    async def load(self) -> None:
+        """Load every stage, up to ``startup.load_workers`` at a time."""
+        limit = asyncio.Semaphore(settings.STARTUP_PARAMS.get('load_workers', len(self.STAGES)))
+        await asyncio.gather(*(self._load_stage(name, limit) for name in self.STAGES))
+
+    def _spawn(self, coroutine: Any) -> asyncio.Task:
+        """Run a coroutine in the background, keeping a reference until it finishes."""
+        task = asyncio.ensure_future(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def report(self) -> Dict[str, Any]:
+        """Get model memory, cache counters and inference queues of the server."""
+        return {
+            'models': model_registry.memory_report(),
+            'caches': model_cache_stats(**{
+                name: self.stages.get(name)
+                for name in ('answer_cache', 'vector_store', 'query_decomposer', 'response_generator', 'processor')
+            }),
+            'inference': inference_executor.stats()
+        }
+
+    def _resolve(self, stage_name: str, method: str) -> Any:
+        """Find the method a request calls, if it may be called."""
+        if method not in self.METHODS.get(stage_name, ()):
+            raise ValueError(f"Unknown model server method: {stage_name}.{method}")
+        if stage_name == SERVER:
+            return {'status': lambda: dict(self.status), 'report': self.report}[method]
+
+        stage = self.stages.get(stage_name)
+        if stage is None:
+            raise RuntimeError(f"{stage_name} is not loaded ({self.status[stage_name]})")
+        return getattr(stage, method)
+
+    async def _send(self, identity: bytes, request_id: bytes, kind: bytes, value: Any) -> None:
+        """Send one reply frame to a client."""
+        await self._socket.send_multipart([identity, request_id, kind, encode(value)])
+
+    async def _handle(self, identity: bytes, request_id: bytes, body: bytes) -> None:
+        """Run one call and send its result, or its items as they stream."""
+        try:
+            stage_name, method, args, kwargs = decode(body)
+            call = self._resolve(stage_name, method)
+
+            # Record the stage's timings so the client can add them to its request trace
+            with Trace() as trace:
+                if (stage_name, method) in self.STREAMING:
+                    # Closed on CANCEL too, which stops the generation behind it
+                    async with aclosing(call(*args, **kwargs)) as items:
+                        async for item in items:
+                            await self._send(identity, request_id, ITEM, item)
+                    result, kind = None, END
+                else:
+                    result = call(*args, **kwargs)
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                    kind = RESULT
+
+            await self._send(identity, request_id, kind, (result, trace.stages))
+
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.logger.error(f"\n////////// Model server call failed: {str(e)} //////////\n")
+            await self._send(identity, request_id, ERROR, str(e))
+        finally:
+            self._tasks.pop((identity, request_id), None)
+
+    async def serve(self) -> None:
+        """Load the stages in the background and serve calls until cancelled."""
+        self._socket = self._context.socket(zmq.ROUTER)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._socket.bind(self.address)
+        os.chmod(self.address[len("ipc://"):], 0o600)
+        self.logger.info(f"\n////////// Model server listening on {self.address} //////////\n")
+
+        loading = self._spawn(self.load())
+        try:
+            while True:
+                frames = await self._socket.recv_multipart()
+                if len(frames) != 4:
+                    # A bad or stale client mustn't take serving down for every worker
+                    self.logger.warning(f"Dropping malformed model server message of {len(frames)} frames")
+                    continue
+                identity, request_id, kind, body = frames
+                key = (identity, request_id)
+                if kind == CALL:
+                    self._tasks[key] = asyncio.ensure_future(self._handle(identity, request_id, body))
+                elif kind == CANCEL and key in self._tasks:
+                    # The worker gave up on the call, e.g. its client disconnected
+                    self._tasks.pop(key).cancel()
+        finally:
+            loading.cancel()
+            for task in list(self._tasks.values()) + list(self._background):
+                task.cancel()
+            await self.close()
+
+    async def close(self) -> None:
+        """Release every stage and the socket."""
+        for stage in self.stages.values():
+            stage.close()
+        self.stages = {}
+        inference_executor.shutdown()
+        if self._socket is not None:
+            self._socket.close()
+        self._context.term()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve Stratos models to API workers over ZeroMQ")
+    parser.add_argument("--address", default=None, help="ipc:// endpoint to bind, defaults to model_server.address")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(ModelServer(args.address).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
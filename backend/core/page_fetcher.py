@@ -0,0 +1,189 @@
+from typing import Any, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+import asyncio
+import logging
+import httpx
+from ..config.settings import settings
+from ..utils.cache import TTLCache
+from ..utils.html_extract import extract_main_text
+
+class PageFetcher:
+    """
+    Downloads result pages and extracts their main text.
+
+    Pages are fetched concurrently over one pooled HTTP client, with a cap
+    on concurrent requests per domain, a response size limit and timeouts.
+    HTML is parsed in a process pool so extraction never blocks the event
+    loop. Extracted text is kept in a disk cache together with the page's
+    ETag and Last-Modified headers, so refetching an unchanged page costs a
+    conditional GET answered with 304 Not Modified.
+    """
+
+    HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+    def __init__(self):
+        self._setup_logging()
+        self.params = settings.FETCH_PARAMS
+        self.enabled = self.params.get('enabled', False)
+        self.max_bytes = self.params.get('max_bytes', 2_000_000)
+        self.revalidate_after = self.params.get('revalidate_after', 3600)
+
+        self.cache = TTLCache(
+            max_size=self.params.get('cache_max_size', 1024),
+            disk_path=self.params.get('cache_path'),
+            disk_max_size=self.params.get('cache_disk_max_size')
+        )
+        self.revalidations = 0  # Conditional GETs sent for cached pages
+        self.not_modified = 0   # Of those, answered with 304 Not Modified
+        self.failures = 0
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._domain_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                headers={'User-Agent': self.params.get('user_agent', 'StratosBot/1.0')},
+                timeout=httpx.Timeout(
+                    self.params.get('timeout', 5.0),
+                    connect=self.params.get('connect_timeout', 3.0)
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.params.get('max_connections', 50),
+                    max_keepalive_connections=self.params.get('max_keepalive', 20)
+                )
+            )
+        return self._client
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the extraction process pool on first use."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.params.get('extract_workers', 2))
+        return self._pool
+
+    def _get_domain_limit(self, url: str) -> asyncio.Semaphore:
+        """Get the semaphore capping concurrent requests to a domain."""
+        domain = urlsplit(url).netloc
+        if domain not in self._domain_limits:
+            self._domain_limits[domain] = asyncio.Semaphore(self.params.get('per_domain_limit', 4))
+        return self._domain_limits[domain]
+
+    async def _download(self, url: str, cached: Optional[Dict[str, Any]]) -> Optional[Tuple[httpx.Response, bytes]]:
+        """
+        Download a page, at most ``max_bytes`` of it.
+
+        Returns the response and the body read, or None when the page
+        isn't HTML or is too large to be worth reading.
+        """
+        headers = {}
+        if cached is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        async with self._get_domain_limit(url):
+            async with self._get_client().stream('GET', url, headers=headers) as response:
+                if response.status_code == 304:
+                    return response, b""
+                response.raise_for_status()
+
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith(self.HTML_TYPES):
+                    return None
+                if int(response.headers.get('content-length') or 0) > self.max_bytes:
+                    return None
+
+                # Stop reading once the cap is reached, the head of a page holds its main text
+                body = bytearray()
+                async for data in response.aiter_bytes():
+                    body.extend(data)
+                    if len(body) >= self.max_bytes:
+                        break
+                return response, bytes(body[:self.max_bytes])
+
+    async def fetch(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        Get the title and main text of a page.
+
+        Args:
+            url (str): Page URL
+
+        Returns:
+            Optional[Dict[str, str]]: 'title' and 'text', or None if the page
+            couldn't be fetched or had no usable text
+        """
+        entry = self.cache.get_entry(url)
+        cached = entry[0] if entry is not None else None
+
+        # Recently validated pages are served without touching the network
+        if entry is not None and entry[1] <= self.revalidate_after:
+            self.cache.stats.hits += 1
+            return cached['page']
+
+        try:
+            if cached is not None:
+                self.revalidations += 1
+            downloaded = await self._download(url, cached)
+            if downloaded is None:
+                self.cache.stats.misses += 1
+                return None
+            response, content = downloaded
+
+            if response.status_code == 304 and cached is not None:
+                self.cache.stats.hits += 1
+                self.not_modified += 1
+                self.cache.set(url, cached)
+                return cached['page']
+
+            self.cache.stats.misses += 1
+            page = await asyncio.get_running_loop().run_in_executor(
+                self._get_pool(),
+                extract_main_text,
+                content,
+                response.charset_encoding,
+                self.params.get('min_block_length', 40),
+                self.params.get('max_text_chars', 10000)
+            )
+            if not page['text']:
+                return None
+
+            self.cache.set(url, {
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+                'page': page
+            })
+            return page
+
+        except Exception as e:
+            self.failures += 1
+            self.logger.warning(f"Failed to fetch {url}: {str(e)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache and revalidation counters."""
+        return {
+            **self.cache.stats.as_dict(),
+            'revalidations': self.revalidations,
+            'not_modified': self.not_modified,
+            'failures': self.failures
+        }
+
+    async def aclose(self) -> None:
+        """Close the HTTP client, extraction pool and page cache."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self.cache.close()
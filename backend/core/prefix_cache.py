@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import copy
+import logging
+import threading
+import torch
+from transformers import DynamicCache, PreTrainedModel, PreTrainedTokenizer
+from ..config.settings import settings
+from ..utils.cache import CacheStats
+
+# (fixed prefix, per-request suffix)
+PromptParts = Tuple[str, str]
+
+class PrefixCache:
+    """
+    Reuses the attention key/values of fixed prompt prefixes.
+
+    Prompts are split into a fixed prefix, such as a stage's instruction
+    preamble, and a per-request suffix. The prefix is run through the model
+    once and its key/values are kept, so each generation call only
+    prefills the suffix.
+
+    Rows of a batch have different suffix lengths. With a cached prefix,
+    padding goes between the prefix and the suffix instead of in front of
+    the prompt, so every row's prefix sits at the same positions as in the
+    cached key/values. Padding is masked out and position ids follow the
+    attention mask, so the output matches an uncached, left-padded batch.
+    """
+
+    def __init__(self, name: str, model: PreTrainedModel, tokenizer: PreTrainedTokenizer):
+        self._setup_logging()
+        self.name = name
+        self.model = model
+        self.tokenizer = tokenizer
+
+        self.params = settings.INFERENCE_PARAMS.get('prefix_cache', {})
+        self.enabled = self.params.get('enabled', True)
+        self.max_entries = self.params.get('max_entries', 8)
+
+        self._entries: "OrderedDict[str, Tuple[List[int], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = CacheStats()
+        self.tokens_saved = 0
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _prefix(self, prefix: str) -> Tuple[List[int], Optional[Any]]:
+        """
+        Get a prefix's token ids and, when caching, its key/values.
+
+        Runs on the inference workers, so the first call for a prefix
+        computes its key/values while holding the lock and later calls
+        reuse them.
+        """
+        if not self.enabled:
+            return self.tokenizer(prefix)['input_ids'], None
+
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is not None:
+                self._entries.move_to_end(prefix)
+                self.counters.hits += 1
+                return entry
+
+            self.counters.misses += 1
+            ids = self.tokenizer(prefix)['input_ids']
+            with torch.no_grad():
+                # Pass an empty cache so the key/values come back as a Cache
+                # object, not the legacy tuples older versions return by default
+                past = self.model(
+                    input_ids=torch.tensor([ids], device=self.model.device),
+                    past_key_values=DynamicCache(),
+                    use_cache=True
+                ).past_key_values
+
+            self._entries[prefix] = (ids, past)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.evictions += 1
+
+            self.logger.info(f"Cached {len(ids)}-token prompt prefix for {self.name}")
+            return ids, past
+
+    def encode(self, prompts: List[PromptParts], max_length: int, num_beams: int = 1) -> Dict[str, Any]:
+        """
+        Tokenize a batch of prompts for ``model.generate``.
+
+        Args:
+            prompts (List[PromptParts]): (prefix, suffix) of each prompt
+            max_length (int): Maximum prompt length in tokens, suffixes are truncated to fit
+            num_beams (int): Beams per row, the cached key/values are copied for each
+
+        Returns:
+            Dict[str, Any]: 'input_ids' and 'attention_mask', plus 'past_key_values'
+            when the prefix's key/values are reused
+        """
+        prefixes = {prefix for prefix, _ in prompts}
+        prefix_ids, past = self._prefix(prefixes.pop()) if len(prefixes) == 1 else (None, None)
+
+        rows = []
+        for prefix, suffix in prompts:
+            ids = prefix_ids if prefix_ids is not None else self.tokenizer(prefix)['input_ids']
+            budget = max(max_length - len(ids), 0)
+            rows.append((ids, self.tokenizer(suffix, add_special_tokens=False)['input_ids'][:budget]))
+
+        pad = self.tokenizer.pad_token_id
+        width = max(len(ids) + len(suffix) for ids, suffix in rows)
+        input_ids, attention_mask = [], []
+        for ids, suffix in rows:
+            padding = width - len(ids) - len(suffix)
+            if past is not None:
+                # Keep the prefix at the positions its cached key/values were computed at
+                input_ids.append(ids + [pad] * padding + suffix)
+                attention_mask.append([1] * len(ids) + [0] * padding + [1] * len(suffix))
+            else:
+                input_ids.append([pad] * padding + ids + suffix)
+                attention_mask.append([0] * padding + [1] * (len(ids) + len(suffix)))
+
+        inputs = {
+            'input_ids': torch.tensor(input_ids, device=self.model.device),
+            'attention_mask': torch.tensor(attention_mask, device=self.model.device)
+        }
+        if past is not None:
+            # generate extends the cache in place, so every call gets its own copy
+            past = copy.deepcopy(past)
+            past.batch_repeat_interleave(len(rows) * num_beams)
+            inputs['past_key_values'] = past
+            self.tokens_saved += len(prefix_ids) * len(rows)
+
+        return inputs
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit counters and the prefill tokens saved."""
+        return {
+            **self.counters.as_dict(),
+            'entries': len(self._entries),
+            'tokens_saved': self.tokens_saved
+        }
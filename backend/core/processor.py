@@ -1,22 +1,132 @@
-from typing import List
+from typing import List, Optional, Tuple, Dict, Any
+import asyncio
+import hashlib
+import json
 import logging
+import time
+import torch
 from transformers import T5ForConditionalGeneration, T5Tokenizer
 from ..models.schema import ProcessedChunk
+from ..config.settings import settings
+from ..utils.cache import TTLCache
+from ..utils.metrics import record_generation, timed_stage
+from ..utils.near_duplicates import NearDuplicateIndex
+from .decoding import DecodingStrategy
+from .executor import inference_executor
+from .model_registry import model_registry, dtype_kwargs
+
+def load_t5(model_name: str, dtype: str, device_map: Optional[str]) -> Tuple[T5ForConditionalGeneration, T5Tokenizer]:
+    """Load a T5 summarization model and its tokenizer."""
+    tokenizer = T5Tokenizer.from_pretrained(model_name)
+    model = T5ForConditionalGeneration.from_pretrained(
+        model_name,
+        **dtype_kwargs(dtype),
+        device_map=device_map
+    )
+    return model, tokenizer
+
+def merged_sources(chunks: List[ProcessedChunk]) -> List[str]:
+    """Sources of the chunks, including those merged from duplicates, in order."""
+    return list(dict.fromkeys(
+        source for chunk in chunks for source in chunk.metadata.get('sources', [chunk.source])
+    ))
+
+class DuplicateFilter:
+    """
+    Drops exact and near-duplicate chunks across the batches of one request.
+
+    The first copy of a passage is kept, and the sources of later copies are
+    merged into its ``metadata['sources']``. Copies of the chunk made
+    further down the pipeline share that list, so sources merged from later
+    batches still reach the answer.
+    """
+
+    def __init__(self, params: Dict[str, Any]):
+        self.exact: Dict[str, ProcessedChunk] = {}
+        self.near = NearDuplicateIndex(
+            threshold=params.get('threshold', 0.8),
+            num_perm=params.get('num_perm', 64),
+            shingle_size=params.get('shingle_size', 3)
+        ) if params.get('enabled', True) else None
+        self.collapsed = 0
+
+    def filter(self, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        """Keep chunks that aren't duplicates of earlier ones, in order."""
+        unique_chunks = []
+        for chunk in chunks:
+            kept = self.exact.get(chunk.text)
+            if kept is None:
+                chunk = chunk.model_copy(update={'metadata': {**chunk.metadata, 'sources': [chunk.source]}})
+                if self.near is not None:
+                    kept = self.near.add(chunk.text, chunk)
+
+            if kept is None:
+                self.exact[chunk.text] = chunk
+                unique_chunks.append(chunk)
+            else:
+                self.collapsed += 1
+                if chunk.source not in kept.metadata['sources']:
+                    kept.metadata['sources'].append(chunk.source)
+
+        return unique_chunks
 
 class Processor:
     def __init__(self):
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
-        # Initialize T5 model for summarization
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-small')
-        self.model = T5ForConditionalGeneration.from_pretrained('t5-small')
-
         # Configuration
+        self.model_name = settings.SUMMARY_MODEL
         self.max_chunk_length = 512  # Max length for chunk input
         self.min_chunk_length = 50   # Minimum length for valid chunks
-        self.max_summary_length = 150  # Max length for summary output
-        self.min_summary_length = 40   # Min length for summary output
+        self.summary_batch_size = settings.SUMMARY_BATCH_SIZE      # Max chunks per forward pass
+        self.summary_batch_tokens = settings.SUMMARY_BATCH_TOKENS  # Max padded input tokens per batch
+
+        self._initialize_summarizer()
+
+    def _initialize_summarizer(self) -> None:
+        """Get the T5 summarizer from the shared model registry and set up its decoding and cache."""
+        self.handle = model_registry.acquire(
+            self.model_name,
+            dtype=settings.SUMMARY_DEVICE['dtype'],
+            device_map=settings.SUMMARY_DEVICE['map'],
+            loader=load_t5,
+            quantize=settings.SUMMARY_DEVICE.get('quantize')
+        )
+        self.tokenizer = self.handle.tokenizer
+        self.model = self.handle.model
+
+        # Generation settings shared by the per-chunk and batched paths,
+        # where the only decoder prompt token is T5's start token
+        self.decoding = DecodingStrategy("summarize")
+        self.generation_params = self.decoding.generate_kwargs(self.tokenizer, prompt_length=1)
+
+        self._initialize_cache()
+
+    def _initialize_cache(self) -> None:
+        """Initialize the content-addressed summary cache."""
+        cache_params = settings.SUMMARY_CACHE_PARAMS
+        self.cache_enabled = cache_params.get('enabled', True)
+        self.cache = TTLCache(
+            max_size=cache_params.get('max_size', 8192),
+            ttl=cache_params.get('ttl'),
+            disk_path=cache_params.get('disk_path'),
+            disk_max_size=cache_params.get('disk_max_size')
+        )
+
+        # Summaries depend on the model and generation settings, so both are part of every key
+        self._cache_namespace = json.dumps(
+            {
+                'model': self.model_name,
+                'max_input_length': self.max_chunk_length,
+                'decoding': {'profile': self.decoding.profile, **self.decoding.params, 'stop': self.decoding.stop}
+            },
+            sort_keys=True
+        )
+
+    def _make_cache_key(self, text: str) -> str:
+        """Hash cleaned text together with the model and generation settings."""
+        return hashlib.sha256(f"{self._cache_namespace}\n{text}".encode()).hexdigest()
 
     def summarize(self, text: str) -> str:
         """
@@ -35,17 +145,20 @@ class Processor:
             )
 
             # Generate summary using the model
+            started_at = time.perf_counter()
             summary_ids = self.model.generate(
-                inputs,
-                max_length=self.max_summary_length,
-                min_length=self.min_summary_length,
-                length_penalty=2.0,
-                num_beams=4,
-                early_stopping=True
+                inputs.to(self.model.device),
+                **self.generation_params
+            )
+            record_generation(
+                "summarize",
+                tokens_in=inputs.numel(),
+                tokens_out=(summary_ids != self.tokenizer.pad_token_id).sum(),
+                seconds=time.perf_counter() - started_at
             )
 
             # Decode generated summary into text
-            summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+            summary = self.decoding.truncate(self.tokenizer.decode(summary_ids[0], skip_special_tokens=True))
 
             return summary
 
@@ -53,6 +166,80 @@ class Processor:
             self.logger.error(f"Error during summarization: {str(e)}")
             return text  # Return original text if summarization fails
 
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Group texts into length-bucketed batches for summarization.
+
+        Texts are sorted by token length so each batch pads to a similar
+        length, and a batch is closed once it reaches the configured batch
+        size or its padded size would exceed the token budget.
+
+        Args:
+            texts (List[str]): Texts to be summarized
+
+        Returns:
+            List[List[int]]: Batches of indices into ``texts``
+        """
+        encodings = self.tokenizer(
+            [f"summarize: {text}" for text in texts],
+            max_length=self.max_chunk_length,
+            truncation=True
+        )
+        lengths = [len(ids) for ids in encodings['input_ids']]
+
+        batches = []
+        batch = []
+        for index in sorted(range(len(texts)), key=lambda i: lengths[i]):
+            # Sorted ascending, so the newest text is always the longest in the batch
+            padded_tokens = lengths[index] * (len(batch) + 1)
+            if batch and (len(batch) >= self.summary_batch_size or padded_tokens > self.summary_batch_tokens):
+                batches.append(batch)
+                batch = []
+            batch.append(index)
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def summarize_batch(self, texts: List[str]) -> List[str]:
+        """
+        Summarize a batch of texts in a single padded forward pass.
+        """
+        try:
+            # Prepare input texts for summarization
+            input_texts = [f"summarize: {text}" for text in texts]
+
+            # Tokenize and pad the batch for the model
+            inputs = self.tokenizer(
+                input_texts,
+                return_tensors="pt",
+                max_length=self.max_chunk_length,
+                truncation=True,
+                padding=True
+            )
+
+            # Generate summaries for the whole batch
+            started_at = time.perf_counter()
+            summary_ids = self.model.generate(
+                inputs.input_ids.to(self.model.device),
+                attention_mask=inputs.attention_mask.to(self.model.device),
+                **self.generation_params
+            )
+            record_generation(
+                "summarize",
+                tokens_in=inputs.attention_mask.sum(),
+                tokens_out=(summary_ids != self.tokenizer.pad_token_id).sum(),
+                seconds=time.perf_counter() - started_at
+            )
+
+            # Decode generated summaries into text
+            return [self.decoding.truncate(summary) for summary in self.tokenizer.batch_decode(summary_ids, skip_special_tokens=True)]
+
+        except Exception as e:
+            self.logger.error(f"Error during batch summarization: {str(e)}")
+            return list(texts)  # Return original texts if summarization fails
+
     def clean_text(self, text: str) -> str:
         """
         Clean and normalize text by removing extra whitespace and short texts.
@@ -64,29 +251,31 @@ class Processor:
 
         return cleaned_text
 
-    def remove_duplicates(self, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
-        """
-        Remove duplicate chunks while preserving order.
-        """
-        seen = set()
-        unique_chunks = []
+    def duplicate_filter(self) -> DuplicateFilter:
+        """Create the duplicate state for one request."""
+        return DuplicateFilter(settings.NEAR_DUPLICATE_PARAMS)
 
-        for chunk in chunks:
-            if chunk.text not in seen:
-                seen.add(chunk.text)
-                unique_chunks.append(chunk)
+    def remove_duplicates(self, chunks: List[ProcessedChunk], seen: Optional[DuplicateFilter] = None) -> List[ProcessedChunk]:
+        """
+        Remove exact and near-duplicate chunks while preserving order.
 
-        return unique_chunks
+        Pass the same ``seen`` filter across calls to deduplicate chunks that
+        arrive in batches.
+        """
+        seen = self.duplicate_filter() if seen is None else seen
+        return seen.filter(chunks)
 
-    async def process(self, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+    def prepare(self, chunks: List[ProcessedChunk], seen: Optional[DuplicateFilter] = None, strict: bool = True) -> List[ProcessedChunk]:
         """
-        Main processing pipeline to clean, deduplicate, and summarize chunks.
+        Clean and deduplicate chunks ahead of ranking and summarization.
 
         Args:
             chunks (List[ProcessedChunk]): List of processed chunks
+            seen (Optional[DuplicateFilter]): Chunks already prepared in earlier batches
+            strict (bool): Raise if no chunks survive, rather than returning none
 
         Returns:
-            List[ProcessedChunk]: List of processed and summarized chunks
+            List[ProcessedChunk]: Cleaned, unique chunks
         """
         try:
             # Log incoming data type and content for debugging
@@ -95,46 +284,132 @@ class Processor:
             if not all(isinstance(chunk, ProcessedChunk) for chunk in chunks):
                 raise ValueError("All elements in 'chunks' must be instances of ProcessedChunk")
 
-            # Step 1: Clean texts in each chunk
-            cleaned_chunks = [
-                ProcessedChunk(
-                    text=self.clean_text(chunk.text),
-                    source=chunk.source,
-                    score=chunk.score,
-                    metadata=chunk.metadata
-                )
-                for chunk in chunks
-            ]
-
-            # Remove empty chunks after cleaning
-            cleaned_chunks = [chunk for chunk in cleaned_chunks if chunk.text]
-
-            if not cleaned_chunks:
-                raise ValueError("No valid chunks after cleaning")
-
-            # Step 2: Remove duplicate chunks based on their text content
-            unique_chunks = self.remove_duplicates(cleaned_chunks)
-
-            if not unique_chunks:
-                raise ValueError("No valid unique chunks after deduplication")
-
-            # Step 3: Summarize each chunk's text content
-            summarized_chunks = [
-                ProcessedChunk(
-                    text=self.summarize(chunk.text),
-                    source=chunk.source,
-                    score=chunk.score,
-                    metadata=chunk.metadata
-                )
-                for chunk in unique_chunks
-            ]
-
-            return summarized_chunks
+            with timed_stage("clean_dedup", chunks_in=len(chunks)) as stage:
+                # Step 1: Clean texts in each chunk
+                cleaned_chunks = [
+                    ProcessedChunk(
+                        text=self.clean_text(chunk.text),
+                        source=chunk.source,
+                        score=chunk.score,
+                        metadata=chunk.metadata
+                    )
+                    for chunk in chunks
+                ]
+
+                # Remove empty chunks after cleaning
+                cleaned_chunks = [chunk for chunk in cleaned_chunks if chunk.text]
+
+                if not cleaned_chunks and strict:
+                    raise ValueError("No valid chunks after cleaning")
+
+                # Step 2: Remove exact and near-duplicate chunks, merging their sources
+                seen = self.duplicate_filter() if seen is None else seen
+                collapsed = seen.collapsed
+                unique_chunks = self.remove_duplicates(cleaned_chunks, seen)
+                stage['near_duplicates'] = seen.collapsed - collapsed
+
+                if not unique_chunks and strict:
+                    raise ValueError("No valid unique chunks after deduplication")
+
+                stage['chunks_out'] = len(unique_chunks)
+
+            return unique_chunks
+
+        except Exception as e:
+            self.logger.error(f"Error in processing: {str(e)}")
+            raise e
+
+    async def summarize_texts(self, texts: List[str]) -> List[str]:
+        """
+        Summarize cleaned texts, reusing cached summaries where possible.
+
+        Args:
+            texts (List[str]): Cleaned, unique texts
+
+        Returns:
+            List[str]: Summaries in the same order
+        """
+        try:
+            with timed_stage("summarize", chunks=len(texts)) as stage:
+                # Step 3: Reuse cached summaries of text we have seen before
+                summaries = [""] * len(texts)
+                cache_keys = [self._make_cache_key(text) for text in texts]
+
+                misses = []
+                for index, key in enumerate(cache_keys):
+                    cached = self.cache.get(key) if self.cache_enabled else None
+                    if cached is None:
+                        misses.append(index)
+                    else:
+                        summaries[index] = cached
+
+                # Step 4: Summarize cache misses in length-bucketed batches on the inference workers
+                batches = [[misses[i] for i in batch] for batch in self.make_batches([texts[i] for i in misses])] if misses else []
+
+                batch_summaries = await asyncio.gather(*[
+                    inference_executor.run(self.model_name, self.summarize_batch, [texts[i] for i in batch])
+                    for batch in batches
+                ])
+
+                for batch, batch_summary in zip(batches, batch_summaries):
+                    for index, summary in zip(batch, batch_summary):
+                        summaries[index] = summary
+
+                        # summarize_batch hands back the input text when it fails, don't cache that
+                        if self.cache_enabled and summary != texts[index]:
+                            self.cache.set(cache_keys[index], summary)
+
+                stage['cache_hits'] = len(texts) - len(misses)
+                stage['batches'] = len(batches)
+
+            return summaries
 
         except Exception as e:
             self.logger.error(f"Error in processing: {str(e)}")
             raise e
 
+    async def summarize_chunks(self, unique_chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        """
+        Summarize prepared chunks, reusing cached summaries where possible.
+
+        Args:
+            unique_chunks (List[ProcessedChunk]): Cleaned, unique chunks
+
+        Returns:
+            List[ProcessedChunk]: Summarized chunks in the same order
+        """
+        summaries = await self.summarize_texts([chunk.text for chunk in unique_chunks])
+        return [
+            ProcessedChunk(
+                text=summary,
+                source=chunk.source,
+                score=chunk.score,
+                metadata=chunk.metadata
+            )
+            for chunk, summary in zip(unique_chunks, summaries)
+        ]
+
+    async def process(self, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        """
+        Main processing pipeline to clean, deduplicate, and summarize chunks.
+
+        Args:
+            chunks (List[ProcessedChunk]): List of processed chunks
+
+        Returns:
+            List[ProcessedChunk]: List of processed and summarized chunks
+        """
+        return await self.summarize_chunks(self.prepare(chunks))
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get hit-rate counters for the summary cache."""
+        return {**self.cache.stats.as_dict(), 'entries': len(self.cache)}
+
+    def close(self) -> None:
+        """Close the summary cache and release the shared model."""
+        self.cache.close()
+        self.handle.release()
+
     async def __call__(self, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
         """
         Make the class callable so it can be used directly in pipelines.
@@ -1,8 +1,24 @@
-from typing import List, Optional
+from typing import List, NamedTuple, Optional, Dict, Any
+from pathlib import Path
+import hashlib
+import json
 import logging
+import time
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, PreTrainedModel, PreTrainedTokenizer
+from transformers import PreTrainedModel, PreTrainedTokenizer
 from ..config.settings import settings
+from ..utils.cache import TTLCache
+from ..utils.helpers import SearchHelpers
+from ..utils.metrics import record_generation, timed_stage
+from .batcher import DynamicBatcher
+from .decoding import DecodingStrategy
+from .prefix_cache import PrefixCache, PromptParts
+from .model_registry import model_registry
+
+class Decomposition(NamedTuple):
+    """Sub-queries of a query and what producing them cost."""
+    sub_queries: List[str]
+    seconds: Optional[float]  # Time the model took, None when it didn't run
 
 class QueryDecomposer:
     """
@@ -14,6 +30,10 @@ class QueryDecomposer:
         self._setup_logging()
         self.model, self.tokenizer = self._initialize_model()
         self.params = settings.QUERY_DECOMPOSER_PARAMS
+        self.decoding = DecodingStrategy("decompose")
+        self.prefix_cache = PrefixCache("decompose", self.model, self.tokenizer)
+        self.batcher = DynamicBatcher("decompose", settings.QUERY_DECOMPOSER_MODEL, self._generate_batch)
+        self._initialize_cache()
 
     def _setup_logging(self) -> None:
         """Initialize logging configuration."""
@@ -21,75 +41,91 @@ class QueryDecomposer:
         self.logger = logging.getLogger(__name__)
 
     def _initialize_model(self) -> tuple[PreTrainedModel, PreTrainedTokenizer]:
-        """Initialize the model and tokenizer."""
+        """Get the model and tokenizer from the shared model registry."""
         try:
-            # self.logger.info(f"Loading model: {settings.QUERY_DECOMPOSER_MODEL}")
-
-            # Initialize tokenizer
-            tokenizer = AutoTokenizer.from_pretrained(
-                settings.QUERY_DECOMPOSER_MODEL,
-                legacy=False,
-                padding_side="left",
-                trust_remote_code=True
-            )
-
-            # Set pad token if needed
-            if tokenizer.pad_token is None:
-                tokenizer.pad_token = tokenizer.eos_token
-
-            # Initialize model
-            model = AutoModelForCausalLM.from_pretrained(
+            # The registry hands out one shared copy per (model, dtype, device map, quantization),
+            # so stages configured with the same model don't load it twice
+            self.handle = model_registry.acquire(
                 settings.QUERY_DECOMPOSER_MODEL,
-                torch_dtype=torch.float16,
-                device_map="auto",
-                pad_token_id=tokenizer.pad_token_id,
-                trust_remote_code=True,
-                token=settings.HUGGINGFACE_API_KEY
+                dtype=settings.QUERY_DECOMPOSER_DEVICE['dtype'],
+                device_map=settings.QUERY_DECOMPOSER_DEVICE['map'],
+                quantize=settings.QUERY_DECOMPOSER_DEVICE.get('quantize')
             )
 
-            return model, tokenizer
+            return self.handle.model, self.handle.tokenizer
 
         except Exception as e:
             self.logger.error(f"Error initializing model: {str(e)}")
             raise RuntimeError(f"Failed to initialize model: {str(e)}")
 
-    def _create_prompt(self, query: str) -> str:
-        """Create the decomposition prompt."""
-        return f"""Break down this complex query into simpler, atomic sub-queries.
+    def _initialize_cache(self) -> None:
+        """Initialize the bounded LRU cache of decomposition results."""
+        cache_params = settings.DECOMPOSITION_CACHE_PARAMS
+        self.cache_enabled = cache_params.get('enabled', True)
+        self.cache = TTLCache(
+            max_size=cache_params.get('max_size', 2048),
+            ttl=cache_params.get('ttl')
+        )
+
+        # Results depend on the model, its parameters and decoding, so all are part of every key
+        fingerprint = json.dumps(
+            {
+                'model': settings.QUERY_DECOMPOSER_MODEL,
+                **self.params,
+                'decoding': {'profile': self.decoding.profile, **self.decoding.params, 'stop': self.decoding.stop}
+            },
+            sort_keys=True
+        )
+        self._params_digest = hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+
+    def _make_cache_key(self, query: str) -> str:
+        """Build the cache key for a query."""
+        return f"{SearchHelpers.normalize_query(query)}|{self._params_digest}"
+
+    def _create_prompt(self, query: str) -> PromptParts:
+        """Create the decomposition prompt, split into its fixed instructions and the query part."""
+        instructions = f"""Break down this complex query into simpler, atomic sub-queries.
         Each sub-query should focus on a specific aspect of the main query.
         Generate between {self.params['min_queries']} and {self.params['max_queries']} sub-queries, whatever you think is enough to break down the query effectively.
 
-        Original query: {query}
+        Original query:"""
+
+        return instructions, f""" {query}
 
         Sub-queries:"""
 
-    def _tokenize_input(self, prompt: str) -> torch.Tensor:
-        """Tokenize the input prompt."""
-        return self.tokenizer(
-            prompt,
-            return_tensors="pt",
-            truncation=True,
+    def _tokenize_input(self, prompts: List[PromptParts]) -> Dict[str, Any]:
+        """Tokenize a batch of prompts, reusing the cached key/values of their instructions."""
+        return self.prefix_cache.encode(
+            prompts,
             max_length=self.params.get('max_length', 512),
-            padding=True
-        ).to(self.model.device)
+            num_beams=self.decoding.params.get('num_beams', 1)
+        )
 
-    def _generate_text(self, inputs: torch.Tensor) -> str:
-        """Generate text using the model."""
+    def _generate_text(self, inputs: Dict[str, Any]) -> List[str]:
+        """Generate the completion of every row of the inputs, cut at the first stop sequence."""
+        prompt_length = inputs['input_ids'].shape[1]
+        started_at = time.perf_counter()
         with torch.no_grad():
             outputs = self.model.generate(
-                inputs.input_ids,
-                attention_mask=inputs.attention_mask,
+                **inputs,
                 pad_token_id=self.tokenizer.pad_token_id,
-                max_length=self.params.get('max_length', 512),
-                temperature=self.params.get('temperature', 0.3),
-                num_beams=self.params.get('num_beams', 4),
-                do_sample=self.params.get('do_sample', True),
-                top_p=self.params.get('top_p', 0.9),
-                top_k=self.params.get('top_k', 50),
-                repetition_penalty=self.params.get('repetition_penalty', 1.2)
+                **self.decoding.generate_kwargs(self.tokenizer, prompt_length)
             )
 
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        completions = outputs[:, prompt_length:]
+        record_generation(
+            "decompose",
+            tokens_in=inputs['attention_mask'].sum(),
+            tokens_out=(completions != self.tokenizer.pad_token_id).sum(),
+            seconds=time.perf_counter() - started_at
+        )
+
+        return [self.decoding.truncate(text) for text in self.tokenizer.batch_decode(completions, skip_special_tokens=True)]
+
+    def _generate_batch(self, prompts: List[PromptParts]) -> List[str]:
+        """Generate text for prompts batched from concurrent requests."""
+        return self._generate_text(self._tokenize_input(prompts))
 
     def _parse_output(self, output: str) -> List[str]:
         """Parse the model output into sub-queries."""
@@ -125,21 +161,31 @@ class QueryDecomposer:
 
         return sub_queries
 
-    async def decompose(self, query: str) -> List[str]:
+    async def decompose_timed(self, query: str, record_stats: bool = True) -> Decomposition:
         """
-        Decompose a complex query into multiple simpler sub-queries.
+        Decompose a complex query into multiple simpler sub-queries, timing
+        the model when it runs. Warm-up passes ``record_stats=False`` to keep
+        its lookups out of the cache's hit rate.
         """
         try:
             # self.logger.info(f"Decomposing query: {query}")
 
-            # Create and tokenize prompt
+            # Popular queries skip the model entirely
+            cache_key = self._make_cache_key(query)
+            if self.cache_enabled:
+                cached = self.cache.get(cache_key, record_stats=record_stats)
+                if cached is not None:
+                    self.logger.info(f"\n////////// Using cached decomposition //////////\n")
+                    return Decomposition(list(cached), None)
+
+            started_at = time.perf_counter()
+
+            # Create the prompt and count its tokens for the batch budget
             prompt = self._create_prompt(query)
-            inputs = self._tokenize_input(prompt)
+            prompt_tokens = len(self.tokenizer("".join(prompt), truncation=True, max_length=self.params.get('max_length', 512))['input_ids'])
 
-            # Generate text
-            generated_text = self._generate_text(inputs)
-            # just keep the response
-            generated_text = generated_text.split("Sub-queries:")[1]
+            # Generate the sub-query list on the inference workers, batched with other requests' prompts
+            generated_text = await self.batcher.submit(prompt, cost=prompt_tokens)
 
             # Parse and validate output
             sub_queries = self._parse_output(generated_text)
@@ -151,11 +197,56 @@ class QueryDecomposer:
             for i, sq in enumerate(validated_queries, 1):
                 self.logger.info(f"Sub-query {i}: {sq}")
 
-            return validated_queries
+            if self.cache_enabled:
+                self.cache.set(cache_key, validated_queries)
+
+            return Decomposition(validated_queries, time.perf_counter() - started_at)
 
         except Exception as e:
             self.logger.error(f"Error in query decomposition: {str(e)}")
-            return [query]
+            return Decomposition([query], None)
+
+    async def decompose(self, query: str) -> List[str]:
+        """
+        Decompose a complex query into multiple simpler sub-queries.
+        """
+        return (await self.decompose_timed(query)).sub_queries
+
+    async def warm_up(self, path: Optional[str] = None) -> int:
+        """
+        Pre-populate the decomposition cache from a file of popular queries.
+
+        Args:
+            path (Optional[str]): File with one query per line, '#' starts a comment.
+                Defaults to the configured warm-up file.
+
+        Returns:
+            int: Number of queries decomposed
+        """
+        path = path or settings.DECOMPOSITION_CACHE_PARAMS.get('warmup_file')
+        if not path or not self.cache_enabled:
+            return 0
+
+        if not Path(path).exists():
+            self.logger.warning(f"Decomposition warm-up file not found: {path}")
+            return 0
+
+        with open(path, "r") as f:
+            queries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+        self.logger.info(f"\n////////// Warming decomposition cache with {len(queries)} queries //////////\n")
+        # Warm-up lookups aren't traffic, so they stay out of the hit rate
+        for query in queries:
+            await self.decompose_timed(query, record_stats=False)
+        return len(queries)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get hit-rate counters for the decomposition cache."""
+        return {**self.cache.stats.as_dict(), 'entries': len(self.cache)}
+
+    def close(self) -> None:
+        """Release the shared model."""
+        self.handle.release()
 
     async def __call__(self, query: str) -> List[str]:
         """Make the class callable for easier pipeline integration."""
@@ -0,0 +1,196 @@
+from typing import List, NamedTuple, Optional
+import logging
+import re
+import threading
+import numpy as np
+from ..config.settings import settings
+from ..utils.metrics import record_route
+from .executor import inference_executor
+from .model_registry import model_registry, load_sentence_encoder
+
+# Words and punctuation that join several questions or topics into one query
+COMPOUND_MARKERS = re.compile(
+    r"\b(?:and|or|versus|vs|compare[ds]?|comparison|differences?|between|pros|cons|"
+    r"advantages|disadvantages|while|whereas|both|each|impact|affects?|effects?|relationship)\b|[,;]",
+    re.IGNORECASE
+)
+
+# Queries the embedding classifier compares new queries to, when none are configured
+SIMPLE_EXAMPLES = [
+    "weather in Paris",
+    "bitcoin price today",
+    "who is the CEO of Microsoft",
+    "height of the Eiffel Tower",
+    "define photosynthesis",
+    "python sort a list",
+]
+COMPOUND_EXAMPLES = [
+    "compare the economies of Japan and Germany",
+    "pros and cons of electric cars versus hybrids",
+    "how did the industrial revolution affect urbanization and public health",
+    "what are the differences between TCP and UDP and when should each be used",
+    "causes, consequences and lessons of the 2008 financial crisis",
+    "is R or Python better for data science and why",
+]
+
+class Route(NamedTuple):
+    """How a query is handled before retrieval."""
+    decompose: bool  # Whether the query goes to the decomposer, or is searched as-is
+    method: str      # "heuristic" or "embedding", what decided
+    score: float     # Compound markers for heuristics, centroid similarity margin for embeddings
+
+class QueryRouter:
+    """
+    Decides whether a query is compound enough to be worth decomposing.
+
+    Decomposition costs a full LLM generation, and a simple query such as
+    "weather in Paris" comes back as itself anyway. Cheap heuristics on
+    length and compound markers settle clear cases first. The rest are
+    embedded with the small bi-encoder and sent to decomposition when they
+    are closer to the compound example queries than to the simple ones.
+
+    Decisions are counted in metrics, along with an estimate of the
+    decomposition time the skipped queries saved. Decompositions that did
+    run were mostly of long, compound queries, so their running average is
+    scaled down by query length and the estimate is an upper bound.
+    """
+
+    def __init__(self):
+        self._setup_logging()
+        self.params = settings.ROUTING_PARAMS
+        self.enabled = self.params.get('enabled', True)
+        self.use_embeddings = self.enabled and self.params.get('embedding', True)
+        self.simple_max_words = self.params.get('simple_max_words', 4)
+        self.compound_min_words = self.params.get('compound_min_words', 16)
+        self.compound_min_markers = self.params.get('compound_min_markers', 2)
+        self.margin = self.params.get('margin', 0.0)
+
+        # Running averages of decomposition seconds and decomposed query words
+        self.decompose_seconds: Optional[float] = None
+        self.decompose_words: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.handle = None
+        self.centroids: Optional[np.ndarray] = None
+        if self.use_embeddings:
+            self._initialize_model()
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _initialize_model(self) -> None:
+        """Get the bi-encoder from the shared model registry and embed the example queries."""
+        try:
+            self.handle = model_registry.acquire(
+                settings.RERANKER_MODEL,
+                dtype=settings.RERANKER_DEVICE['dtype'],
+                device_map=settings.RERANKER_DEVICE['map'],
+                loader=load_sentence_encoder,
+                quantize=settings.RERANKER_DEVICE.get('quantize')
+            )
+
+            # One unit centroid per class: simple, then compound
+            centroids = [
+                self._embed(self.params.get('simple_examples') or SIMPLE_EXAMPLES).mean(axis=0),
+                self._embed(self.params.get('compound_examples') or COMPOUND_EXAMPLES).mean(axis=0)
+            ]
+            self.centroids = np.stack([centroid / np.linalg.norm(centroid) for centroid in centroids])
+
+        except Exception as e:
+            self.logger.error(f"\n////////// Error initializing router model: {str(e)} //////////\n")
+            raise RuntimeError(f"Failed to initialize router model: {str(e)}")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as unit vectors."""
+        return self.handle.model.encode(
+            texts,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        ).astype(np.float32)
+
+    def _margin(self, query: str) -> float:
+        """How much closer the query is to the compound examples than to the simple ones."""
+        simple, compound = self.centroids @ self._embed([query])[0]
+        return float(compound - simple)
+
+    async def classify(self, query: str) -> float:
+        """Similarity margin of the query, on the inference workers."""
+        return await inference_executor.run(settings.RERANKER_MODEL, self._margin, query)
+
+    def _heuristic(self, query: str) -> Optional[Route]:
+        """Route clear cases from length and compound markers alone, None when unsure."""
+        words = len(query.split())
+        markers = len(COMPOUND_MARKERS.findall(query)) + max(query.count("?") - 1, 0)
+
+        if words <= self.simple_max_words and markers == 0:
+            return Route(False, "heuristic", float(markers))
+        if words >= self.compound_min_words or markers >= self.compound_min_markers:
+            return Route(True, "heuristic", float(markers))
+        if not self.use_embeddings:
+            return Route(markers > 0, "heuristic", float(markers))
+        return None
+
+    async def route(self, query: str) -> Route:
+        """
+        Decide whether to decompose a query.
+
+        Args:
+            query (str): Original search query
+
+        Returns:
+            Route: The decision and what made it
+        """
+        if not self.enabled:
+            return Route(True, "disabled", 0.0)
+
+        route = self._heuristic(query)
+        if route is None:
+            try:
+                margin = await self.classify(query)
+                route = Route(margin > self.margin, "embedding", round(margin, 4))
+            except Exception as e:
+                # Decomposing is always safe, only slower
+                self.logger.error(f"Error classifying query: {str(e)}")
+                route = Route(True, "error", 0.0)
+
+        record_route(
+            "decompose" if route.decompose else "direct",
+            route.method,
+            saved_seconds=0.0 if route.decompose else self.estimate_saved(query)
+        )
+        return route
+
+    def estimate_saved(self, query: str) -> float:
+        """
+        Upper-bound estimate of the decomposition time skipping a query saves.
+
+        The average decomposition is scaled by the query's length relative
+        to the average decomposed query, and never exceeds the average.
+        """
+        with self._lock:
+            if self.decompose_seconds is None:
+                return 0.0
+            scale = min(1.0, len(query.split()) / max(self.decompose_words, 1.0))
+            return self.decompose_seconds * scale
+
+    def observe_decomposition(self, seconds: float, query: str) -> None:
+        """Fold the duration and query length of a decomposition into the running averages."""
+        words = len(query.split())
+        with self._lock:
+            if self.decompose_seconds is None:
+                self.decompose_seconds = seconds
+                self.decompose_words = words
+            else:
+                self.decompose_seconds += 0.1 * (seconds - self.decompose_seconds)
+                self.decompose_words += 0.1 * (words - self.decompose_words)
+
+    def close(self) -> None:
+        """Release the shared model."""
+        if self.handle is not None:
+            self.handle.release()
+
+    async def __call__(self, query: str) -> Route:
+        """Make the class callable for easier pipeline integration."""
+        return await self.route(query)
@@ -0,0 +1,167 @@
+from typing import List, Tuple
+import logging
+import numpy as np
+from ..models.schema import ProcessedChunk
+from ..config.settings import settings
+from ..utils.metrics import timed_stage
+from .executor import inference_executor
+from .model_registry import model_registry, load_sentence_encoder, load_cross_encoder
+
+class Reranker:
+    """
+    Ranks retrieved chunks against the query so only the most relevant
+    ones reach summarization and generation.
+
+    A bi-encoder scores every candidate with one batched embedding pass,
+    then a cross-encoder rescores only the best candidates, which is more
+    accurate but costs a forward pass per (query, chunk) pair.
+    """
+
+    def __init__(self):
+        self._setup_logging()
+        self.params = settings.RERANKER_PARAMS
+        self.enabled = self.params.get('enabled', True)
+        self.top_k = self.params.get('top_k', 5)
+        self.cross_encoder_name = self.params['cross_encoder']
+
+        self.encoder_handle = None
+        self.cross_encoder_handle = None
+        if self.enabled:
+            self._initialize_models()
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _initialize_models(self) -> None:
+        """Get the bi-encoder and cross-encoder from the shared model registry."""
+        try:
+            self.encoder_handle = model_registry.acquire(
+                settings.RERANKER_MODEL,
+                dtype=settings.RERANKER_DEVICE['dtype'],
+                device_map=settings.RERANKER_DEVICE['map'],
+                loader=load_sentence_encoder,
+                quantize=settings.RERANKER_DEVICE.get('quantize')
+            )
+            self.cross_encoder_handle = model_registry.acquire(
+                self.cross_encoder_name,
+                dtype=settings.RERANKER_DEVICE['dtype'],
+                device_map=settings.RERANKER_DEVICE['map'],
+                loader=load_cross_encoder,
+                quantize=settings.RERANKER_DEVICE.get('quantize')
+            )
+
+        except Exception as e:
+            self.logger.error(f"\n////////// Error initializing reranker models: {str(e)} //////////\n")
+            raise RuntimeError(f"Failed to initialize reranker models: {str(e)}")
+
+    def _bi_encoder_scores(self, query: str, texts: List[str]) -> np.ndarray:
+        """Cosine similarity of the query to every text, in one batched pass."""
+        embeddings = self.encoder_handle.model.encode(
+            [query] + texts,
+            batch_size=self.params.get('batch_size', 32),
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+        return embeddings[1:] @ embeddings[0]
+
+    def _cross_encoder_scores(self, query: str, texts: List[str]) -> np.ndarray:
+        """Relevance of each text to the query, as a probability."""
+        logits = self.cross_encoder_handle.model.predict(
+            [(query, text) for text in texts],
+            batch_size=self.params.get('batch_size', 32),
+            convert_to_numpy=True
+        )
+        return 1.0 / (1.0 + np.exp(-np.asarray(logits, dtype=np.float32)))
+
+    def _select_candidates(self, similarities: np.ndarray) -> List[int]:
+        """
+        Pick the chunks the cross-encoder should rescore.
+
+        Chunks below the similarity threshold are dropped, but the best
+        ``top_k`` are always kept so a strict threshold never leaves the
+        generator without context.
+        """
+        top_k = self.top_k
+        limit = max(self.params.get('candidates', 20), top_k)
+        threshold = self.params.get('similarity_threshold', 0.0)
+
+        order = [int(i) for i in np.argsort(-similarities)]
+        above = [i for i in order if similarities[i] >= threshold]
+        return (above if len(above) >= top_k else order[:top_k])[:limit]
+
+    async def rank_texts(self, query: str, texts: List[str]) -> List[Tuple[int, float]]:
+        """
+        Rank texts against the query with both encoders.
+
+        Returns:
+            List[Tuple[int, float]]: (index into ``texts``, score) of the
+            shortlisted texts, most relevant first
+        """
+        # Stage 1: cheap bi-encoder similarity for every candidate
+        similarities = await inference_executor.run(
+            settings.RERANKER_MODEL, self._bi_encoder_scores, query, texts
+        )
+        candidates = self._select_candidates(similarities)
+
+        # Stage 2: cross-encoder only on the shortlisted candidates
+        scores = await inference_executor.run(
+            self.cross_encoder_name, self._cross_encoder_scores, query, [texts[i] for i in candidates]
+        )
+
+        ranked = sorted(zip(candidates, scores), key=lambda pair: pair[1], reverse=True)
+        return [(index, float(score)) for index, score in ranked]
+
+    async def score(self, query: str, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        """
+        Score chunks against the query with both encoders.
+
+        Chunks the bi-encoder rules out are dropped. Batches can be scored
+        as they arrive and merged later, since every score is absolute.
+
+        Args:
+            query (str): Original search query
+            chunks (List[ProcessedChunk]): Candidate chunks
+
+        Returns:
+            List[ProcessedChunk]: Shortlisted chunks, most relevant first, with scores set
+        """
+        if not self.enabled or not chunks:
+            return chunks
+
+        try:
+            with timed_stage("rerank", chunks_in=len(chunks)) as stage:
+                ranked = await self.rank_texts(query, [chunk.text for chunk in chunks])
+                scored = [chunks[index].model_copy(update={'score': score}) for index, score in ranked]
+                stage['chunks_out'] = len(scored)
+
+            return scored
+
+        except Exception as e:
+            self.logger.error(f"Error in reranking: {str(e)}")
+            return chunks
+
+    async def rerank(self, query: str, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        """
+        Keep the ``top_k`` chunks most relevant to the query.
+
+        Args:
+            query (str): Original search query
+            chunks (List[ProcessedChunk]): Candidate chunks
+
+        Returns:
+            List[ProcessedChunk]: Best chunks, most relevant first, with scores set
+        """
+        scored = await self.score(query, chunks)
+        return scored[:self.top_k] if self.enabled else scored
+
+    def close(self) -> None:
+        """Release the shared models."""
+        for handle in (self.encoder_handle, self.cross_encoder_handle):
+            if handle is not None:
+                handle.release()
+
+    async def __call__(self, query: str, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        """Make the class callable for easier pipeline integration."""
+        return await self.rerank(query, chunks)
@@ -1,9 +1,57 @@
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
 import logging
+import threading
+import time
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, PreTrainedModel, PreTrainedTokenizer
+from transformers import PreTrainedModel, PreTrainedTokenizer, TextStreamer
 from ..models.schema import ProcessedChunk, SearchResponse
 from ..config.settings import settings
+from ..utils.metrics import record_generation
+from .batcher import DynamicBatcher
+from .context_packer import ContextPacker, PackedPrompt
+from .decoding import DecodingStrategy
+from .prefix_cache import PrefixCache, PromptParts
+from .processor import merged_sources
+from .executor import inference_executor
+from .model_registry import model_registry
+
+# Fixed start of every answer prompt
+INSTRUCTIONS = """Based on the following sources, provide a comprehensive answer to the question.
+
+Sources:"""
+
+class AsyncTextStreamer(TextStreamer):
+    """
+    Streamer that hands decoded text from the generation thread to the
+    event loop, so it can be consumed with ``async for``.
+    """
+
+    def __init__(self, tokenizer: PreTrainedTokenizer, **decode_kwargs):
+        super().__init__(tokenizer, skip_prompt=True, **decode_kwargs)
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.stop_signal = object()
+        self.ended = False
+        # Set when the consumer stops reading, so generation stops too
+        self.cancelled = threading.Event()
+
+    def on_finalized_text(self, text: str, stream_end: bool = False) -> None:
+        """Called from the generation thread with each piece of decoded text."""
+        if text:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, text)
+        if stream_end and not self.ended:
+            self.ended = True
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, self.stop_signal)
+
+    def __aiter__(self) -> "AsyncTextStreamer":
+        return self
+
+    async def __anext__(self) -> str:
+        value = await self.queue.get()
+        if value is self.stop_signal:
+            raise StopAsyncIteration
+        return value
 
 class ResponseGenerator:
     """
@@ -14,6 +62,10 @@ class ResponseGenerator:
         self._setup_logging()
         self.model, self.tokenizer = self._initialize_model()
         self.params = settings.RESPONSE_GENERATOR_PARAMS
+        self.decoding = DecodingStrategy("generate")
+        self.packer = ContextPacker(self.tokenizer, self._input_budget(), settings.MAX_CHUNKS)
+        self.prefix_cache = PrefixCache("generate", self.model, self.tokenizer)
+        self.batcher = DynamicBatcher("generate", settings.RESPONSE_GENERATOR_MODEL, self._generate_batch)
 
     def _setup_logging(self) -> None:
         """Initialize logging configuration."""
@@ -21,89 +73,123 @@ class ResponseGenerator:
         self.logger = logging.getLogger(__name__)
 
     def _initialize_model(self) -> tuple[PreTrainedModel, PreTrainedTokenizer]:
-        """Initialize the model and tokenizer."""
+        """Get the model and tokenizer from the shared model registry."""
         try:
-            # self.logger.info(f"Loading model: {settings.RESPONSE_GENERATOR_MODEL}")
-
-            # Initialize tokenizer
-            tokenizer = AutoTokenizer.from_pretrained(
+            # The registry hands out one shared copy per (model, dtype, device map, quantization),
+            # so stages configured with the same model don't load it twice
+            self.handle = model_registry.acquire(
                 settings.RESPONSE_GENERATOR_MODEL,
-                legacy=False,
-                padding_side="left",
-                trust_remote_code=True
+                dtype=settings.RESPONSE_GENERATOR_DEVICE['dtype'],
+                device_map=settings.RESPONSE_GENERATOR_DEVICE['map'],
+                quantize=settings.RESPONSE_GENERATOR_DEVICE.get('quantize')
             )
 
-            # Set pad token if needed
-            if tokenizer.pad_token is None:
-                tokenizer.pad_token = tokenizer.eos_token
-
-            # Initialize model
-            model = AutoModelForCausalLM.from_pretrained(
-                settings.RESPONSE_GENERATOR_MODEL,
-                torch_dtype=torch.float16,
-                device_map="auto",
-                pad_token_id=tokenizer.pad_token_id,
-                trust_remote_code=True,
-                token=settings.HUGGINGFACE_API_KEY
-            )
-
-            return model, tokenizer
+            return self.handle.model, self.handle.tokenizer
 
         except Exception as e:
             self.logger.error(f"\n////////// Error initializing model: {str(e)} //////////\n")
             raise RuntimeError(f"Failed to initialize model: {str(e)}")
 
-    def _prepare_prompt(self, query: str, chunks: List[ProcessedChunk]) -> str:
+    def _input_budget(self) -> int:
         """
-        Prepare the prompt for the model using the query and context chunks.
+        Prompt tokens available, ``max_length`` or less when the model's
+        context window must also hold the longest answer.
         """
-        # Sort chunks by score if available
-        sorted_chunks = sorted(chunks, key=lambda x: x.score, reverse=True)
-
-        # Combine context from top chunks
-        context_parts = []
-        for i, chunk in enumerate(sorted_chunks[:self.params.get('max_chunks', 5)]):
-            context_parts.append(f"Source {i+1}: {chunk.text}")
-
-        context = "\n".join(context_parts)
-
-        return f"""Based on the following sources, provide a comprehensive answer to the question.
-
-Sources:
-{context}
-
-Question: {query}
-
-Answer: """
-
-    def _tokenize_input(self, prompt: str) -> torch.Tensor:
-        """Tokenize the input prompt."""
-        return self.tokenizer(
-            prompt,
-            return_tensors="pt",
-            truncation=True,
-            max_length=self.params.get('max_length', 512),
-            padding=True
-        ).to(self.model.device)
-
-    def _generate_text(self, inputs: torch.Tensor) -> str:
-        """Generate text using the model."""
-        with torch.no_grad():
-            outputs = self.model.generate(
-                inputs.input_ids,
-                attention_mask=inputs.attention_mask,
-                pad_token_id=self.tokenizer.pad_token_id,
-                max_length=self.params.get('max_length', 512),
-                min_length=self.params.get('min_length', 50),
-                num_beams=self.params.get('num_beams', 4),
-                temperature=self.params.get('temperature', 0.7),
-                do_sample=self.params.get('do_sample', True),
-                top_p=self.params.get('top_p', 0.9),
-                top_k=self.params.get('top_k', 50),
-                repetition_penalty=self.params.get('repetition_penalty', 1.2)
-            )
+        budget = self.params.get('max_length', 512)
+        context_window = self.params.get('context_window')
+        if context_window:
+            budget = min(budget, context_window - self.decoding.params.get('max_new_tokens', 0))
+        return budget
+
+    def _pack_prompt(self, query: str, chunks: List[ProcessedChunk]) -> PackedPrompt:
+        """
+        Pack the query and the best context chunks that fit the input budget
+        into a prompt, split into its fixed instructions and the per-request part.
+        """
+        packed = self.packer.pack(INSTRUCTIONS, query, chunks)
+        if len(packed.chunks) < min(len(chunks), self.packer.max_chunks):
+            self.logger.info(f"Packed {len(packed.chunks)} of {len(chunks)} chunks into {packed.tokens} prompt tokens")
+        return packed
+
+    async def pack_chunks(self, query: str, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+        """
+        The chunks that fit the answer prompt, the only ones an answer can
+        draw on. Streaming callers use them for the response's sources.
+        """
+        return self._pack_prompt(query, chunks).chunks
+
+    async def fits_prompt(self, query: str, chunks: List[ProcessedChunk]) -> List[bool]:
+        """
+        Whether each chunk already fits its share of the answer prompt, so
+        it can be used without summarizing it first.
+        """
+        return self.packer.fits(INSTRUCTIONS, query, chunks)
+
+    def _prepare_prompt(self, query: str, chunks: List[ProcessedChunk]) -> PromptParts:
+        """Prepare the prompt for the model using the query and context chunks."""
+        return self._pack_prompt(query, chunks).prompt
+
+    def _tokenize_input(self, prompts: List[PromptParts], streaming: bool = False) -> Dict[str, Any]:
+        """Tokenize a batch of prompts, reusing the cached key/values of their instructions."""
+        return self.prefix_cache.encode(
+            prompts,
+            max_length=self.packer.budget,
+            # Streaming always decodes a single beam
+            num_beams=1 if streaming else self.decoding.params.get('num_beams', 1)
+        )
+
+    def _generate_text(self, inputs: Dict[str, Any], streamer: Optional[AsyncTextStreamer] = None) -> List[str]:
+        """
+        Generate the completion of every row of the inputs, cut at the first
+        stop sequence, optionally streaming tokens of a single row.
+        """
+        prompt_length = inputs['input_ids'].shape[1]
+        started_at = time.perf_counter()
+        try:
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    **inputs,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    streamer=streamer,
+                    **self.decoding.generate_kwargs(
+                        self.tokenizer,
+                        prompt_length,
+                        streaming=streamer is not None,
+                        cancel=streamer.cancelled if streamer is not None else None
+                    )
+                )
+        finally:
+            # Make sure a consumer waiting on the stream is released, even on errors
+            if streamer is not None:
+                streamer.end()
+
+        completions = outputs[:, prompt_length:]
+        record_generation(
+            "generate",
+            tokens_in=inputs['attention_mask'].sum(),
+            tokens_out=(completions != self.tokenizer.pad_token_id).sum(),
+            seconds=time.perf_counter() - started_at
+        )
+
+        return [self.decoding.truncate(text) for text in self.tokenizer.batch_decode(completions, skip_special_tokens=True)]
 
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+    def _generate_batch(self, prompts: List[PromptParts]) -> List[str]:
+        """Generate text for prompts batched from concurrent requests."""
+        return self._generate_text(self._tokenize_input(prompts))
+
+    def _stream_text(self, prompt: PromptParts, streamer: AsyncTextStreamer) -> List[str]:
+        """Generate text for one prompt, streaming its tokens."""
+        if streamer.cancelled.is_set():
+            # The consumer left while the call was queued
+            streamer.end()
+            return []
+        try:
+            inputs = self._tokenize_input([prompt], streaming=True)
+        except Exception:
+            # Release the consumer waiting on the stream
+            streamer.end()
+            raise
+        return self._generate_text(inputs, streamer)
 
     def _extract_answer(self, generated_text: str) -> str:
         """Extract the answer portion from the generated text."""
@@ -114,7 +200,7 @@ Answer: """
 
     def _get_unique_sources(self, chunks: List[ProcessedChunk]) -> List[str]:
         """Get unique sources from chunks."""
-        return list(set(chunk.source for chunk in chunks if chunk.source))
+        return [source for source in merged_sources(chunks) if source]
 
     async def generate(self, query: str, chunks: List[ProcessedChunk]) -> SearchResponse:
         """
@@ -126,14 +212,13 @@ Answer: """
             if not chunks:
                 raise ValueError("No context chunks provided")
 
-            # Prepare and tokenize input
-            prompt = self._prepare_prompt(query, chunks)
-            inputs = self._tokenize_input(prompt)
+            # Pack the prompt, whose token count is the batch budget cost
+            packed = self._pack_prompt(query, chunks)
 
-            # Generate and process response
-            generated_text = self._generate_text(inputs)
+            # Generate on the inference workers, batched with other requests' prompts
+            generated_text = await self.batcher.submit(packed.prompt, cost=packed.tokens)
             answer = self._extract_answer(generated_text)
-            sources = self._get_unique_sources(chunks)
+            sources = self._get_unique_sources(packed.chunks)
 
             # self.logger.info("Successfully generated response")
 
@@ -150,6 +235,54 @@ Answer: """
                 sources=[]
             )
 
+    async def stream(self, query: str, chunks: List[ProcessedChunk]) -> AsyncIterator[str]:
+        """
+        Generate a response, yielding answer text as it is produced.
+
+        Args:
+            query (str): Original search query
+            chunks (List[ProcessedChunk]): Context chunks
+
+        Yields:
+            str: Pieces of the answer, in order
+        """
+        if not chunks:
+            raise ValueError("No context chunks provided")
+
+        # Pack the prompt into the input budget
+        prompt = self._prepare_prompt(query, chunks)
+
+        # Tokenize and generate on the inference workers, which may compute the
+        # instructions' key/values, and relay text as the streamer receives it
+        streamer = AsyncTextStreamer(self.tokenizer, skip_special_tokens=True)
+        generation = await inference_executor.submit(
+            settings.RESPONSE_GENERATOR_MODEL, self._stream_text, prompt, streamer
+        )
+
+        finished = False
+        try:
+            # Stop relaying at the first stop sequence, which never reaches the client
+            async for text in self.decoding.stream(streamer):
+                yield text
+            finished = True
+        finally:
+            if not finished:
+                # The consumer went away: free the inference worker and still log generation errors
+                streamer.cancelled.set()
+                generation.add_done_callback(self._log_stream_error)
+
+        # Surface generation errors once the stream has ended
+        await generation
+
+    def _log_stream_error(self, generation: asyncio.Future) -> None:
+        """Log the error of a generation whose stream was abandoned."""
+        if not generation.cancelled() and generation.exception() is not None:
+            self.logger.error(f"Error generating abandoned stream: {str(generation.exception())}")
+
+    def close(self) -> None:
+        """Release the shared model."""
+        self.handle.release()
+
     async def __call__(self, query: str, chunks: List[ProcessedChunk]) -> SearchResponse:
         """Make the class callable for easier pipeline integration."""
         return await self.generate(query, chunks)
\ No newline at end of file
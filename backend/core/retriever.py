@@ -1,10 +1,16 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
+from itertools import chain
+import asyncio
 import os
 from dotenv import load_dotenv
-from langchain_google_community import GoogleSearchAPIWrapper
 from ..models.schema import ProcessedChunk
 from ..config.settings import settings
 from ..core.chunker import Chunker
+from ..core.search_client import SearchClient
+from ..core.search_cache import SearchResultCache
+from ..core.page_fetcher import PageFetcher
+from ..core.vector_store import VectorStore
+from ..utils.metrics import timed_stage
 
 class Retriever:
     """
@@ -12,10 +18,15 @@ class Retriever:
     from various sources.
     """
 
-    def __init__(self):
+    def __init__(self, vector_store: Optional[VectorStore] = None):
         self._load_credentials()
         self.chunker = Chunker()
-        self.search_wrapper = self._initialize_search_wrapper()
+        self.search_client = self._initialize_search_client()
+        self.search_cache = SearchResultCache(self.search_client.results)
+        # Workers of a model server pass in a client of the server's store
+        self.vector_store = vector_store if vector_store is not None else VectorStore()
+        self.page_fetcher = PageFetcher()
+        self._indexing: Set[asyncio.Task] = set()
 
     def _load_credentials(self) -> None:
         """Load and validate API credentials."""
@@ -26,25 +37,48 @@ class Retriever:
         if not self.google_api_key or not self.google_cse_id:
             raise ValueError("GOOGLE_API_KEY and GOOGLE_CSE_ID must be set in .env file")
 
-    def _initialize_search_wrapper(self) -> GoogleSearchAPIWrapper:
-        """Initialize the Google Search API wrapper."""
-        return GoogleSearchAPIWrapper(
-            google_api_key=self.google_api_key,
-            google_cse_id=self.google_cse_id,
-            k=settings.SOURCE_NUM
+    def _initialize_search_client(self) -> SearchClient:
+        """Initialize the async Google Search client."""
+        return SearchClient(
+            api_key=self.google_api_key,
+            cse_id=self.google_cse_id
         )
 
-    def _process_search_result(self, result: Dict[str, Any]) -> List[ProcessedChunk]:
-        """Process a single search result into chunks."""
+    def _result_document(self, result: Dict[str, Any], page: Optional[Dict[str, str]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Text and chunk metadata of a search result, from its page text when it was fetched."""
         metadata = {
             'source': result['link'],
-            'title': result.get('title', ''),
+            'title': result.get('title', '') or (page or {}).get('title', ''),
             'score': result.get('score', 0.0),
-            'position': result.get('position', 0)
+            'position': result.get('position', 0),
+            'content': 'page' if page else 'snippet'
         }
 
-        # Process the snippet using Chunker and return a flat list of chunks
-        return self.chunker.process(result['snippet'], metadata)
+        return (page['text'] if page else result['snippet']), metadata
+
+    async def _process_search_result(self, result: Dict[str, Any], page: Optional[Dict[str, str]] = None) -> List[ProcessedChunk]:
+        """Process a single search result into chunks, large pages in the chunker's process pool."""
+        return await self.chunker.process_async(*self._result_document(result, page))
+
+    async def _fetch_and_chunk(self, results: List[Dict[str, Any]]) -> List[ProcessedChunk]:
+        """Fetch result pages concurrently, chunking each page as soon as it arrives."""
+        results = results[:self.page_fetcher.params.get('max_pages', len(results))]
+
+        async def fetch(index: int, result: Dict[str, Any]):
+            return index, await self.page_fetcher.fetch(result['link'])
+
+        fetches = [asyncio.ensure_future(fetch(index, result)) for index, result in enumerate(results)]
+        chunks_per_result: List[List[ProcessedChunk]] = [[] for _ in results]
+        try:
+            for fetched in asyncio.as_completed(fetches):
+                index, page = await fetched
+                chunks_per_result[index] = await self._process_search_result(results[index], page)
+        finally:
+            for task in fetches:
+                task.cancel()
+
+        # Keep search result order regardless of which page arrived first
+        return list(chain.from_iterable(chunks_per_result))
 
     async def retrieve(self, query: str) -> List[ProcessedChunk]:
         """
@@ -57,24 +91,57 @@ class Retriever:
             List[ProcessedChunk]: Flat list of processed chunks from search results
         """
         try:
-            # Get search results
-            search_results = self.search_wrapper.results(
-                query=query,
-                num_results=settings.SOURCE_NUM
-            )
+            # Answer from the local index when it already holds enough relevant chunks
+            with timed_stage("local_search", query=query) as stage:
+                local_chunks = await self.vector_store.search(query)
+                stage['hit'] = local_chunks is not None
+            if local_chunks is not None:
+                return local_chunks
+
+            # Get search results, from the cache when this sub-query was seen recently
+            with timed_stage("search", query=query) as stage:
+                search_results = await self.search_cache.results(
+                    query=query,
+                    num_results=settings.SOURCE_NUM
+                )
+                stage['results'] = len(search_results)
 
             # Process all results into a flat list of chunks
-            all_chunks = []
-            for result in search_results:
-                chunks = self._process_search_result(result)
-                all_chunks.extend(chunks)  # Ensure we append chunks to a flat list
+            if self.page_fetcher.enabled:
+                with timed_stage("fetch", query=query) as stage:
+                    all_chunks = await self._fetch_and_chunk(search_results)
+                    stage['chunks'] = len(all_chunks)
+                max_chunks = self.page_fetcher.params.get('max_chunks', settings.CHUNK_PROCESSOR_PARAMS['max_chunks'])
+            else:
+                with timed_stage("chunk", query=query) as stage:
+                    chunks_per_result = await self.chunker.process_many(
+                        [self._result_document(result) for result in search_results]
+                    )
+                    all_chunks = list(chain.from_iterable(chunks_per_result))  # Ensure we return a flat list
+                    stage['chunks'] = len(all_chunks)
+                max_chunks = settings.CHUNK_PROCESSOR_PARAMS['max_chunks']
 
-            return all_chunks[:settings.CHUNK_PROCESSOR_PARAMS['max_chunks']]
+            # Index the new chunks off the request path
+            task = asyncio.ensure_future(self.vector_store.add(all_chunks))
+            self._indexing.add(task)
+            task.add_done_callback(self._indexing.discard)
+
+            return all_chunks[:max_chunks]
 
         except Exception as e:
             print(f"Error in retrieval: {str(e)}")
             return []
 
+    async def close(self) -> None:
+        """Release the search cache, vector index, page fetcher, chunking pool and pooled search connections."""
+        if self._indexing:
+            await asyncio.gather(*self._indexing, return_exceptions=True)
+        self.vector_store.close()
+        await self.search_cache.aclose()
+        await self.page_fetcher.aclose()
+        self.chunker.close()
+        await self.search_client.aclose()
+
     async def __call__(self, query: str) -> List[ProcessedChunk]:
         """Make the class callable for easier pipeline integration."""
         return await self.retrieve(query)
\ No newline at end of file
@@ -0,0 +1,129 @@
+from typing import Any, Awaitable, Callable, Dict, List, Set
+import asyncio
+import logging
+from ..config.settings import settings
+from ..utils.cache import TTLCache
+from ..utils.helpers import SearchHelpers
+
+SearchFunction = Callable[[str, int], Awaitable[List[Dict[str, Any]]]]
+
+class SearchResultCache:
+    """
+    Persistent cache of raw search results keyed by sub-query.
+
+    Results younger than ``ttl`` are served as-is. Results past ``ttl`` but
+    within ``stale_ttl`` more are served immediately while a background
+    refresh fetches new ones (stale-while-revalidate). Concurrent lookups
+    of the same uncached sub-query share a single upstream call.
+    """
+
+    def __init__(self, search: SearchFunction):
+        self._setup_logging()
+        self.search = search
+        self.params = settings.SEARCH_CACHE_PARAMS
+        self.enabled = self.params.get('enabled', True)
+        self.ttl = self.params.get('ttl', 86400)
+        self.stale_ttl = self.params.get('stale_ttl', 0)
+
+        # Freshness is handled here, so the store itself never expires entries
+        self.store = TTLCache(
+            max_size=self.params.get('max_size', 4096),
+            disk_path=self.params.get('disk_path'),
+            disk_max_size=self.params.get('disk_max_size')
+        )
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.refreshes = 0
+
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _make_key(query: str, num_results: int) -> str:
+        """Build the cache key for a sub-query."""
+        return f"{SearchHelpers.normalize_query(query)}|{num_results}"
+
+    async def _fetch_and_store(self, key: str, query: str, num_results: int) -> List[Dict[str, Any]]:
+        """Call the upstream search and cache its results."""
+        results = await self.search(query, num_results)
+        self.store.set(key, results)
+        return results
+
+    async def _fetch(self, key: str, query: str, num_results: int) -> List[Dict[str, Any]]:
+        """Fetch results, joining an in-flight call for the same key if there is one."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key, query, num_results))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # Shield the shared call so one cancelled caller doesn't cancel it for the others
+        return await asyncio.shield(task)
+
+    async def _revalidate(self, key: str, query: str, num_results: int) -> None:
+        """Refresh a stale entry in the background."""
+        try:
+            self.refreshes += 1
+            await self._fetch(key, query, num_results)
+        except Exception as e:
+            self.logger.warning(f"Background refresh failed for '{query}': {str(e)}")
+
+    async def results(self, query: str, num_results: int) -> List[Dict[str, Any]]:
+        """
+        Get search results for a sub-query, from the cache when possible.
+
+        Args:
+            query (str): Search query
+            num_results (int): Number of results to return
+
+        Returns:
+            List[Dict[str, Any]]: Search results
+        """
+        if not self.enabled:
+            return await self.search(query, num_results)
+
+        key = self._make_key(query, num_results)
+        entry = self.store.get_entry(key)
+
+        if entry is not None:
+            results, age = entry
+
+            if age <= self.ttl:
+                self.store.stats.hits += 1
+                return results
+
+            if age <= self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    task = asyncio.ensure_future(self._revalidate(key, query, num_results))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return results
+
+            self.store.stats.expirations += 1
+
+        self.store.stats.misses += 1
+        return await self._fetch(key, query, num_results)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit, miss and deduplication counters."""
+        return {
+            **self.store.stats.as_dict(),
+            'stale_hits': self.stale_hits,
+            'coalesced': self.coalesced,
+            'refreshes': self.refreshes,
+            'entries': len(self.store.disk) if self.store.disk is not None else len(self.store)
+        }
+
+    async def aclose(self) -> None:
+        """Wait for background refreshes and close the disk store."""
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        self.store.close()
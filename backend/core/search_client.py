@@ -0,0 +1,142 @@
+from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+import random
+from urllib.parse import urlsplit
+import httpx
+from ..config.settings import settings
+
+class SearchClient:
+    """
+    Async client for the Google Custom Search JSON API.
+
+    All searches share one pooled HTTP client with keep-alive connections,
+    so concurrent sub-query searches overlap instead of running one after
+    another. The endpoint is configurable, which lets a local stand-in
+    (see ``backend.utils.stub_search``) replace Google for offline runs.
+    """
+
+    # Google returns at most 10 results per request
+    PAGE_SIZE = 10
+
+    def __init__(self, api_key: str, cse_id: str, endpoint: Optional[str] = None):
+        self._setup_logging()
+        self.api_key = api_key
+        self.cse_id = cse_id
+        self.endpoint = endpoint or settings.GOOGLE_SEARCH_ENDPOINT
+        self.params = settings.SOURCE_PARAMS
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+        # Request URLs carry the API key, keep httpx from logging them
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.params.get('timeout', 10.0)),
+                limits=httpx.Limits(
+                    max_connections=self.params.get('max_connections', 20),
+                    max_keepalive_connections=self.params.get('max_keepalive', 10),
+                    keepalive_expiry=self.params.get('keepalive_expiry', 30.0)
+                )
+            )
+        return self._client
+
+    def _get_host_limit(self, url: str) -> asyncio.Semaphore:
+        """Get the semaphore capping concurrent requests to a host."""
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.params.get('per_host_limit', 8))
+        return self._host_limits[host]
+
+    def _build_params(self, query: str, start: int, num: int) -> Dict[str, Any]:
+        """Build the query string for one page of results."""
+        params = {
+            'key': self.api_key,
+            'cx': self.cse_id,
+            'q': query,
+            'num': num,
+            'start': start,
+            'safe': 'active' if self.params.get('safe_search', True) else 'off'
+        }
+        if self.params.get('country'):
+            params['gl'] = self.params['country']
+        if self.params.get('language'):
+            params['lr'] = f"lang_{self.params['language']}"
+        return params
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, self.params.get('retry_backoff', 0.5) * (2 ** attempt))
+
+    async def _request(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one search request, retrying transient failures."""
+        client = self._get_client()
+        max_retries = self.params.get('max_retries', 3)
+
+        for attempt in range(max_retries + 1):
+            try:
+                async with self._get_host_limit(self.endpoint):
+                    response = await client.get(self.endpoint, params=params)
+
+                # Retry rate limiting and server errors, fail fast on anything else
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise httpx.HTTPStatusError(
+                        f"Search endpoint returned {response.status_code}",
+                        request=response.request,
+                        response=response
+                    )
+                response.raise_for_status()
+                return response.json()
+
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or (
+                    e.response.status_code == 429 or e.response.status_code >= 500
+                )
+                if not retryable or attempt == max_retries:
+                    raise
+
+                delay = self._backoff(attempt)
+                self.logger.warning(f"Search request failed ({str(e)}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def results(self, query: str, num_results: int) -> List[Dict[str, Any]]:
+        """
+        Search for a query.
+
+        Args:
+            query (str): Search query
+            num_results (int): Number of results to return
+
+        Returns:
+            List[Dict[str, Any]]: Results with 'title', 'link' and 'snippet' keys
+        """
+        # Fetch all pages concurrently
+        pages = await asyncio.gather(*[
+            self._request(self._build_params(query, start + 1, min(self.PAGE_SIZE, num_results - start)))
+            for start in range(0, num_results, self.PAGE_SIZE)
+        ])
+
+        results = []
+        for page in pages:
+            for item in page.get('items', []):
+                results.append({
+                    'title': item.get('title', ''),
+                    'link': item['link'],
+                    'snippet': item.get('snippet', '')
+                })
+
+        return results[:num_results]
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,115 @@
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, List, Optional
+import asyncio
+import logging
+
+# Marks the end of a stream on a queue
+_END = object()
+
+StageFunction = Callable[[Any], Awaitable[Optional[Any]]]
+
+class PipelineStage:
+    """
+    One step of a ``StreamPipeline``.
+
+    ``fn`` is awaited once per item and returns the item to pass on, or
+    None to drop it. ``workers`` items are processed concurrently, and at
+    most ``queue_size`` items wait in front of the stage before upstream
+    stages are made to wait too.
+    """
+
+    def __init__(self, name: str, fn: StageFunction, workers: int = 1, queue_size: int = 4):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+
+class StreamPipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues.
+
+    Every stage starts on an item as soon as the previous stage hands it
+    over, so a slow source no longer holds up work on the items it has
+    already produced, and the bounded queues apply backpressure when a
+    downstream stage falls behind. Output is yielded in completion order.
+    """
+
+    def __init__(self, stages: List[PipelineStage]):
+        self._setup_logging()
+        self.stages = stages
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self, source: AsyncIterable[Any]) -> AsyncIterator[Any]:
+        """
+        Stream items from a source through every stage.
+
+        Args:
+            source (AsyncIterable[Any]): Items to process
+
+        Yields:
+            Any: Items that made it through the last stage
+
+        Raises:
+            Exception: The first error raised by the source or any stage
+        """
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        output: asyncio.Queue = asyncio.Queue()
+        queues.append(output)
+        errors: List[BaseException] = []
+
+        async def feed() -> None:
+            try:
+                async for item in source:
+                    await queues[0].put(item)
+                await queues[0].put(_END)
+            except Exception as e:
+                errors.append(e)
+                output.put_nowait(_END)
+            finally:
+                # Let an async generator source clean up even when stopped at a yield
+                if hasattr(source, "aclose"):
+                    await source.aclose()
+
+        async def work(index: int, stage: PipelineStage, remaining: List[int]) -> None:
+            inbox, outbox = queues[index], queues[index + 1]
+            try:
+                while True:
+                    item = await inbox.get()
+                    if item is _END:
+                        # Leave the marker for the stage's other workers
+                        inbox.put_nowait(_END)
+                        break
+
+                    result = await stage.fn(item)
+                    if result is not None:
+                        await outbox.put(result)
+
+                # The last worker of a stage to finish closes the stream downstream
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    await outbox.put(_END)
+
+            except Exception as e:
+                self.logger.error(f"Error in pipeline stage '{stage.name}': {str(e)}")
+                errors.append(e)
+                output.put_nowait(_END)
+
+        tasks = [asyncio.ensure_future(feed())]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            tasks.extend(asyncio.ensure_future(work(index, stage, remaining)) for _ in range(stage.workers))
+
+        try:
+            while True:
+                item = await output.get()
+                if errors:
+                    raise errors[0]
+                if item is _END:
+                    break
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
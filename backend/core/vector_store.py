@@ -0,0 +1,169 @@
+from typing import Any, Dict, List, Optional
+import hashlib
+import logging
+import numpy as np
+from ..models.schema import ProcessedChunk
+from ..config.settings import settings
+from ..utils.vector_index import VectorIndex
+from .executor import inference_executor
+from .model_registry import model_registry, load_sentence_encoder
+
+class VectorStore:
+    """
+    Local vector store of every chunk the retriever has produced.
+
+    Chunks are embedded with the shared sentence encoder and appended to a
+    persistent on-disk index. A sub-query is answered from the index when
+    enough stored chunks are similar to it, so recurring topics don't need
+    a web search.
+    """
+
+    def __init__(self):
+        self._setup_logging()
+        self.params = settings.VECTOR_INDEX_PARAMS
+        self.enabled = self.params.get('enabled', True)
+        self.similarity_threshold = self.params.get('similarity_threshold', 0.75)
+        self.min_hits = self.params.get('min_hits', 3)
+        self.top_k = self.params.get('top_k', settings.CHUNK_PROCESSOR_PARAMS['max_chunks'])
+
+        self.local_hits = 0
+        self.fallbacks = 0
+
+        self.handle = None
+        self.index = None
+        if self.enabled:
+            self._initialize_index()
+
+    def _setup_logging(self) -> None:
+        """Initialize logging configuration."""
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _initialize_index(self) -> None:
+        """Get the sentence encoder and open the on-disk index."""
+        self.handle = model_registry.acquire(
+            settings.RERANKER_MODEL,
+            dtype=settings.RERANKER_DEVICE['dtype'],
+            device_map=settings.RERANKER_DEVICE['map'],
+            loader=load_sentence_encoder,
+            quantize=settings.RERANKER_DEVICE.get('quantize')
+        )
+        self.index = VectorIndex(
+            self.params['path'],
+            dim=self.handle.model.get_sentence_embedding_dimension(),
+            model=settings.RERANKER_MODEL
+        )
+        self.logger.info(f"Opened vector index with {len(self.index)} chunks")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as unit vectors."""
+        return self.handle.model.encode(
+            texts,
+            batch_size=settings.RERANKER_PARAMS.get('batch_size', 32),
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        ).astype(np.float32)
+
+    @staticmethod
+    def _chunk_hash(chunk: ProcessedChunk) -> str:
+        """Identify a chunk by its text and source."""
+        return hashlib.sha256(f"{chunk.source}\n{chunk.text}".encode()).hexdigest()
+
+    def _search(self, query: str) -> List[ProcessedChunk]:
+        """Embed a query and collect indexed chunks above the similarity threshold."""
+        hits = self.index.search(self._embed([query]), self.top_k)[0]
+        return [
+            ProcessedChunk(
+                text=entry['text'],
+                source=entry['source'],
+                score=similarity,
+                metadata={**entry['metadata'], 'retrieval': 'local'}
+            )
+            for similarity, entry in hits
+            if similarity >= self.similarity_threshold
+        ]
+
+    def _add(self, chunks: List[ProcessedChunk]) -> int:
+        """Embed and append chunks that are not indexed yet."""
+        hashes = [self._chunk_hash(chunk) for chunk in chunks]
+        known = self.index.contains(hashes)
+        new = [(chunk, key) for chunk, key in zip(chunks, hashes) if key not in known]
+        if not new:
+            return 0
+
+        vectors = self._embed([chunk.text for chunk, _ in new])
+        return self.index.add(vectors, [
+            {
+                'hash': key,
+                'text': chunk.text,
+                'source': chunk.source,
+                'title': chunk.metadata.get('title', ''),
+                'metadata': chunk.metadata
+            }
+            for chunk, key in new
+        ])
+
+    async def search(self, query: str) -> Optional[List[ProcessedChunk]]:
+        """
+        Answer a sub-query from the local index.
+
+        Args:
+            query (str): Search query
+
+        Returns:
+            Optional[List[ProcessedChunk]]: Matching chunks, or None when there
+            are too few good matches and the caller should search the web
+        """
+        if not self.enabled:
+            return None
+
+        if not len(self.index):
+            self.fallbacks += 1
+            return None
+
+        try:
+            chunks = await inference_executor.run(settings.RERANKER_MODEL, self._search, query)
+        except Exception as e:
+            self.logger.error(f"Error searching vector index: {str(e)}")
+            return None
+
+        if len(chunks) < self.min_hits:
+            self.fallbacks += 1
+            return None
+
+        self.local_hits += 1
+        return chunks
+
+    async def add(self, chunks: List[ProcessedChunk]) -> None:
+        """
+        Index retrieved chunks for later sub-queries.
+
+        Args:
+            chunks (List[ProcessedChunk]): Chunks produced by the chunker
+        """
+        if not self.enabled or not chunks:
+            return
+
+        try:
+            added = await inference_executor.run(settings.RERANKER_MODEL, self._add, chunks)
+            if added:
+                self.logger.info(f"Indexed {added} new chunks ({len(self.index)} total)")
+        except Exception as e:
+            self.logger.error(f"Error adding chunks to vector index: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get how often sub-queries were answered locally."""
+        lookups = self.local_hits + self.fallbacks
+        return {
+            'entries': len(self.index) if self.index is not None else 0,
+            'local_hits': self.local_hits,
+            'fallbacks': self.fallbacks,
+            'hit_rate': round(self.local_hits / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        """Close the index and release the embedding model."""
+        if self.index is not None:
+            self.index.close()
+        if self.handle is not None:
+            self.handle.release()
@@ -0,0 +1,215 @@
+# backend/utils/cache.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+class CacheStats:
+    """Hit, miss and eviction counters for a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the counters as a dictionary."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class MemoryStore:
+    """In-memory LRU store of (value, stored_at) entries."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Get an entry and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float) -> int:
+        """Store an entry, returning how many entries were evicted to make room."""
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+
+            evicted = 0
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskStore:
+    """SQLite-backed store of JSON-serialisable (value, stored_at) entries."""
+
+    def __init__(self, path: str, max_size: Optional[int] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Get an entry and mark it as recently used."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET used_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float) -> int:
+        """Store an entry, returning how many entries were evicted to make room."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, stored_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, time.time()),
+            )
+
+            evicted = 0
+            if self.max_size is not None:
+                evicted = self._conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    "SELECT key FROM entries ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                ).rowcount
+            self._conn.commit()
+            return evicted
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class TTLCache:
+    """
+    LRU cache with a time-to-live, backed by memory and optionally by disk.
+
+    Lookups check memory first and fall back to the disk store, promoting
+    disk hits into memory. Values written to a disk store must be
+    JSON-serialisable.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None, disk_path: Optional[str] = None,
+                 disk_max_size: Optional[int] = None):
+        self.ttl = ttl
+        self.memory = MemoryStore(max_size)
+        self.disk = DiskStore(disk_path, disk_max_size) if disk_path else None
+        self.stats = CacheStats()
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Get a value and its age in seconds, even if it has expired.
+
+        Does not touch the hit/miss counters, which lets callers decide
+        for themselves what to do with stale entries.
+        """
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.stats.evictions += self.memory.set(key, *entry)
+
+        if entry is None:
+            return None
+
+        value, stored_at = entry
+        return value, time.time() - stored_at
+
+    def get(self, key: str, record_stats: bool = True) -> Optional[Any]:
+        """
+        Get a value, or None if it is missing or expired.
+
+        Lookups that aren't traffic, such as warm-up, pass ``record_stats=False``
+        to leave the hit/miss counters alone.
+        """
+        entry = self.get_entry(key)
+
+        if entry is not None and self.ttl is not None and entry[1] > self.ttl:
+            if record_stats:
+                self.stats.expirations += 1
+            self.delete(key)
+            entry = None
+
+        if entry is None:
+            if record_stats:
+                self.stats.misses += 1
+            return None
+
+        if record_stats:
+            self.stats.hits += 1
+        return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value."""
+        stored_at = time.time()
+        self.stats.evictions += self.memory.set(key, value, stored_at)
+        if self.disk is not None:
+            self.disk.set(key, value, stored_at)
+
+    def delete(self, key: str) -> None:
+        """Remove a value from every layer."""
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def close(self) -> None:
+        """Close the disk store, if any."""
+        if self.disk is not None:
+            self.disk.close()
+
+    def __len__(self) -> int:
+        return len(self.memory)
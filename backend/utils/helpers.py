@@ -1,5 +1,6 @@
 # backend/utils/helpers.py
 
+import re
 import time
 from typing import Any, Dict, List
 from datetime import datetime
@@ -17,6 +18,12 @@ class SearchHelpers:
         seen = set()
         return [x for x in chunks if not (x in seen or seen.add(x))]
 
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query for use as a cache key."""
+        query = " ".join(query.lower().split())
+        return re.sub(r"[\s?.!]+$", "", query)
+
 
 class ValidationHelpers:
     @staticmethod
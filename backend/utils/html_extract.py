@@ -0,0 +1,124 @@
+# backend/utils/html_extract.py
+#
+# Main-text extraction from HTML using only the standard library parser.
+# extract_main_text is a plain module-level function so it can run in a
+# process pool, keeping parsing off the event loop and the GIL.
+
+import codecs
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+# Content inside these tags is never part of the main text
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "iframe"}
+
+# Tags that end a block of text
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr", "td", "th",
+    "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "br", "dd", "dt", "figcaption",
+}
+
+# Elements whose text is preferred over the rest of the page when present
+MAIN_TAGS = {"article", "main"}
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class MainTextParser(HTMLParser):
+    """Collect text blocks from an HTML page, separating main content from the rest."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.blocks: List[str] = []
+        self.main_blocks: List[str] = []
+        self._current: List[str] = []
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._in_title = False
+
+    def _flush(self) -> None:
+        text = " ".join("".join(self._current).split())
+        self._current = []
+        if text:
+            self.blocks.append(text)
+            if self._main_depth:
+                self.main_blocks.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._flush()
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS:
+            self._main_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        if tag in MAIN_TAGS:
+            self._main_depth = max(0, self._main_depth - 1)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_main_text(
+    content: bytes,
+    encoding: Optional[str] = None,
+    min_block_length: int = 40,
+    max_chars: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Extract the title and main text of an HTML page.
+
+    Text inside <article> or <main> is used when the page has enough of it,
+    otherwise every block outside navigation and boilerplate is used. Short
+    blocks such as menu labels and bylines are dropped. Blocks are separated
+    by blank lines so the chunker can split on paragraph boundaries.
+
+    Args:
+        content (bytes): Raw HTML
+        encoding (Optional[str]): Character set from the response headers
+        min_block_length (int): Shortest block kept, in characters
+        max_chars (Optional[int]): Truncate the text to this many characters
+
+    Returns:
+        Dict[str, str]: 'title' and 'text' of the page
+    """
+    try:
+        codecs.lookup(encoding or "utf-8")
+    except LookupError:
+        encoding = None
+    html = content.decode(encoding or "utf-8", errors="replace")
+
+    parser = MainTextParser()
+    parser.feed(html)
+    parser.close()
+
+    main_text = [block for block in parser.main_blocks if len(block) >= min_block_length]
+    blocks = main_text if main_text else [block for block in parser.blocks if len(block) >= min_block_length]
+
+    text = "\n\n".join(blocks)
+    if max_chars is not None:
+        text = text[:max_chars]
+
+    return {"title": " ".join(parser.title.split()), "text": text}
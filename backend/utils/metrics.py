@@ -0,0 +1,241 @@
+# backend/utils/metrics.py
+
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Histogram buckets in seconds, from sub-millisecond cache hits up to slow generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Dict[str, Any]]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def describe(self, name: str, metric_type: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Register a metric's type and help text."""
+        with self._lock:
+            self._help[name] = (metric_type, help_text)
+            if metric_type == "histogram":
+                self._buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Increment a counter."""
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Set a gauge to a value."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Record an observation in a histogram."""
+        with self._lock:
+            buckets = self._buckets.get(name, DEFAULT_BUCKETS)
+            series = self._histograms.setdefault(name, {})
+            histogram = series.setdefault(
+                _label_key(labels), {"counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def header(name: str, default_type: str) -> None:
+            metric_type, help_text = self._help.get(name, (default_type, ""))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+            for name, series in sorted(self._gauges.items()):
+                header(name, "gauge")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                header(name, "histogram")
+                buckets = self._buckets.get(name, DEFAULT_BUCKETS)
+                for key, histogram in series.items():
+                    for bound, count in zip(buckets, histogram["counts"]):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', str(bound)))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram['sum']}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Create a global registry that every stage records into
+metrics = MetricsRegistry()
+metrics.describe("stratos_requests_total", "counter", "Search requests by endpoint and outcome.")
+metrics.describe("stratos_request_seconds", "histogram", "End-to-end search request latency.")
+metrics.describe("stratos_stage_seconds", "histogram", "Wall time per pipeline stage.")
+metrics.describe("stratos_queue_wait_seconds", "histogram", "Time model calls waited for an inference worker.")
+metrics.describe("stratos_tokens_in_total", "counter", "Tokens fed to models, by stage.")
+metrics.describe("stratos_tokens_out_total", "counter", "Tokens generated by models, by stage.")
+metrics.describe("stratos_tokens_per_second", "histogram", "Generation throughput per model call.", RATE_BUCKETS)
+metrics.describe("stratos_inference_queue_depth", "gauge", "Model calls waiting for an inference worker.")
+metrics.describe("stratos_batch_size", "histogram", "Requests served by one batched model call.", BATCH_BUCKETS)
+metrics.describe("stratos_stage_ready", "gauge", "Whether a pipeline stage has finished loading.")
+metrics.describe("stratos_route_total", "counter", "Queries routed to decomposition or searched as-is, by deciding method.")
+metrics.describe("stratos_route_estimated_saved_seconds_total", "counter", "Upper-bound estimate of decomposition time saved by searching simple queries as-is.")
+
+
+class Trace:
+    """
+    Per-request record of stage timings, token counts and queue waits.
+
+    Entering a trace makes it current for everything the request runs,
+    including model calls handed to the inference executor, so stages
+    can record into it without passing it around.
+    """
+
+    def __init__(self, query: str = ""):
+        self.trace_id = uuid.uuid4().hex
+        self.query = query
+        self.stages: List[Dict[str, Any]] = []
+        self.started_at = time.perf_counter()
+        self.total_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._token: Optional[contextvars.Token] = None
+
+    def __enter__(self) -> "Trace":
+        self.started_at = time.perf_counter()
+        self._token = _current_trace.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.total_seconds = time.perf_counter() - self.started_at
+        try:
+            _current_trace.reset(self._token)
+        except ValueError:
+            # A streaming response closed from another context, the trace there is already gone
+            pass
+
+    def record(self, stage: str, seconds: float, **attributes: Any) -> None:
+        """Add a finished stage to the trace."""
+        with self._lock:
+            self.stages.append({
+                "stage": stage,
+                "seconds": round(seconds, 6),
+                "offset": round(time.perf_counter() - self.started_at - seconds, 6),
+                **attributes,
+            })
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the trace as a JSON-serialisable dictionary."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            stages = list(self.stages)
+        for entry in stages:
+            totals[entry["stage"]] = round(totals.get(entry["stage"], 0.0) + entry["seconds"], 6)
+
+        total = self.total_seconds if self.total_seconds is not None else time.perf_counter() - self.started_at
+        return {
+            "trace_id": self.trace_id,
+            "total_seconds": round(total, 6),
+            "stage_totals": totals,
+            "stages": stages,
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("stratos_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """Get the trace of the request being processed, if any."""
+    return _current_trace.get()
+
+
+@contextmanager
+def timed_stage(stage: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a pipeline stage into the current trace and the stage histogram.
+
+    Yields a dictionary the caller can add attributes to, such as item counts.
+    """
+    started_at = time.perf_counter()
+    attributes = dict(attributes)
+    try:
+        yield attributes
+    finally:
+        seconds = time.perf_counter() - started_at
+        metrics.observe("stratos_stage_seconds", seconds, {"stage": stage})
+        trace = current_trace()
+        if trace is not None:
+            trace.record(stage, seconds, **attributes)
+
+
+def record_generation(stage: str, tokens_in: int, tokens_out: int, seconds: float) -> None:
+    """Record token counts and throughput of one model call."""
+    tokens_in, tokens_out = int(tokens_in), int(tokens_out)
+    tokens_per_second = tokens_out / seconds if seconds > 0 else 0.0
+
+    metrics.inc("stratos_tokens_in_total", tokens_in, {"stage": stage})
+    metrics.inc("stratos_tokens_out_total", tokens_out, {"stage": stage})
+    metrics.observe("stratos_tokens_per_second", tokens_per_second, {"stage": stage})
+
+    trace = current_trace()
+    if trace is not None:
+        trace.record(
+            f"{stage}.model",
+            seconds,
+            tokens_in=tokens_in,
+            tokens_out=tokens_out,
+            tokens_per_second=round(tokens_per_second, 2),
+        )
+
+
+def record_queue_wait(model_name: str, seconds: float, trace: Optional[Trace] = None) -> None:
+    """Record how long a model call waited for an inference worker."""
+    metrics.observe("stratos_queue_wait_seconds", seconds, {"model": model_name})
+    trace = trace or current_trace()
+    if trace is not None:
+        trace.record("queue_wait", seconds, model=model_name)
+
+
+def record_route(route: str, method: str, saved_seconds: float = 0.0) -> None:
+    """Record a routing decision and an estimate of the decomposition time it saved."""
+    metrics.inc("stratos_route_total", 1, {"route": route, "method": method})
+    if saved_seconds:
+        metrics.inc("stratos_route_estimated_saved_seconds_total", saved_seconds)
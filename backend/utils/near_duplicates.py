@@ -0,0 +1,113 @@
+# backend/utils/near_duplicates.py
+
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Mersenne prime 2^31 - 1, small enough that a * x + b fits in 64 bits for 32-bit shingle hashes
+_PRIME = np.uint64((1 << 31) - 1)
+
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 3) -> List[int]:
+    """
+    Hash the overlapping word n-grams of a text.
+
+    Text is lowercased and punctuation dropped first, so copies of a passage
+    that differ only in ellipses, quotes or spacing get the same shingles.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return sorted({zlib.crc32(gram.encode()) for gram in grams})
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) for LSH so near-duplicates at the threshold share a bucket.
+
+    Two signatures with Jaccard similarity s share a bucket with probability
+    1 - (1 - s^rows)^bands, which turns steeply from unlikely to likely
+    around (1 / bands)^(1 / rows). The split is chosen so that point sits
+    just below the threshold, favouring recall; candidates are verified
+    against the threshold afterwards.
+    """
+    splits = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    below = [split for split in splits if (1 / split[0]) ** (1 / split[1]) <= threshold]
+    return max(below or splits, key=lambda split: (1 / split[0]) ** (1 / split[1]))
+
+
+class NearDuplicateIndex:
+    """
+    Finds texts that are near-duplicates of ones seen before.
+
+    Each text gets a MinHash signature over its word shingles, whose
+    matching positions estimate the Jaccard similarity of two texts. The
+    signature is split into LSH bands and each band is bucketed, so a new
+    text is only compared with texts it shares a bucket with instead of
+    with every text seen so far.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+
+        self._signatures: List[np.ndarray] = []
+        self._items: List[Any] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of a text, None if it has no words."""
+        hashes = np.array(shingles(text, self.shingle_size), dtype=np.uint64)
+        if hashes.size == 0:
+            return None
+        # One universal hash per permutation, the minimum over all shingles
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def add(self, text: str, item: Any = None) -> Optional[Any]:
+        """
+        Add a text unless it is a near-duplicate of one already added.
+
+        Args:
+            text (str): Text to check
+            item (Any): Value kept with the text, e.g. the chunk it came from
+
+        Returns:
+            Optional[Any]: Item of the earlier text it duplicates, or None if
+            it was new and has been added
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+
+        keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+        candidates = {position for band, key in enumerate(keys) for position in self._buckets[band].get(key, ())}
+        best, best_similarity = None, 0.0
+        for position in sorted(candidates):
+            similarity = float(np.mean(self._signatures[position] == signature))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = position, similarity
+        if best is not None:
+            return self._items[best]
+
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        self._items.append(item)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(position)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._signatures)
@@ -0,0 +1,115 @@
+# backend/utils/stub_search.py
+#
+# Local stand-in for the Google Custom Search JSON API, for running the
+# retriever without network access or API quota:
+#
+#   uvicorn backend.utils.stub_search:app --port 51442
+#   GOOGLE_SEARCH_ENDPOINT=http://localhost:51442/customsearch/v1
+#
+# STUB_SEARCH_RESULTS points at a JSON file mapping queries to lists of
+# {"title", "link", "snippet"} items; unknown queries get generated results,
+# or with STUB_SEARCH_REPLAY=1 the recorded results of a recorded query
+# picked by hashing the query, so generated sub-queries see real text too.
+# STUB_SEARCH_LATENCY adds an artificial delay (seconds) to every response.
+#
+# Generated results link to HTML pages served by the stub itself under
+# /pages/, with ETag and Last-Modified headers and 304 responses to
+# conditional requests, so the page fetcher can run offline too.
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Query, Request, Response
+
+app = FastAPI(title="Stratos search stub")
+
+
+def _load_results() -> Dict[str, List[Dict[str, Any]]]:
+    """Load recorded results from the file named by STUB_SEARCH_RESULTS."""
+    path = os.getenv("STUB_SEARCH_RESULTS")
+    if not path:
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+RECORDED_RESULTS = _load_results()
+REPLAY = os.getenv("STUB_SEARCH_REPLAY", "0") == "1"
+LATENCY = float(os.getenv("STUB_SEARCH_LATENCY", "0"))
+
+
+PAGE_LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def _generate_results(query: str, count: int, base_url: str) -> List[Dict[str, Any]]:
+    """Generate placeholder results for a query with no recording."""
+    slug = "-".join(query.lower().split())
+    return [
+        {
+            "title": f"{query} - result {i + 1}",
+            "link": f"{base_url}pages/{slug}/{i + 1}",
+            "snippet": f"Result {i + 1} for {query}. This placeholder text stands in for a "
+                       f"search snippet so the rest of the pipeline has something to work with.",
+        }
+        for i in range(count)
+    ]
+
+
+def _replay_results(query: str) -> List[Dict[str, Any]]:
+    """Pick the recorded results of one recorded query, the same one every time for a query."""
+    recorded = sorted(RECORDED_RESULTS)
+    index = int(hashlib.sha1(query.encode()).hexdigest(), 16) % len(recorded)
+    return RECORDED_RESULTS[recorded[index]]
+
+
+def _generate_page(slug: str, number: int) -> str:
+    """Generate an HTML page with boilerplate around a few paragraphs of main text."""
+    topic = slug.replace("-", " ")
+    paragraphs = "".join(
+        f"<p>Paragraph {i + 1} of page {number} about {topic}. It gives the page fetcher enough "
+        f"running text to extract, chunk and summarize, as an article body would.</p>"
+        for i in range(4)
+    )
+    return (
+        f"<html><head><title>{topic} - page {number}</title><script>var tracking = 1;</script></head>"
+        f"<body><nav><a href='/'>Home</a> <a href='/about'>About</a></nav>"
+        f"<article><h1>{topic}</h1>{paragraphs}</article>"
+        f"<footer>Copyright stub pages</footer></body></html>"
+    )
+
+
+@app.get("/customsearch/v1")
+async def search(
+    request: Request,
+    q: str,
+    num: int = Query(10, ge=1, le=10),
+    start: int = Query(1, ge=1),
+) -> Dict[str, Any]:
+    """Serve one page of results in the Custom Search response format."""
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+
+    items = RECORDED_RESULTS.get(q)
+    if items is None and REPLAY and RECORDED_RESULTS:
+        items = _replay_results(q)
+    if items is None:
+        items = _generate_results(q, start + num - 1, str(request.base_url))
+    return {"items": items[start - 1 : start - 1 + num]}
+
+
+@app.get("/pages/{slug}/{number}")
+async def page(slug: str, number: int, request: Request) -> Response:
+    """Serve a generated result page, honouring conditional requests."""
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+
+    html = _generate_page(slug, number)
+    etag = '"' + hashlib.sha1(html.encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Last-Modified": PAGE_LAST_MODIFIED}
+
+    if request.headers.get("if-none-match") == etag or request.headers.get("if-modified-since") == PAGE_LAST_MODIFIED:
+        return Response(status_code=304, headers=headers)
+    return Response(content=html, media_type="text/html; charset=utf-8", headers=headers)
@@ -0,0 +1,172 @@
+# backend/utils/vector_index.py
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+class VectorIndex:
+    """
+    Persistent, append-only index of unit vectors with metadata.
+
+    Vectors are stored as raw float32 rows in ``vectors.f32`` and memory
+    mapped for search, so the index does not have to fit in RAM and opening
+    it is instant. Metadata lives in ``chunks.sqlite``, where a row's id is
+    the position of its vector. Rows are only ever appended, which keeps
+    both files consistent without rewriting either of them.
+    """
+
+    def __init__(self, path: str, dim: int, model: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.model = model
+        self._vectors_path = self.path / "vectors.f32"
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path / "chunks.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id INTEGER PRIMARY KEY, hash TEXT UNIQUE NOT NULL, text TEXT NOT NULL, "
+            "source TEXT NOT NULL, title TEXT NOT NULL, metadata TEXT NOT NULL, added_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+        self._check_model()
+        self._vectors: Optional[np.ndarray] = None
+        self._size = self._recover()
+        self._remap()
+
+    def _check_model(self) -> None:
+        """Start over if the index was built with a different embedding model."""
+        info = dict(self._conn.execute("SELECT key, value FROM info").fetchall())
+        expected = {"model": self.model, "dim": str(self.dim)}
+        if info and info != expected:
+            self._conn.execute("DELETE FROM chunks")
+            self._vectors_path.unlink(missing_ok=True)
+        self._conn.executemany("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", expected.items())
+        self._conn.commit()
+
+    def _recover(self) -> int:
+        """Trim whichever file got ahead of the other if a write was interrupted."""
+        self._vectors_path.touch(exist_ok=True)
+        stored_vectors = self._vectors_path.stat().st_size // (self.dim * 4)
+        stored_rows = self._conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chunks").fetchone()[0]
+        size = min(stored_vectors, stored_rows)
+
+        if stored_rows > size:
+            self._conn.execute("DELETE FROM chunks WHERE id >= ?", (size,))
+            self._conn.commit()
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(size * self.dim * 4)
+        return size
+
+    def _remap(self) -> None:
+        """Map the vector file, which grows on every append."""
+        self._vectors = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._size, self.dim))
+            if self._size else None
+        )
+
+    def contains(self, hashes: List[str]) -> set:
+        """Get the subset of content hashes that are already indexed."""
+        with self._lock:
+            found = set()
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT hash FROM chunks WHERE hash IN ({','.join('?' * len(batch))})", batch
+                ))
+            return found
+
+    def add(self, vectors: np.ndarray, entries: List[Dict[str, Any]]) -> int:
+        """
+        Append vectors and their metadata, skipping content already indexed.
+
+        Each entry needs ``hash``, ``text``, ``source`` and ``title`` keys and may
+        carry a ``metadata`` dictionary.
+
+        Returns:
+            int: Number of vectors added
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+
+        with self._lock:
+            seen = set()
+            rows, keep = [], []
+            for index, entry in enumerate(entries):
+                if entry["hash"] in seen or self._conn.execute(
+                    "SELECT 1 FROM chunks WHERE hash = ?", (entry["hash"],)
+                ).fetchone():
+                    continue
+                seen.add(entry["hash"])
+                rows.append((
+                    self._size + len(keep), entry["hash"], entry["text"], entry["source"],
+                    entry["title"], json.dumps(entry.get("metadata", {})), time.time()
+                ))
+                keep.append(index)
+
+            if not keep:
+                return 0
+
+            # Vectors first, so a crash leaves extra vectors that _recover trims
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors[keep].tobytes())
+            self._conn.executemany(
+                "INSERT INTO chunks (id, hash, text, source, title, metadata, added_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+            self._size += len(keep)
+            self._remap()
+            return len(keep)
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """
+        Find the nearest indexed vectors to each query by inner product.
+
+        Returns:
+            List[List[Tuple[float, Dict[str, Any]]]]: (similarity, entry) pairs per query, best first
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.dim)
+
+        with self._lock:
+            vectors = self._vectors
+        if vectors is None:
+            return [[] for _ in range(len(queries))]
+
+        similarities, ids = faiss.knn(queries, vectors, min(k, len(vectors)), metric=faiss.METRIC_INNER_PRODUCT)
+
+        results = []
+        with self._lock:
+            for row_similarities, row_ids in zip(similarities, ids):
+                hits = []
+                for similarity, row_id in zip(row_similarities, row_ids):
+                    if row_id < 0:
+                        continue
+                    text, source, title, metadata = self._conn.execute(
+                        "SELECT text, source, title, metadata FROM chunks WHERE id = ?", (int(row_id),)
+                    ).fetchone()
+                    hits.append((float(similarity), {
+                        "text": text, "source": source, "title": title, "metadata": json.loads(metadata)
+                    }))
+                results.append(hits)
+        return results
+
+    def close(self) -> None:
+        """Close the metadata database."""
+        with self._lock:
+            self._vectors = None
+            self._conn.close()
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,177 @@
+"""
+Compare CPU inference modes for the summarizer and the LLM stages.
+
+Each model is loaded in float32, bfloat16 and float32 with dynamic int8
+quantization of its linear layers. Every mode generates greedily from the
+same prompts, and is reported with its latency and how closely its outputs
+match the float32 ones (exact matches and mean token F1).
+
+Run from the repository root:
+
+    python -m benchmarks.cpu_modes --threads 4 --repeats 3
+    python -m benchmarks.cpu_modes --llm "" --json cpu_modes.json   # T5 only
+"""
+
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+import torch
+
+from backend.config.settings import settings
+from backend.core.model_registry import configure_threads, load_causal_lm, quantize_int8
+from backend.core.processor import load_t5
+
+# (dtype, quantization)
+MODES = {
+    "float32": ("float32", None),
+    "bfloat16": ("bfloat16", None),
+    "int8": ("float32", "int8"),
+}
+
+SUMMARY_TEXTS = [
+    "The James Webb Space Telescope observes the universe in infrared light. Its primary mirror is made of "
+    "eighteen gold-coated beryllium segments, and it orbits the Sun near the second Lagrange point.",
+    "Infrared observations let astronomers see through clouds of cosmic dust. Early results include images of "
+    "galaxies formed shortly after the Big Bang and spectra of distant exoplanet atmospheres.",
+    "The sunshield keeps the instruments cold enough to detect faint heat signals. The mission is a "
+    "collaboration between NASA, ESA and the Canadian Space Agency.",
+]
+
+LLM_PROMPTS = [
+    "Break this question into simpler search queries: How does the James Webb telescope see through dust?",
+    "Answer briefly: why is the James Webb telescope placed at the second Lagrange point?",
+    "Answer briefly: what are the mirror segments of the James Webb telescope made of?",
+]
+
+
+def token_f1(prediction: str, reference: str) -> float:
+    """Bag-of-words F1 between two texts."""
+    predicted, expected = prediction.split(), reference.split()
+    if not predicted or not expected:
+        return float(predicted == expected)
+    common = sum((Counter(predicted) & Counter(expected)).values())
+    if common == 0:
+        return 0.0
+    precision, recall = common / len(predicted), common / len(expected)
+    return 2 * precision * recall / (precision + recall)
+
+
+def load(loader: Callable, model_name: str, mode: str) -> Any:
+    """Load a model and tokenizer in one of the benchmarked modes."""
+    dtype, quantize = MODES[mode]
+    model, tokenizer = loader(model_name, dtype, "cpu")
+    if quantize == "int8":
+        model = quantize_int8(model)
+    return model.eval(), tokenizer
+
+
+def generate(model: Any, tokenizer: Any, prompt: str, max_new_tokens: int, decoder_only: bool) -> str:
+    """Greedily generate a completion for one prompt."""
+    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
+    with torch.inference_mode():
+        output = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False, num_beams=1)
+    if decoder_only:
+        output = output[:, inputs['input_ids'].shape[1]:]
+    return tokenizer.decode(output[0], skip_special_tokens=True)
+
+
+def run_mode(
+    loader: Callable,
+    model_name: str,
+    mode: str,
+    prompts: List[str],
+    max_new_tokens: int,
+    repeats: int,
+    decoder_only: bool
+) -> Dict[str, Any]:
+    """Time one model in one mode, keeping the outputs for comparison."""
+    model, tokenizer = load(loader, model_name, mode)
+
+    # Warm up so first-call overhead is excluded
+    generate(model, tokenizer, prompts[0], max_new_tokens, decoder_only)
+
+    latencies, outputs = [], []
+    for prompt in prompts:
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            output = generate(model, tokenizer, prompt, max_new_tokens, decoder_only)
+            best = min(best, time.perf_counter() - start)
+        latencies.append(best)
+        outputs.append(output)
+
+    return {
+        'mean_latency_ms': round(statistics.mean(latencies) * 1000, 1),
+        'max_latency_ms': round(max(latencies) * 1000, 1),
+        'outputs': outputs
+    }
+
+
+def benchmark(
+    label: str,
+    loader: Callable,
+    model_name: str,
+    prompts: List[str],
+    max_new_tokens: int,
+    repeats: int,
+    decoder_only: bool
+) -> Dict[str, Dict[str, Any]]:
+    """Run every mode for one model and compare it to float32."""
+    results = {
+        mode: run_mode(loader, model_name, mode, prompts, max_new_tokens, repeats, decoder_only)
+        for mode in MODES
+    }
+
+    baseline = results["float32"]
+    print(f"\n{label}: {model_name}")
+    print(f"{'mode':<10} {'mean ms':>10} {'max ms':>10} {'speedup':>8} {'exact':>7} {'token F1':>9}")
+    for mode, result in results.items():
+        pairs = list(zip(result['outputs'], baseline['outputs']))
+        result['speedup'] = round(baseline['mean_latency_ms'] / result['mean_latency_ms'], 2)
+        result['exact_match'] = round(sum(a == b for a, b in pairs) / len(pairs), 3)
+        result['token_f1'] = round(statistics.mean(token_f1(a, b) for a, b in pairs), 3)
+        print(
+            f"{mode:<10} {result['mean_latency_ms']:>10.1f} {result['max_latency_ms']:>10.1f} "
+            f"{result['speedup']:>7.2f}x {result['exact_match']:>7.2f} {result['token_f1']:>9.3f}"
+        )
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--t5", default=settings.SUMMARY_MODEL, help="Summarization model, empty to skip")
+    parser.add_argument("--llm", default=settings.RESPONSE_GENERATOR_MODEL, help="Causal LM, empty to skip")
+    parser.add_argument("--max-new-tokens", type=int, default=32, help="Tokens generated per prompt")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per prompt, best is reported")
+    parser.add_argument("--threads", type=int, default=None, help="Torch intra-op threads")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the results to this file")
+    args = parser.parse_args()
+
+    configure_threads(args.threads)
+    print(f"torch threads: {torch.get_num_threads()}")
+
+    report: Dict[str, Any] = {'threads': torch.get_num_threads()}
+    if args.t5:
+        report['summarizer'] = benchmark(
+            "Summarizer", load_t5, args.t5,
+            [f"summarize: {text}" for text in SUMMARY_TEXTS],
+            args.max_new_tokens, args.repeats, decoder_only=False
+        )
+    if args.llm:
+        report['llm'] = benchmark(
+            "LLM", load_causal_lm, args.llm, LLM_PROMPTS,
+            args.max_new_tokens, args.repeats, decoder_only=True
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare decoding profiles for each generating stage.
+
+Every profile in ``decoding.profiles`` is run on the decomposer, response
+generator and summarizer with the stage's own overrides (max_new_tokens,
+stop sequences, ...). For each combination the benchmark reports mean
+latency, tokens generated per call and tokens/sec.
+
+Run from the repository root:
+
+    python -m benchmarks.decoding --repeats 2
+    python -m benchmarks.decoding --stages decompose --profiles greedy beam
+"""
+
+import argparse
+import statistics
+from typing import Any, Callable, Dict
+
+from backend.config.settings import settings
+from backend.core.decoding import DecodingStrategy
+from backend.core.processor import Processor
+from backend.core.query_decomposer import QueryDecomposer
+from backend.core.response_generator import ResponseGenerator
+from backend.models.schema import ProcessedChunk
+from backend.utils.metrics import Trace
+
+QUERIES = [
+    "How does the James Webb telescope see through cosmic dust, and what has it found so far?",
+    "Why is the James Webb telescope placed at the second Lagrange point?",
+]
+
+CONTEXT = [
+    "The James Webb Space Telescope observes the universe in infrared light, which passes through clouds of cosmic dust.",
+    "Its primary mirror is made of eighteen gold-coated beryllium segments.",
+    "The telescope orbits the Sun near the second Lagrange point, where its sunshield keeps the instruments cold.",
+    "Early results include images of galaxies formed shortly after the Big Bang.",
+]
+
+
+def decompose_runner(stage: QueryDecomposer) -> Callable[[str], Any]:
+    """Run one decomposition call."""
+    return lambda query: stage._generate_text(stage._tokenize_input([stage._create_prompt(query)]))
+
+
+def generate_runner(stage: ResponseGenerator) -> Callable[[str], Any]:
+    """Run one generation call over the sample context."""
+    chunks = [ProcessedChunk(text=text, source=f"https://example.com/{i}") for i, text in enumerate(CONTEXT)]
+    return lambda query: stage._generate_text(stage._tokenize_input([stage._prepare_prompt(query, chunks)]))
+
+
+def summarize_runner(stage: Processor) -> Callable[[str], Any]:
+    """Run one summarization call over the sample context."""
+    return lambda query: stage.summarize_batch([" ".join(CONTEXT)])
+
+
+def use_profile(stage: Any, name: str, profile: str) -> None:
+    """Switch a stage to another decoding profile."""
+    stage.decoding = DecodingStrategy(name, profile=profile)
+    if isinstance(stage, Processor):
+        stage.generation_params = stage.decoding.generate_kwargs(stage.tokenizer, prompt_length=1)
+
+
+def measure(run: Callable[[str], Any], model_stage: str, repeats: int) -> Dict[str, float]:
+    """Time every query, reading latency and token counts from the model calls' trace entries."""
+    with Trace() as trace:
+        for query in QUERIES:
+            for _ in range(repeats):
+                run(query)
+
+    calls = [entry for entry in trace.stages if entry['stage'] == f"{model_stage}.model"]
+    seconds = sum(entry['seconds'] for entry in calls)
+    tokens = sum(entry['tokens_out'] for entry in calls)
+    return {
+        'mean_latency_ms': round(statistics.mean(entry['seconds'] for entry in calls) * 1000, 1),
+        'mean_tokens': round(tokens / len(calls), 1),
+        'tokens_per_second': round(tokens / seconds, 1) if seconds else 0.0
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", default=["decompose", "generate", "summarize"], help="Stages to benchmark")
+    parser.add_argument("--profiles", nargs="+", default=list(settings.DECODING_PARAMS['profiles']), help="Profiles to compare")
+    parser.add_argument("--repeats", type=int, default=2, help="Runs per query")
+    args = parser.parse_args()
+
+    builders = {
+        'decompose': (QueryDecomposer, decompose_runner),
+        'generate': (ResponseGenerator, generate_runner),
+        'summarize': (Processor, summarize_runner),
+    }
+
+    print(f"{'stage':<10} {'profile':<10} {'mean ms':>10} {'tokens':>8} {'tokens/s':>9}")
+    for name in args.stages:
+        stage_class, runner = builders[name]
+        stage = stage_class()
+        run = runner(stage)
+
+        # Warm up so first-call overhead is excluded
+        run(QUERIES[0])
+
+        for profile in args.profiles:
+            use_profile(stage, name, profile)
+            result = measure(run, name, args.repeats)
+            print(
+                f"{name:<10} {profile:<10} {result['mean_latency_ms']:>10.1f} "
+                f"{result['mean_tokens']:>8.1f} {result['tokens_per_second']:>9.1f}"
+            )
+
+        stage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Offline end-to-end benchmark and load test of the search API.
+
+Starts the search stub, replaying the recorded results in
+benchmarks/data/search_results.json, and the API with the tiny models of
+benchmarks/config.tiny.yml, each in its own process and bound to the
+local host. Requests are then sent at each concurrency level, and the
+benchmark reports:
+
+  * end-to-end latency percentiles (p50/p95/p99) and throughput per level
+  * per-stage latency percentiles, from the requests' debug traces
+  * peak RSS of the API process and its startup time
+
+Results are written as JSON, tagged with the current commit, so runs can
+be compared across commits with --baseline.
+
+Run from the repository root (download the tiny models once, after that
+no network is needed):
+
+    HF_HUB_OFFLINE=1 python -m benchmarks.load_test --concurrency 1 2 4 8 --json load.json
+    python -m benchmarks.load_test --json new.json --baseline load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BENCHMARKS = Path(__file__).parent
+DEFAULT_CONFIG = BENCHMARKS / "config.tiny.yml"
+DEFAULT_RESULTS = BENCHMARKS / "data" / "search_results.json"
+
+
+def free_port() -> int:
+    """Find a free TCP port on the local host."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean of a list of seconds, in milliseconds."""
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {
+        'p50_ms': round(float(p50), 1),
+        'p95_ms': round(float(p95), 1),
+        'p99_ms': round(float(p99), 1),
+        'mean_ms': round(float(np.mean(values)) * 1000, 1)
+    }
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak resident set size of a running process, from /proc on Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def git_commit() -> Optional[str]:
+    """Commit the benchmark ran against."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(app: str, port: int, env: Dict[str, str], log_path: Path) -> subprocess.Popen:
+    """Run an ASGI app under uvicorn in its own process, logging to a file."""
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, url: str, process: subprocess.Popen, timeout: float) -> float:
+    """Poll a readiness URL until it answers 200, returning the seconds waited."""
+    started_at = time.perf_counter()
+    while time.perf_counter() - started_at < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} before it was ready")
+        try:
+            if (await client.get(url)).status_code == 200:
+                return time.perf_counter() - started_at
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+async def search(client: httpx.AsyncClient, url: str, query: str) -> Dict[str, Any]:
+    """Send one search request with tracing, timing it from the client."""
+    started_at = time.perf_counter()
+    try:
+        response = await client.post(url, json={'query': query, 'debug': True})
+        ok = response.status_code == 200
+        stages = response.json().get('debug', {}).get('stage_totals', {}) if ok else {}
+    except httpx.HTTPError:
+        ok, stages = False, {}
+    return {'seconds': time.perf_counter() - started_at, 'ok': ok, 'stages': stages}
+
+
+async def run_level(client: httpx.AsyncClient, url: str, queries: List[str], concurrency: int, requests: int) -> Dict[str, Any]:
+    """Send ``requests`` searches with at most ``concurrency`` in flight."""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def send(index: int) -> Dict[str, Any]:
+        async with limit:
+            return await search(client, url, queries[index % len(queries)])
+
+    started_at = time.perf_counter()
+    records = await asyncio.gather(*(send(index) for index in range(requests)))
+    wall = time.perf_counter() - started_at
+
+    succeeded = [record for record in records if record['ok']]
+    stage_seconds: Dict[str, List[float]] = {}
+    for record in succeeded:
+        for stage, seconds in record['stages'].items():
+            stage_seconds.setdefault(stage, []).append(seconds)
+
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': requests - len(succeeded),
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(succeeded) / wall, 3),
+        'latency': percentiles([record['seconds'] for record in succeeded]),
+        'stages': {stage: percentiles(values) for stage, values in sorted(stage_seconds.items())}
+    }
+
+
+def print_level(level: Dict[str, Any]) -> None:
+    latency = level['latency']
+    print(
+        f"{level['concurrency']:>11} {level['throughput_rps']:>10.2f} {latency.get('p50_ms', 0):>9.1f} "
+        f"{latency.get('p95_ms', 0):>9.1f} {latency.get('p99_ms', 0):>9.1f} {level['errors']:>7}"
+    )
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print throughput and latency changes against an earlier run."""
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'}:")
+    print(f"{'concurrency':>11} {'req/s':>10} {'p50':>9} {'p95':>9} {'p99':>9}")
+    earlier = {level['concurrency']: level for level in baseline.get('levels', [])}
+
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    for level in report['levels']:
+        old = earlier.get(level['concurrency'])
+        if old is None:
+            continue
+        print(
+            f"{level['concurrency']:>11} {change(level['throughput_rps'], old['throughput_rps']):>10} "
+            + " ".join(
+                f"{change(level['latency'].get(key, 0), old['latency'].get(key, 0)):>9}"
+                for key in ('p50_ms', 'p95_ms', 'p99_ms')
+            )
+        )
+    if report.get('peak_rss_mb') and baseline.get('peak_rss_mb'):
+        print(f"peak RSS: {report['peak_rss_mb']} MB ({change(report['peak_rss_mb'], baseline['peak_rss_mb'])})")
+
+
+async def benchmark(args: argparse.Namespace, env: Dict[str, str], queries: List[str], logs: Path) -> Dict[str, Any]:
+    """Start the stub and the API, run every concurrency level, then stop both."""
+    stub_port, api_port = free_port(), free_port()
+    env = {**env, 'GOOGLE_SEARCH_ENDPOINT': f"http://127.0.0.1:{stub_port}/customsearch/v1"}
+
+    stub = start_server("backend.utils.stub_search:app", stub_port, env, logs / "stub.log")
+    api = start_server("backend.api.endpoints:app", api_port, env, logs / "api.log")
+    base = f"http://127.0.0.1:{api_port}"
+
+    report: Dict[str, Any] = {}
+    try:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(args.timeout)) as client:
+            await wait_ready(client, f"http://127.0.0.1:{stub_port}/customsearch/v1?q=ready", stub, 30)
+            report['startup_seconds'] = round(await wait_ready(client, f"{base}/health/ready", api, args.startup_timeout), 2)
+            print(f"API ready after {report['startup_seconds']}s")
+
+            # Warm up so first-call overhead is excluded
+            for query in queries[:args.warmup]:
+                await search(client, f"{base}/api/search", query)
+
+            print(f"{'concurrency':>11} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+            report['levels'] = []
+            for concurrency in args.concurrency:
+                level = await run_level(client, f"{base}/api/search", queries, concurrency, args.requests or concurrency * 4)
+                report['levels'].append(level)
+                print_level(level)
+
+            report['models'] = (await client.get(f"{base}/api/models")).json()
+            report['peak_rss_mb'] = peak_rss_mb(api.pid)
+    finally:
+        for process in (api, stub):
+            process.terminate()
+        for process in (api, stub):
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    # Where /proc isn't available, take the largest child's peak once it has exited
+    if report.get('peak_rss_mb') is None:
+        max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        report['peak_rss_mb'] = round(max_rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8], help="Concurrency levels to sweep")
+    parser.add_argument("--requests", type=int, default=None, help="Requests per level, defaults to 4 x concurrency")
+    parser.add_argument("--warmup", type=int, default=2, help="Requests sent before measuring")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG), help="Config overrides for the API (STRATOS_CONFIG)")
+    parser.add_argument("--results", default=str(DEFAULT_RESULTS), help="Recorded search results served by the stub")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds the stub waits before answering")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for one request")
+    parser.add_argument("--startup-timeout", type=float, default=600.0, help="Seconds to wait for the models to load")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the results to this file")
+    parser.add_argument("--baseline", default=None, help="Earlier results to compare against")
+    args = parser.parse_args()
+
+    with open(args.results) as f:
+        queries = list(json.load(f))
+
+    env = {
+        **os.environ,
+        'STRATOS_CONFIG': args.config,
+        'STUB_SEARCH_RESULTS': args.results,
+        'STUB_SEARCH_REPLAY': "1",
+        'STUB_SEARCH_LATENCY': str(args.search_latency),
+        # The stub accepts any credentials
+        'GOOGLE_API_KEY': "benchmark",
+        'GOOGLE_CSE_ID': "benchmark",
+    }
+
+    logs = Path(tempfile.mkdtemp(prefix="stratos-load-test-"))
+    try:
+        report = asyncio.run(benchmark(args, env, queries, logs))
+    except Exception:
+        print(f"Benchmark failed, server logs are in {logs}", file=sys.stderr)
+        raise
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'config': args.config,
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        **report
+    }
+    print(f"peak RSS of the API process: {report['peak_rss_mb']} MB")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
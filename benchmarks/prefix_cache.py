@@ -0,0 +1,99 @@
+"""
+Measure prefill time with and without the prompt-prefix key/value cache.
+
+Each decomposition and answer prompt is run for a single greedy token,
+which is almost all prefill, first with the cache disabled and then with
+the instructions' key/values reused. A longer greedy run checks that both
+paths generate the same text.
+
+Run from the repository root:
+
+    python -m benchmarks.prefix_cache --batch-size 4 --repeats 5
+"""
+
+import argparse
+import statistics
+import time
+from typing import Any, Callable, List
+
+from backend.core.query_decomposer import QueryDecomposer
+from backend.core.response_generator import ResponseGenerator
+from backend.models.schema import ProcessedChunk
+
+QUERIES = [
+    "How does the James Webb telescope see through cosmic dust?",
+    "Why is the James Webb telescope placed at the second Lagrange point, and how is it kept cold?",
+    "What are the mirror segments of the James Webb telescope made of?",
+    "What did the first James Webb images show?",
+]
+
+CONTEXT = [
+    "The James Webb Space Telescope observes the universe in infrared light, which passes through clouds of cosmic dust.",
+    "Its primary mirror is made of eighteen gold-coated beryllium segments.",
+    "The telescope orbits the Sun near the second Lagrange point, where its sunshield keeps the instruments cold.",
+]
+
+
+def generate(stage: Any, prompts: List[Any], max_new_tokens: int) -> List[str]:
+    """Greedily generate from a batch of prompts."""
+    inputs = stage._tokenize_input(prompts)
+    outputs = stage.model.generate(
+        **inputs,
+        pad_token_id=stage.tokenizer.pad_token_id,
+        max_new_tokens=max_new_tokens,
+        do_sample=False,
+        num_beams=1
+    )
+    return stage.tokenizer.batch_decode(outputs[:, inputs['input_ids'].shape[1]:], skip_special_tokens=True)
+
+
+def prefill_ms(stage: Any, prompts: List[Any], repeats: int) -> float:
+    """Median time to the first generated token."""
+    generate(stage, prompts, 1)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        generate(stage, prompts, 1)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def compare(name: str, stage: Any, make_prompt: Callable[[str], Any], batch_size: int, repeats: int) -> None:
+    """Report prefill time with the cache off and on."""
+    prompts = [make_prompt(query) for query in (QUERIES * batch_size)[:batch_size]]
+
+    stage.prefix_cache.enabled = False
+    uncached = prefill_ms(stage, prompts, repeats)
+    reference = generate(stage, prompts, 16)
+
+    stage.prefix_cache.enabled = True
+    cached = prefill_ms(stage, prompts, repeats)
+    identical = sum(a == b for a, b in zip(generate(stage, prompts, 16), reference))
+
+    stats = stage.prefix_cache.stats()
+    print(f"\n{name} (batch of {batch_size}, {len(stage.tokenizer(prompts[0][0])['input_ids'])} prefix tokens)")
+    print(f"  prefill without cache: {uncached:.1f} ms")
+    print(f"  prefill with cache:    {cached:.1f} ms ({uncached / cached:.2f}x)")
+    print(f"  identical outputs:     {identical}/{len(prompts)}")
+    print(f"  hit rate:              {stats['hit_rate']:.2f}, tokens saved: {stats['tokens_saved']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1, help="Prompts per generate call")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs, the median is reported")
+    args = parser.parse_args()
+
+    decomposer = QueryDecomposer()
+    compare("Decomposition", decomposer, decomposer._create_prompt, args.batch_size, args.repeats)
+
+    generator = ResponseGenerator()
+    chunks = [ProcessedChunk(text=text, source=f"https://example.com/{i}") for i, text in enumerate(CONTEXT)]
+    compare("Answer", generator, lambda query: generator._prepare_prompt(query, chunks), args.batch_size, args.repeats)
+
+    decomposer.close()
+    generator.close()
+
+
+if __name__ == "__main__":
+    main()
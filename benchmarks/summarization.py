@@ -0,0 +1,88 @@
+"""
+Compare per-chunk and batched T5 summarization throughput.
+
+Run from the repository root:
+
+    python -m benchmarks.summarization --chunks 15 --repeats 3
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+from backend.core.processor import Processor
+
+SENTENCES = [
+    "The James Webb Space Telescope observes the universe in infrared light.",
+    "Its primary mirror is made of eighteen gold-coated beryllium segments.",
+    "The telescope orbits the Sun near the second Lagrange point.",
+    "Infrared observations let astronomers see through clouds of cosmic dust.",
+    "Early results include images of galaxies formed shortly after the Big Bang.",
+    "The sunshield keeps the instruments cold enough to detect faint heat signals.",
+    "Scientists also use it to study the atmospheres of distant exoplanets.",
+    "The mission is a collaboration between NASA, ESA and the Canadian Space Agency.",
+]
+
+
+def make_chunks(count: int, seed: int = 0) -> List[str]:
+    """Build snippet-sized chunks of varying length."""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 6)))
+        for _ in range(count)
+    ]
+
+
+def run_per_chunk(processor: Processor, texts: List[str]) -> List[str]:
+    """The original path: one generate call per chunk."""
+    return [processor.summarize(text) for text in texts]
+
+
+def run_batched(processor: Processor, texts: List[str]) -> List[str]:
+    """The batched path: one generate call per length bucket."""
+    summaries = [""] * len(texts)
+    for batch in processor.make_batches(texts):
+        for index, summary in zip(batch, processor.summarize_batch([texts[i] for i in batch])):
+            summaries[index] = summary
+    return summaries
+
+
+def measure(fn, processor: Processor, texts: List[str], repeats: int) -> float:
+    """Return the best chunks/sec over the given number of repeats."""
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(processor, texts)
+        best = max(best, len(texts) / (time.perf_counter() - start))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=15, help="Number of chunks to summarize")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per mode, best is reported")
+    args = parser.parse_args()
+
+    processor = Processor()
+    texts = make_chunks(args.chunks)
+
+    # Warm up both paths so model loading and first-call overhead are excluded
+    run_per_chunk(processor, texts[:1])
+    run_batched(processor, texts[:2])
+
+    per_chunk = measure(run_per_chunk, processor, texts, args.repeats)
+    batched = measure(run_batched, processor, texts, args.repeats)
+
+    matches = sum(a == b for a, b in zip(run_per_chunk(processor, texts), run_batched(processor, texts)))
+
+    print(f"chunks:               {len(texts)}")
+    print(f"batches:              {len(processor.make_batches(texts))}")
+    print(f"per-chunk chunks/sec: {per_chunk:.2f}")
+    print(f"batched chunks/sec:   {batched:.2f}")
+    print(f"speedup:              {batched / per_chunk:.2f}x")
+    print(f"identical summaries:  {matches}/{len(texts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,24 +4,78 @@ import { useState } from 'react'
 import SearchBar from '@/components/SearchBar'
 import ResultCard from '@/components/ResultCard'
 
+type SearchEvent =
+  | { event: 'sub_queries'; sub_queries: string[] }
+  | { event: 'sources'; sub_query: string; sources: string[] }
+  | { event: 'summaries'; count: number }
+  | { event: 'token'; text: string }
+  | { event: 'answer'; answer: string; sources: string[] }
+  | { event: 'error'; detail: string }
+
 export default function Home() {
   const [result, setResult] = useState<{ answer: string; sources: string[] } | null>(null)
   const [loading, setLoading] = useState(false)
+  const [status, setStatus] = useState('')
+
+  const handleEvent = (event: SearchEvent) => {
+    switch (event.event) {
+      case 'sub_queries':
+        setStatus(`Searching for ${event.sub_queries.length} sub-queries...`)
+        break
+      case 'sources':
+        setStatus(`Found ${event.sources.length} sources for "${event.sub_query}"`)
+        break
+      case 'summaries':
+        setStatus(`Summarized ${event.count} sources, writing answer...`)
+        break
+      case 'token':
+        setResult((previous) => ({
+          answer: (previous?.answer ?? '') + event.text,
+          sources: previous?.sources ?? [],
+        }))
+        break
+      case 'answer':
+        setResult({ answer: event.answer, sources: event.sources })
+        break
+      case 'error':
+        console.error('Search failed:', event.detail)
+        break
+    }
+  }
 
   const handleSearch = async (query: string) => {
     setLoading(true)
+    setResult(null)
+    setStatus('Searching...')
     try {
-      const response = await fetch('/api/search', {
+      const response = await fetch('/api/search/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ query }),
       })
-      const data = await response.json()
-      setResult(data)
+      if (!response.body) {
+        throw new Error('Streaming is not supported by this browser')
+      }
+
+      // The response is newline-delimited JSON, one event per line
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split('\n')
+        buffer = lines.pop() ?? ''
+        for (const line of lines) {
+          if (line.trim()) handleEvent(JSON.parse(line))
+        }
+      }
     } catch (error) {
       console.error('Search failed:', error)
     } finally {
       setLoading(false)
+      setStatus('')
     }
   }
 
@@ -29,8 +83,8 @@ export default function Home() {
     <main className="flex min-h-screen flex-col items-center p-24">
       <h1 className="text-4xl font-bold mb-8">Stratos</h1>
       <SearchBar onSearch={handleSearch} isLoading={loading} />
-      {loading && <p className="mt-4">Searching...</p>}
+      {loading && <p className="mt-4">{status}</p>}
       {result && <ResultCard result={result} />}
     </main>
   )
-}
\ No newline at end of file
+}